@@ -0,0 +1,352 @@
+""" Measures the latency and throughput of WebAutomation against the pages served by tests/test_data/web_server.py
+
+    Run from the root of this repository:
+        python benchmarks/run_benchmarks.py --output baseline.json
+        python benchmarks/run_benchmarks.py --compare baseline.json --threshold 0.2
+        python benchmarks/run_benchmarks.py --compare baseline.json --profile fast --only open_url journey_drag
+
+    Compare mode exits with status 1 if any benchmark's median got slower than the baseline by more than the
+    threshold (0.2 = 20%).
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+from datetime import datetime
+from statistics import mean, median
+from time import perf_counter, sleep
+from urllib.request import urlopen
+
+sys.path.append(".")  # This puts the root of this repository on the Python path
+sys.path.append("tests")
+from test_data import web_server  # pylint: disable=wrong-import-position
+from src.tracing import percentile  # pylint: disable=wrong-import-position
+from src.web_automation import WebAutomation  # pylint: disable=wrong-import-position
+
+HOST = "http://localhost:5000"
+BENCHMARKS = []  # (name, setup, action), in the order they are run
+
+
+def benchmark(name, setup=None):
+    """ Register a function to time
+
+        Args:
+            name (str): Name stored in the results
+            setup (function): Optional, called with the WebAutomation object before each timed call, untimed
+    """
+    def _register(action):
+        BENCHMARKS.append((name, setup, action))
+        return action
+    return _register
+
+
+def _open(path):
+    """ Setup function which loads a page """
+    return lambda web: web.open_url(f"{HOST}{path}")
+
+
+# Individual methods
+
+@benchmark("open_url")
+def _open_url(web):
+    web.open_url(f"{HOST}/button")
+
+
+@benchmark("click", setup=_open("/button"))
+def _click(web):
+    web.click("button1", "id")
+
+
+@benchmark("text_entry", setup=_open("/text_entry"))
+def _text_entry(web):
+    web.text_entry("Zebra", "text1", "id")
+
+
+@benchmark("fill_form", setup=_open("/form"))
+def _fill_form(web):
+    web.fill_form({("text1", "id"): "Zebra", ("area1", "id"): "Lion", ("check1", "id"): True,
+                   ("select1", "id"): "Bravo"})
+
+
+@benchmark("get_text", setup=_open("/text_entry"))
+def _get_text(web):
+    web.get_text("text1", "id")
+
+
+@benchmark("get_texts", setup=_open("/long"))
+def _get_texts(web):
+    web.get_texts([(f"ver{index}", "id") for index in range(50)])
+
+
+@benchmark("snapshot_get_texts", setup=_open("/long"))
+def _snapshot_get_texts(web):
+    web.snapshot().get_texts([(f"ver{index}", "id") for index in range(50)])
+
+
+@benchmark("get_url", setup=_open("/button"))
+def _get_url(web):
+    web.get_url()
+
+
+@benchmark("wait_for_element", setup=_open("/button"))
+def _wait_for_element(web):
+    web.wait_for_element("output", "id")
+
+
+@benchmark("wait_for_element_removal", setup=_open("/button"))
+def _wait_for_element_removal(web):
+    web.wait_for_element_removal("missing", "id")
+
+
+@benchmark("wait_for_visible", setup=_open("/button"))
+def _wait_for_visible(web):
+    web.wait_for_visible("button1", "id")
+
+
+@benchmark("wait_for_text", setup=_open("/text_entry"))
+def _wait_for_text(web):
+    web.wait_for_text("default value", "text1", "id")
+
+
+@benchmark("wait_for_attribute", setup=_open("/button"))
+def _wait_for_attribute(web):
+    web.wait_for_attribute("type", "button", "button1", "id")
+
+
+@benchmark("wait_for_expected_conditions", setup=_open("/button"))
+def _wait_for_expected_conditions(web):
+    web.wait_for_expected_conditions(is_in_url="/button")
+
+
+@benchmark("get_alert_text", setup=_open("/alert"))
+def _get_alert_text(web):
+    web.get_alert_text()
+    web.accept_alert()
+
+
+@benchmark("check_for_alert", setup=_open("/alert"))
+def _check_for_alert(web):
+    web.check_for_alert()
+
+
+@benchmark("click_hold", setup=_open("/drag"))
+def _click_hold(web):
+    web.click_hold(0, "block1", "id")
+
+
+@benchmark("right_click", setup=_open("/keypress"))
+def _right_click(web):
+    web.right_click("right_click", "id")
+
+
+@benchmark("double_click", setup=_open("/keypress"))
+def _double_click(web):
+    web.double_click("double_click", "id")
+
+
+@benchmark("mouse_hover", setup=_open("/keypress"))
+def _mouse_hover(web):
+    web.mouse_hover("hover", "id")
+
+
+@benchmark("drag_drop", setup=_open("/drag"))
+def _drag_drop(web):
+    web.drag_drop("block1", "id", "block2", "id")
+
+
+@benchmark("sequence", setup=_open("/keypress"))
+def _sequence(web):
+    web.sequence().right_click("right_click", "id").double_click("double_click", "id").hover("hover", "id").perform()
+
+
+@benchmark("keyboard_shortcut", setup=_open("/keypress"))
+def _keyboard_shortcut(web):
+    web.keyboard_shortcut("a")
+
+
+@benchmark("scroll_page", setup=_open("/long"))
+def _scroll_page(web):
+    web.scroll_page("down")
+
+
+@benchmark("scroll_to_element", setup=_open("/long"))
+def _scroll_to_element(web):
+    web.scroll_to_element("ver400", "id")
+
+
+@benchmark("page_navigation", setup=_open("/button"))
+def _page_navigation(web):
+    web.page_navigation("refresh")
+
+
+@benchmark("is_alive")
+def _is_alive(web):
+    web.is_alive()
+
+
+# Mini journeys
+
+@benchmark("journey_button")
+def _journey_button(web):
+    web.open_url(f"{HOST}/button")
+    web.click("button1", "id")
+    web.wait_for_text("Passed", "output", "id")
+
+
+@benchmark("journey_form")
+def _journey_form(web):
+    web.open_url(f"{HOST}/text_entry")
+    web.text_entry("Zebra", "text1", "id")
+    web.get_text("text1", "id")
+    web.click("//input[@type='submit']", "xpath")
+    web.wait_for_expected_conditions(is_in_url="/output")
+
+
+@benchmark("journey_drag")
+def _journey_drag(web):
+    web.open_url(f"{HOST}/drag")
+    web.drag_drop("block1", "id", "block2", "id")
+    web.get_text("position", "id")
+
+
+def _stats(samples):
+    """ Summary of timed samples, in seconds """
+    ordered = sorted(samples)
+    return {
+        "samples": len(ordered),
+        "median": median(ordered),
+        "mean": mean(ordered),
+        "p95": percentile(ordered, 0.95),
+        "min": ordered[0],
+        "throughput": 1 / mean(ordered) if mean(ordered) else None,  # Calls per second
+    }
+
+
+def start_web_server():
+    """ Start the test web server, and wait for it to answer """
+    tid = threading.Thread(target=web_server.app.run)
+    tid.daemon = True
+    tid.start()
+    for _ in range(100):
+        try:
+            urlopen(HOST).close()
+            return
+        except OSError:
+            sleep(0.1)
+    raise RuntimeError("Test web server did not start")
+
+
+def run(web_kwargs, repeat, startup_repeat, only=None):
+    """ Run the benchmarks
+
+        Args:
+            web_kwargs (dict): Passed to WebAutomation()
+            repeat (int): Timed calls per benchmark
+            startup_repeat (int): Browser launches to time
+            only (list): Optional, names of the benchmarks to run
+
+        Returns:
+            dict of stats, by benchmark name
+    """
+
+    results = {}
+    if not only or "startup" in only:
+        samples = []
+        for _ in range(startup_repeat):
+            start = perf_counter()
+            web = WebAutomation(**web_kwargs)
+            samples.append(perf_counter() - start)
+            web.close()
+        results["startup"] = _stats(samples)
+        logging.info("startup: %.3fs median", results["startup"]["median"])
+
+    web = WebAutomation(**web_kwargs)
+    try:
+        for name, setup, action in BENCHMARKS:
+            if only and name not in only:
+                continue
+            samples = []
+            for iteration in range(repeat + 1):  # First call warms up, and isn't counted
+                if setup:
+                    setup(web)
+                start = perf_counter()
+                action(web)
+                if iteration:
+                    samples.append(perf_counter() - start)
+            results[name] = _stats(samples)
+            logging.info("%s: %.4fs median", name, results[name]["median"])
+    finally:
+        web.close()
+    return results
+
+
+def compare(baseline, results, threshold):
+    """ Compare results with a baseline
+
+        Returns:
+            list of benchmark names which regressed by more than the threshold
+    """
+
+    regressions = []
+    print(f"{'benchmark':<32} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for name, stats in results.items():
+        if name not in baseline:
+            print(f"{name:<32} {'-':>12} {stats['median'] * 1000:>12.2f} {'new':>8}")
+            continue
+        before = baseline[name]["median"]
+        change = stats["median"] / before - 1 if before else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<32} {before * 1000:>12.2f} {stats['median'] * 1000:>12.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    """ Command line entry point """
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare results against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed calls per benchmark")
+    parser.add_argument("--startup-repeat", type=int, default=3, help="Browser launches to time")
+    parser.add_argument("--browser", default="firefox", help="firefox or chrome")
+    parser.add_argument("--only", nargs="*", help="Names of benchmarks to run")
+    parser.add_argument("--profile", help="Performance profile to run with. Eg: fast")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    start_web_server()
+    web_kwargs = {"browser_name": args.browser, "headless": not os.environ.get("disable_headless"),
+                  "performance_profile": args.profile}
+    results = run(web_kwargs, args.repeat, args.startup_repeat, args.only)
+
+    if args.output:
+        with open(args.output, "w") as hdl:
+            json.dump({
+                "version": 1,
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "browser": args.browser,
+                "profile": args.profile,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }, hdl, indent=1)
+
+    if args.compare:
+        with open(args.compare) as hdl:
+            baseline = json.load(hdl)["results"]
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
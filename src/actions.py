@@ -0,0 +1,267 @@
+""" Builds W3C WebDriver Actions, so a whole run of mouse, keyboard and wheel input goes to the browser in one request
+
+    Each step is one "tick". The browser performs ticks in order, finishing each one (eg: a pause) before starting the
+    next, so steps keep their timing without a round trip between them.
+
+    Example:
+        ActionPayload().move_to(element).pointer_down().pause(2).pointer_up().perform(web.selenium_driver)
+        web.sequence().click("menu", "id").hover("submenu", "id").pause(0.5).click("item3", "id").perform()
+"""
+
+from selenium.common import exceptions
+from . import browser_scripts
+
+W3C_ELEMENT = "element-6066-11e4-a52e-4f735466cecf"
+
+# Key values from the WebDriver spec. Same as selenium.webdriver.common.keys.Keys, which isn't imported here since
+# importing it loads every browser's driver module
+BACKSPACE = "\ue003"
+SHIFT = "\ue008"
+CONTROL = "\ue009"
+ALT = "\ue00a"
+META = "\ue03d"
+
+# Named keys accepted by ActionSequence.key(), as keyboard_shortcut() names them
+KEYS = {
+    "ALT": ALT,
+    "BACKSPACE": BACKSPACE,
+    "COMMAND": META,
+    "DELETE": "\ue017",
+    "DOWN": "\ue015",
+    "END": "\ue010",
+    "ENTER": "\ue007",
+    "ESCAPE": "\ue00c",
+    "HOME": "\ue011",
+    "INSERT": "\ue016",
+    "LEFT": "\ue012",
+    "META": META,
+    "PAGE_DOWN": "\ue00f",
+    "PAGE_UP": "\ue00e",
+    "RETURN": "\ue006",
+    "RIGHT": "\ue014",
+    "SPACE": "\ue00d",
+    "TAB": "\ue004",
+    "UP": "\ue013",
+}
+KEYS.update({f"F{number}": chr(0xe030 + number) for number in range(1, 13)})
+
+BUTTONS = {"left": 0, "middle": 1, "right": 2}
+
+# Input sources in the order they are sent, with the parameters the browser needs for each
+_SOURCES = {
+    "key": {"type": "key", "id": "keyboard"},
+    "pointer": {"type": "pointer", "id": "mouse", "parameters": {"pointerType": "mouse"}},
+    "wheel": {"type": "wheel", "id": "wheel"},
+}
+
+
+def element_origin(element):
+    """ Reference to an element which the browser understands. element is an element object, or a W3C element ID """
+    return {W3C_ELEMENT: getattr(element, "id", element)}
+
+
+class ActionPayload:
+    """ Sequence of input actions, sent to the browser with perform() """
+    def __init__(self):
+        self._ticks = []  # One dict per tick: {source: action}
+        self._scrolled = False  # Whether a wheel action has moved the page since elements were checked
+
+    def __len__(self):
+        return len(self._ticks)
+
+    def _add(self, source, action):
+        """ Append a tick in which only one input source acts """
+        self._ticks.append({source: action})
+        return self
+
+    def move_to(self, element=None, x=0, y=0, duration=0):
+        """ Move the mouse to the middle of an element, offset by x and y. No element = offset from where it is """
+        origin = element_origin(element) if element is not None else "pointer"
+        return self._add("pointer", {"type": "pointerMove", "origin": origin, "x": int(x), "y": int(y),
+                                     "duration": int(duration * 1000)})
+
+    def pointer_down(self, button=0):
+        """ Press a mouse button. See BUTTONS """
+        return self._add("pointer", {"type": "pointerDown", "button": button})
+
+    def pointer_up(self, button=0):
+        """ Release a mouse button. See BUTTONS """
+        return self._add("pointer", {"type": "pointerUp", "button": button})
+
+    def click(self, element=None, button=0):
+        """ Click on an element, or where the mouse is """
+        if element is not None:
+            self.move_to(element)
+        return self.pointer_down(button).pointer_up(button)
+
+    def double_click(self, element=None):
+        """ Double left click on an element, or where the mouse is """
+        return self.click(element).click()
+
+    def key_down(self, key):
+        """ Press a key, and keep it held. key is one character, or a key value like CONTROL """
+        return self._add("key", {"type": "keyDown", "value": key})
+
+    def key_up(self, key):
+        """ Release a key """
+        return self._add("key", {"type": "keyUp", "value": key})
+
+    def press(self, key):
+        """ Press and release a key """
+        return self.key_down(key).key_up(key)
+
+    def type_text(self, text):
+        """ Press and release the key for each character """
+        for character in text:
+            self.press(character)
+        return self
+
+    def scroll_into_view(self, element):
+        """ Scroll the page until an element is in view, so the mouse can reach it. Needs a driver which supports
+            wheel input (geckodriver 0.31, chromedriver 97 and later)
+        """
+        self._scrolled = True
+        return self._add("wheel", {"type": "scroll", "origin": element_origin(element), "x": 0, "y": 0,
+                                   "deltaX": 0, "deltaY": 0, "duration": 0})
+
+    def reach(self, element, in_view):
+        """ Scroll an element into view only if it was off-screen when checked, or the page has been scrolled since.
+            Keeps wheel input, and the driver versions it needs, out of gestures on elements already in view
+        """
+        if not in_view or self._scrolled:
+            self.scroll_into_view(element)
+        return self
+
+    def pause(self, seconds):
+        """ Wait before the next step, inside the browser """
+        return self._add("pointer", {"type": "pause", "duration": int(seconds * 1000)})
+
+    def to_w3c(self):
+        """ Body of the W3C "Perform Actions" request
+
+            Every input source used gets an action for every tick, pausing for 0 ms in the ticks where it does
+            nothing, which the protocol requires.
+        """
+        used = [source for source in _SOURCES if any(source in tick for tick in self._ticks)]
+        actions = []
+        for source in used:
+            steps = [tick.get(source, {"type": "pause", "duration": 0}) for tick in self._ticks]
+            actions.append(dict(_SOURCES[source], actions=steps))
+        return {"actions": actions}
+
+    def perform(self, driver):
+        """ Send the actions to a Selenium driver, which must talk the W3C protocol """
+        if self._ticks:
+            driver.execute("actions", self.to_w3c())  # Command.W3C_ACTIONS
+
+
+class ActionSequence:
+    """ Gestures against elements, strung together and performed in one request. Built with WebAutomation.sequence()
+
+        Every element is found with one request when perform() is called, so none of them are waited for. Elements
+        which are off-screen are scrolled into view before the mouse moves to them.
+    """
+    def __init__(self, web):
+        self._web = web
+        self._locators = []  # Unique (element_id, element_type) pairs, in the order first used
+        self._steps = []  # Functions which add each gesture to an ActionPayload: step(payload, [element, in view])
+
+    def _element(self, element_id, element_type):
+        """ Index of a locator in the elements passed to each step """
+        assert element_type in browser_scripts.ELEMENT_TYPES, "Invalid element type provided"  # Notify about user error
+        locator = (element_id, element_type)
+        if locator not in self._locators:
+            self._locators.append(locator)
+        return self._locators.index(locator)
+
+    def _pointer(self, gesture, *locators):
+        """ Add a mouse gesture, called as gesture(payload, *elements) once each element is scrolled into view """
+        indexes = [self._element(element_id, element_type) for element_id, element_type in locators]
+
+        def _step(payload, elements):
+            targets = [elements[index] for index in indexes]
+            payload.reach(*targets[0])
+            gesture(payload, *[element for element, _ in targets])
+
+        self._steps.append(_step)
+        return self
+
+    def click(self, element_id, element_type):
+        """ Left click on element """
+        return self._pointer(lambda payload, element: payload.click(element), (element_id, element_type))
+
+    def double_click(self, element_id, element_type):
+        """ Double left click on element """
+        return self._pointer(lambda payload, element: payload.double_click(element), (element_id, element_type))
+
+    def right_click(self, element_id, element_type):
+        """ Right (context) click on element """
+        return self._pointer(lambda payload, element: payload.click(element, BUTTONS["right"]),
+                             (element_id, element_type))
+
+    def hover(self, element_id, element_type):
+        """ Move the mouse over element """
+        return self._pointer(lambda payload, element: payload.move_to(element), (element_id, element_type))
+
+    mouse_hover = hover
+
+    def click_hold(self, seconds, element_id, element_type):
+        """ Left click and hold on element for a number of seconds """
+        return self._pointer(lambda payload, element: payload.move_to(element).pointer_down().pause(seconds)
+                             .pointer_up(), (element_id, element_type))
+
+    def drag_drop(self, src_element_id, src_element_type, dst_element_id, dst_element_type):
+        """ Drag one element onto another """
+
+        src = self._element(src_element_id, src_element_type)
+        dst = self._element(dst_element_id, dst_element_type)
+
+        def _step(payload, elements):
+            payload.reach(*elements[src]).move_to(elements[src][0]).pointer_down()
+            payload.reach(*elements[dst]).move_to(elements[dst][0]).pointer_up()
+
+        self._steps.append(_step)
+        return self
+
+    def key(self, character, control=False, alt=False, shift=False):
+        """ Press a key, eg: "a" or a name from KEYS such as "ENTER", optionally with modifier keys held """
+
+        key = KEYS.get(character.upper(), character)
+        modifiers = [modifier for modifier, held in ((CONTROL, control), (ALT, alt), (SHIFT, shift)) if held]
+
+        def _step(payload, _):
+            for modifier in modifiers:
+                payload.key_down(modifier)
+            payload.press(key)
+            for modifier in reversed(modifiers):
+                payload.key_up(modifier)
+
+        self._steps.append(_step)
+        return self
+
+    def keys(self, text):
+        """ Type text into whatever has focus """
+        self._steps.append(lambda payload, _: payload.type_text(text))
+        return self
+
+    def pause(self, seconds):
+        """ Wait between gestures, inside the browser """
+        self._steps.append(lambda payload, _: payload.pause(seconds))
+        return self
+
+    def perform(self):
+        """ Find every element in one request, then send every gesture in another """
+
+        driver = self._web.selenium_driver
+        elements = []
+        if self._locators:
+            elements = driver.execute_script(browser_scripts.FIND_FIRST, [list(locator) for locator in self._locators])
+            missing = [locator for locator, element in zip(self._locators, elements) if element is None]
+            if missing:
+                raise exceptions.NoSuchElementException(
+                    f"Elements not found: {', '.join(repr(locator) for locator in missing)}")
+
+        payload = ActionPayload()
+        for step in self._steps:
+            step(payload, elements)
+        payload.perform(driver)
@@ -0,0 +1,459 @@
+""" Asynchronous web page automation. Talks the W3C WebDriver protocol directly, over a pooled aiohttp client
+
+    Has WebAutomation's main methods (pages, waits, reading and entering text, clicks, gestures, alerts, scripts), as
+    coroutines, so one event loop can drive many browsers at once instead of blocking a thread per browser.
+
+    Example:
+        async with AsyncWebAutomation(headless=True) as web:
+            await web.open_url("http://localhost:5000/button")
+            await web.click("button1", "id")
+"""
+
+import asyncio
+import logging
+import socket
+from time import time
+import aiohttp
+from selenium.common import exceptions
+from . import browser_scripts
+from .browser_scripts import condition
+
+# Key the W3C protocol uses to mark an element reference in JSON
+W3C_ELEMENT = "element-6066-11e4-a52e-4f735466cecf"
+
+# Keys keyboard_shortcut() accepts by name, as in WebAutomation.keyboard_shortcut()
+KEY_NAMES = ("ALT", "BACKSPACE", "COMMAND", "DELETE", "DOWN", "END", "ENTER", "ESCAPE", "F1", "F10", "F11", "F12", "F2",
+             "F3", "F4", "F5", "F6", "F7", "F8", "F9", "HOME", "INSERT", "LEFT", "META", "PAGE_DOWN", "PAGE_UP", "RETURN",
+             "RIGHT", "SPACE", "TAB", "UP")
+
+# W3C error codes, and the Selenium exception raised for each. Anything else raises WebDriverException
+ERRORS = {
+    "element click intercepted": exceptions.ElementClickInterceptedException,
+    "element not interactable": exceptions.ElementNotInteractableException,
+    "invalid argument": exceptions.InvalidArgumentException,
+    "invalid element state": exceptions.InvalidElementStateException,
+    "invalid selector": exceptions.InvalidSelectorException,
+    "javascript error": exceptions.JavascriptException,
+    "no such alert": exceptions.NoAlertPresentException,
+    "no such element": exceptions.NoSuchElementException,
+    "no such window": exceptions.NoSuchWindowException,
+    "script timeout": exceptions.TimeoutException,
+    "session not created": exceptions.SessionNotCreatedException,
+    "stale element reference": exceptions.StaleElementReferenceException,
+    "timeout": exceptions.TimeoutException,
+    "unexpected alert open": exceptions.UnexpectedAlertPresentException,
+}
+
+
+def _css_escape(value):
+    """ Escape a string for use inside a CSS selector, like CSS.escape() """
+    escaped = ""
+    for index, char in enumerate(value):
+        if char == "\0":
+            escaped += "\ufffd"
+        elif "\x01" <= char <= "\x1f" or char == "\x7f" or (char.isdigit() and index == 0):
+            escaped += f"\\{ord(char):x} "
+        elif char.isalnum() or char in "-_" or ord(char) >= 0x80:
+            escaped += char
+        else:
+            escaped += "\\" + char
+    return escaped
+
+
+def _locator(element_id, element_type):
+    """ Convert an element type and ID to a W3C locator strategy and value
+
+        Returns:
+            tuple: (strategy, value)
+    """
+    if element_type == "id":
+        return "css selector", f"[id=\"{_css_escape(element_id)}\"]"
+    if element_type == "name":
+        return "css selector", f"[name=\"{_css_escape(element_id)}\"]"
+    if element_type == "class":
+        return "css selector", "." + _css_escape(element_id)
+    if element_type == "tag":
+        return "tag name", element_id
+    assert element_type in ("xpath", "link text", "partial link text", "css selector"), "Invalid element type provided"
+    return element_type, element_id
+
+
+def _free_port():
+    """ Find a TCP port nothing is listening on """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class AsyncWebAutomation:  # pylint: disable=too-many-public-methods, too-many-instance-attributes
+    """ Returns browser object with which to interface. Call start(), or use "async with", before anything else """
+    def __init__(self, browser_name="firefox", headless=False, executable=None, driver_path=None,
+                 http_session=None):
+        """ Setup requirements
+            Args:
+                browser_name (str): "firefox" or "chrome"
+                headless (bool): True = Do not show browser; False = Show browser during automation
+                executable (str): Optional, if set, should be a direct path to the browser executable
+                driver_path (str): Optional, path to geckodriver/chromedriver. Found on $PATH when not set
+                http_session (aiohttp.ClientSession): Optional, share one connection pool between many browsers.
+                                                      It is not closed by close()
+        """
+
+        self.browser_name = browser_name.lower()
+        self.headless = headless
+        self.webdriver_wait = 20  # How long to wait for elements to appear and events to occur in seconds
+        self.executable = executable
+        self.driver_path = driver_path or {"firefox": "geckodriver", "chrome": "chromedriver"}[self.browser_name]
+        self.driver_url = None
+        self.session_id = None
+        self._http = http_session
+        self._own_http = http_session is None
+        self._driver_process = None
+        self._script_timeout = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def start(self):
+        """ Start the browser driver, and a browser session """
+
+        if self._own_http:
+            self._http = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+
+        try:
+            port = _free_port()
+            port_arg = ["--port", str(port)] if self.browser_name == "firefox" else [f"--port={port}"]
+            self._driver_process = await asyncio.create_subprocess_exec(
+                self.driver_path, *port_arg, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+            self.driver_url = f"http://127.0.0.1:{port}"
+            await self._wait_for_driver()
+
+            response = await self._request("POST", "/session", {"capabilities": {"alwaysMatch": self._capabilities()}})
+            self.session_id = response["sessionId"]
+            await self._command("POST", "/timeouts", {"implicit": self.webdriver_wait * 1000})
+            await self._command("POST", "/window/maximize", {})
+        except:
+            logging.error("Error starting web browser")
+            await self.close()
+            raise
+
+    def _capabilities(self):
+        """ W3C capabilities for the browser """
+
+        if self.browser_name == "chrome":
+            args = ["--disable-extensions", "--no-sandbox"]
+            key = "goog:chromeOptions"
+        else:
+            args = ["--safe-mode"]  # Don't want user's extensions interfering
+            key = "moz:firefoxOptions"
+        if self.headless:
+            args.append("--headless")
+
+        options = {"args": args}
+        if self.executable:
+            options["binary"] = self.executable
+        return {"browserName": self.browser_name, key: options}
+
+    async def _wait_for_driver(self, timeout=10):
+        """ Wait until the browser driver accepts requests """
+        deadline = time() + timeout
+        while True:
+            try:
+                await self._request("GET", "/status")
+                return
+            except aiohttp.ClientConnectionError:
+                if time() > deadline:
+                    raise
+                await asyncio.sleep(0.05)
+
+    async def _request(self, method, path, payload=None):
+        """ Send a request to the browser driver
+
+            Returns:
+                The "value" of the response
+        """
+
+        async with self._http.request(method, self.driver_url + path, json=payload) as response:
+            body = await response.json(content_type=None)
+
+        value = body.get("value") if isinstance(body, dict) else None
+        if response.status >= 400 or (isinstance(value, dict) and "error" in value):
+            value = value if isinstance(value, dict) else {}
+            error = ERRORS.get(value.get("error"), exceptions.WebDriverException)
+            raise error(value.get("message", str(body)), None, value.get("stacktrace"))
+        return value
+
+    async def _command(self, method, path, payload=None):
+        """ Send a command to this browser session """
+        return await self._request(method, f"/session/{self.session_id}{path}", payload)
+
+    async def _find_element(self, element_id, element_type):
+        """ When provided an identifier, returns the W3C element reference to use with other commands
+
+            Raises NoSuchElementException if not found within the self.webdriver_wait timeout.
+        """
+        using, value = _locator(element_id, element_type)
+        element = await self._command("POST", "/element", {"using": using, "value": value})
+        return element[W3C_ELEMENT]
+
+    async def _actions(self, *actions):
+        """ Perform mouse actions in a single request """
+        await self._command("POST", "/actions", {"actions": [{
+            "type": "pointer", "id": "mouse", "parameters": {"pointerType": "mouse"}, "actions": list(actions)}]})
+
+    @staticmethod
+    def _move_to(element):
+        """ Mouse action moving onto the middle of an element """
+        return {"type": "pointerMove", "duration": 0, "origin": {W3C_ELEMENT: element}, "x": 0, "y": 0}
+
+    ####################################################################
+
+    async def execute_script(self, script, *args):
+        """ Run JavaScript in the page and return the result """
+        return await self._command("POST", "/execute/sync", {"script": script, "args": list(args)})
+
+    async def wait_for_conditions(self, conditions, match="all", timeout=None):
+        """ Wait until conditions are met, or timeout reached. See WebAutomation.wait_for_conditions()
+
+            Returns:
+                True if the conditions were met, False if not after the timeout has been reached
+        """
+
+        assert match in ("all", "any"), "Invalid match provided"
+        return await self._wait_in_page(browser_scripts.WAIT_FOR_CONDITIONS, timeout, conditions, match)
+
+    async def _wait_in_page(self, script, timeout, *args):
+        """ Run an asynchronous wait script until it reports met, or timeout reached. See WebAutomation._wait_in_page()
+        """
+
+        if timeout is None:
+            timeout = self.webdriver_wait
+        deadline = time() + timeout
+
+        while True:
+            remaining = max(0, deadline - time())
+            if self._script_timeout is None or self._script_timeout < remaining + 5:
+                self._script_timeout = remaining + 5  # Leave the browser time to report the wait timing out
+                await self._command("POST", "/timeouts", {"script": int(self._script_timeout * 1000)})
+            try:
+                result = await self._command("POST", "/execute/async", {
+                    "script": script, "args": [*args, int(remaining * 1000)]})
+            except exceptions.JavascriptException as error:
+                if "unload" not in str(error).lower():  # Page navigated away, so wait again on the new page
+                    raise
+                result = None
+
+            if result and result["met"]:
+                return True
+            if time() >= deadline:
+                return False
+
+    async def wait_for_idle(self, idle_time=0.5, timeout=None):
+        """ Wait until the page has had no network requests or DOM changes for idle_time seconds, or timeout reached.
+            See WebAutomation.wait_for_idle(). Requests are counted from the first wait on each page
+
+            Returns:
+                True if the page went idle, False if not after the timeout has been reached
+        """
+        return await self._wait_in_page(browser_scripts.WAIT_FOR_IDLE, timeout, int(idle_time * 1000))
+
+    async def wait_for_element(self, element_id, element_type, timeout=None):
+        """ Wait until element appears. Returns True if element exists, False if not after the timeout """
+        return await self.wait_for_conditions([condition("present", element_id, element_type)], timeout=timeout)
+
+    async def wait_for_element_removal(self, element_id, element_type, timeout=20):
+        """ Wait until element is removed. Returns True if element does NOT exist """
+        return await self.wait_for_conditions([condition("absent", element_id, element_type)], timeout=timeout)
+
+    async def wait_for_visible(self, element_id, element_type, timeout=None):
+        """ Wait until element is displayed. Returns True if visible, False if not after the timeout """
+        return await self.wait_for_conditions([condition("visible", element_id, element_type)], timeout=timeout)
+
+    async def wait_for_text(self, text, element_id, element_type, timeout=None):
+        """ Wait until element's text equals "text". Returns True if it matches, False if not after the timeout """
+        return await self.wait_for_conditions([condition("text", element_id, element_type, value=text)],
+                                              timeout=timeout)
+
+    async def wait_for_attribute(self, attribute, pattern, element_id, element_type, timeout=None):
+        """ Wait until element's attribute matches a regular expression. Returns True if it matches """
+        return await self.wait_for_conditions([condition("attribute", element_id, element_type, value=pattern,
+                                                         name=attribute)], timeout=timeout)
+
+    async def wait_for_expected_conditions(self, url=None, is_in_url=None, conditions=None, match="all",
+                                           timeout=None):
+        """ Wait for a condition. Raises TimeoutException if not met. See WebAutomation.wait_for_expected_conditions()
+        """
+
+        conditions = list(conditions or [])
+        if url:
+            conditions.append(condition("url_changes", value=url))
+        elif is_in_url:
+            conditions.append(condition("url_contains", value=is_in_url))
+
+        if not await self.wait_for_conditions(conditions, match=match, timeout=timeout):
+            raise exceptions.TimeoutException("Expected conditions were not met")
+
+    async def open_url(self, url, settle=False):
+        """ Go to URL in browser, and wait for page to load. settle: See WebAutomation.open_url() """
+        await self._command("POST", "/url", {"url": url})
+        if settle and not await self.wait_for_idle(0.5 if settle is True else settle):
+            logging.warning("%s was still busy after %s seconds", url, self.webdriver_wait)
+
+    async def text_entry(self, text, element_id, element_type):
+        """ Enter text into a text box """
+        element = await self._find_element(element_id, element_type)
+        await self._command("POST", f"/element/{element}/click", {})  # Set focus
+        try:
+            await self._command("POST", f"/element/{element}/clear", {})  # Remove any existing text
+        except exceptions.InvalidElementStateException:  # Ignore this when we need to enter text in non-text fields
+            pass
+        await self._command("POST", f"/element/{element}/value", {"text": str(text)})
+
+    async def click(self, element_id, element_type):
+        """ Click on anything which has an identifiable name """
+        element = await self._find_element(element_id, element_type)
+        await self._command("POST", f"/element/{element}/click", {})
+
+    async def get_text(self, element_id, element_type):
+        """ Retrieves text from a tag or textbox and returns it """
+        element = await self._find_element(element_id, element_type)
+        value = await self._command("GET", f"/element/{element}/property/value")  # None if not a textbox
+        if value is None:
+            return await self._command("GET", f"/element/{element}/text")  # Should be a tag, so return it's text
+        return str(value)
+
+    async def get_texts(self, locators):
+        """ Retrieves text from many tags or textboxes in a single request. See WebAutomation.get_texts() """
+
+        keys, pairs = browser_scripts.split_locators(locators)
+        result = await self.execute_script(browser_scripts.READ_TEXTS, [list(pair) for pair in pairs])
+        if result["missing"]:
+            raise exceptions.NoSuchElementException(
+                f"Elements not found: {', '.join(repr(pairs[index]) for index in result['missing'])}")
+
+        if keys is not None:
+            return dict(zip(keys, result["texts"]))
+        return result["texts"]
+
+    read_many = get_texts
+
+    async def get_url(self):
+        """ Return the current URL from the address bar """
+        return await self._command("GET", "/url")
+
+    async def accept_alert(self):
+        """ Accept an alert """
+        await self._command("POST", "/alert/accept", {})
+
+    async def get_alert_text(self):
+        """ Return text from an alert """
+        return await self._command("GET", "/alert/text")
+
+    async def check_for_alert(self):
+        """ Checks for the existence of an alert popup, and accepts it """
+        try:
+            await self.accept_alert()
+        except exceptions.NoAlertPresentException:
+            return False
+        return True
+
+    async def click_hold(self, seconds, element_id, element_type):
+        """ Left click and hold specified number of seconds. The browser times the hold, so the event loop is free """
+        element = await self._find_element(element_id, element_type)
+        await self._actions(self._move_to(element), {"type": "pointerDown", "button": 0},
+                            {"type": "pause", "duration": int(seconds * 1000)}, {"type": "pointerUp", "button": 0})
+
+    async def right_click(self, element_id, element_type):
+        """ Right (context) click on element """
+        element = await self._find_element(element_id, element_type)
+        await self._actions(self._move_to(element), {"type": "pointerDown", "button": 2},
+                            {"type": "pointerUp", "button": 2})
+
+    async def double_click(self, element_id, element_type):
+        """ Double left click on element """
+        element = await self._find_element(element_id, element_type)
+        clicks = [{"type": "pointerDown", "button": 0}, {"type": "pointerUp", "button": 0}] * 2
+        await self._actions(self._move_to(element), *clicks)
+
+    async def mouse_hover(self, element_id, element_type):
+        """ Hover mouse over element """
+        element = await self._find_element(element_id, element_type)
+        await self._actions(self._move_to(element))
+
+    async def drag_drop(self, src_element_id, src_element_type, dst_element_id, dst_element_type):
+        """ Drag one element onto another """
+        src = await self._find_element(src_element_id, src_element_type)
+        dst = await self._find_element(dst_element_id, dst_element_type)
+        await self._actions(self._move_to(src), {"type": "pointerDown", "button": 0}, self._move_to(dst),
+                            {"type": "pointerUp", "button": 0})
+
+    async def keyboard_shortcut(self, character, control=False, alt=False, shift=False):
+        """ Send any key press to the page. See WebAutomation.keyboard_shortcut() """
+        from selenium.webdriver.common.keys import Keys  # pylint: disable=import-outside-toplevel
+        key_combo = ""
+        if control:
+            key_combo += Keys.CONTROL
+        if alt:
+            key_combo += Keys.ALT
+        if shift:
+            key_combo += Keys.SHIFT
+
+        if character.upper() in KEY_NAMES:
+            key_combo += getattr(Keys, character.upper())  # Any button named above
+        else:
+            key_combo += character  # Any alphanumeric
+
+        body = await self._find_element("body", "tag")
+        await self._command("POST", f"/element/{body}/value", {"text": key_combo})
+
+    async def scroll_page(self, direction="down"):
+        """ Scroll web page up, down, left, right """
+        dimensions = await self._command("GET", "/window/rect")
+        offsets = {
+            "down": (0, dimensions["height"]),
+            "up": (0, -dimensions["height"]),
+            "right": (dimensions["width"], 0),
+            "left": (-dimensions["width"], 0),
+        }
+        if direction not in offsets:
+            logging.error("Invalid direction (up/down/right/left)")
+            return
+        await self.execute_script("window.scrollBy(arguments[0], arguments[1]);", *offsets[direction])
+
+    async def scroll_to_element(self, element_id, element_type):
+        """ Move element until in view """
+        element = await self._find_element(element_id, element_type)
+        await self.execute_script("arguments[0].scrollIntoView();", {W3C_ELEMENT: element})
+
+    async def page_navigation(self, command):
+        """ Various actions outside the web page: "back", "forward" or "refresh" """
+        if command in ("back", "forward", "refresh"):
+            await self._command("POST", f"/{command}", {})
+
+    async def is_alive(self):
+        """ Check whether the browser still responds to commands """
+        try:
+            await self._command("GET", "/window")
+        except Exception:
+            return False
+        return True
+
+    async def close(self):
+        """ End the browser session, and stop the browser driver """
+
+        try:
+            if self.session_id:
+                await self._request("DELETE", f"/session/{self.session_id}")
+        except Exception:
+            logging.debug("Error ending browser session", exc_info=True)
+        finally:
+            self.session_id = None
+            if self._driver_process and self._driver_process.returncode is None:
+                self._driver_process.terminate()
+                await self._driver_process.wait()
+            if self._own_http and self._http:
+                await self._http.close()
@@ -0,0 +1,528 @@
+""" JavaScript which runs inside the web page, and helpers to build the arguments passed to it
+
+    The scripts are sent with execute_script()/execute_async_script(), so each one is the body of a function, with
+    its arguments available through "arguments".
+"""
+
+# Element types understood by LOCATE. Same names as web_automation.PATH_TYPES
+ELEMENT_TYPES = ("id", "xpath", "link text", "partial link text", "name", "class", "css selector", "tag")
+
+# Conditions understood by WAIT_FOR_CONDITIONS
+CONDITIONS = ("present", "absent", "visible", "hidden", "text", "attribute", "url_changes", "url_contains")
+
+# Defines waLocate(type, value): array of elements matching the locator, in document order,
+# waVisible(element) and waText(element), which follow the same rules as Selenium / WebAutomation.get_text(),
+# and waInView(element): whether the middle of an element is in the viewport, where the mouse can reach it
+LOCATE = """
+var waLocate = function (type, value) {
+    var found = [], i, nodes;
+    switch (type) {
+        case "id":
+            nodes = document.querySelectorAll("[id=\\"" + CSS.escape(value) + "\\"]");
+            break;
+        case "xpath":
+            var snapshot = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (i = 0; i < snapshot.snapshotLength; i++) {
+                found.push(snapshot.snapshotItem(i));
+            }
+            return found;
+        case "link text":
+        case "partial link text":
+            nodes = document.getElementsByTagName("a");
+            for (i = 0; i < nodes.length; i++) {
+                var text = waText(nodes[i]);
+                if (type === "link text" ? text === value : text.indexOf(value) >= 0) {
+                    found.push(nodes[i]);
+                }
+            }
+            return found;
+        case "name":
+            nodes = document.getElementsByName(value);
+            break;
+        case "class":
+            nodes = document.getElementsByClassName(value);
+            break;
+        case "css selector":
+            nodes = document.querySelectorAll(value);
+            break;
+        case "tag":
+            nodes = document.getElementsByTagName(value);
+            break;
+        default:
+            throw new Error("Invalid element type provided: " + type);
+    }
+    return Array.prototype.slice.call(nodes);
+};
+var waVisible = function (element) {
+    if (!(element.offsetWidth || element.offsetHeight || element.getClientRects().length)) {
+        return false;
+    }
+    return window.getComputedStyle(element).visibility !== "hidden";
+};
+var waInView = function (element) {
+    var rect = element.getBoundingClientRect();
+    var x = rect.left + rect.width / 2, y = rect.top + rect.height / 2;
+    return x >= 0 && y >= 0 && x < window.innerWidth && y < window.innerHeight;
+};
+var waText = function (element) {
+    var value = element.value;
+    if (value === undefined || value === null) {
+        value = element.getAttribute("value");
+    }
+    if (value !== undefined && value !== null) {
+        return String(value);
+    }
+    if (!waVisible(element)) {
+        return "";
+    }
+    // Lay out innerText the way Selenium does: no spaces at the ends of lines, one line break between blocks (innerText
+    // adds a blank line around paragraphs), and non-breaking spaces as plain spaces. Unlike Selenium, blank lines from
+    // consecutive <br> tags are removed too
+    return (element.innerText || "").replace(/[ \\t\\r]+\\n/g, "\\n").replace(/\\n{2,}/g, "\\n")
+        .replace(/^[ \\t\\r\\n]+|[ \\t\\r\\n]+$/g, "").replace(/\\u00a0/g, " ");
+};
+"""
+
+# Waits until conditions are met, reacting to DOM changes through a MutationObserver
+# Args: conditions (list of dicts from condition()), match ("all"/"any"), timeout (milliseconds)
+# Returns: {"met": bool, "results": list of bool, one per condition}
+WAIT_FOR_CONDITIONS = LOCATE + """
+var conditions = arguments[0], match = arguments[1], timeout = arguments[2];
+var done = arguments[arguments.length - 1];
+
+function checkOne(cond) {
+    if (cond.condition === "url_changes") {
+        return window.location.href !== cond.value;
+    }
+    if (cond.condition === "url_contains") {
+        return window.location.href.indexOf(cond.value) >= 0;
+    }
+    var elements = waLocate(cond.element_type, cond.element_id);
+    switch (cond.condition) {
+        case "present":
+            return elements.length > 0;
+        case "absent":
+            return elements.length === 0;
+        case "visible":
+            return elements.some(waVisible);
+        case "hidden":
+            return !elements.some(waVisible);
+        case "text":
+            return elements.length > 0 && waText(elements[0]) === cond.value;
+        case "attribute":
+            if (!elements.length) {
+                return false;
+            }
+            var attribute = elements[0].getAttribute(cond.name);
+            if (attribute === null && elements[0][cond.name] !== undefined) {
+                attribute = elements[0][cond.name];
+            }
+            return attribute !== null && new RegExp(cond.value).test(String(attribute));
+    }
+    throw new Error("Invalid condition: " + cond.condition);
+}
+
+function check() {
+    var results = conditions.map(checkOne);
+    var met = match === "any" ? results.some(Boolean) : results.every(Boolean);
+    return {"met": met, "results": results};
+}
+
+var state = check();
+if (state.met || timeout <= 0) {
+    done(state);
+    return;
+}
+
+var finished = false, observer, poll, timer;
+function finish(result) {
+    if (finished) {
+        return;
+    }
+    finished = true;
+    observer.disconnect();
+    clearInterval(poll);
+    clearTimeout(timer);
+    done(result);
+}
+function recheck() {
+    var result = check();
+    if (result.met) {
+        finish(result);
+    }
+}
+
+observer = new MutationObserver(recheck);
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+// Catches changes which are not DOM mutations. Eg: style sheets loading, history.pushState()
+poll = setInterval(recheck, 250);
+timer = setTimeout(function () { finish(check()); }, timeout);
+"""
+
+# Tracks network and DOM activity on the page, in window.__waIdle: {"pending": fetch/XHR requests in flight,
+# "last": performance.now() of the last activity}. Safe to run more than once. Added to every new document in Chrome,
+# so requests made while the page loads are counted; elsewhere it's added by WAIT_FOR_IDLE, and activity from before
+# then is taken from the Resource and Navigation Timing APIs
+IDLE_MONITOR = """
+if (!window.__waIdle) {
+    (function () {
+        var monitor = window.__waIdle = {"pending": 0, "last": 0};
+        var busy = function () {
+            monitor.last = performance.now();
+        };
+        var started = function () {
+            monitor.pending++;
+            busy();
+        };
+        var finished = function () {
+            monitor.pending = Math.max(0, monitor.pending - 1);
+            busy();
+        };
+
+        performance.getEntriesByType("resource").concat(performance.getEntriesByType("navigation"))
+            .forEach(function (entry) {
+                monitor.last = Math.max(monitor.last, entry.loadEventEnd || entry.responseEnd || 0);
+            });
+
+        if (window.fetch) {
+            var fetch = window.fetch;
+            window.fetch = function () {
+                started();
+                var request;
+                try {
+                    request = fetch.apply(this, arguments);
+                } catch (error) {
+                    finished();
+                    throw error;
+                }
+                request.then(finished, finished);
+                return request;
+            };
+        }
+        var send = XMLHttpRequest.prototype.send;
+        XMLHttpRequest.prototype.send = function () {
+            started();
+            this.addEventListener("loadend", finished);
+            try {
+                return send.apply(this, arguments);
+            } catch (error) {
+                this.removeEventListener("loadend", finished);
+                finished();
+                throw error;
+            }
+        };
+
+        new MutationObserver(busy).observe(document,
+            {childList: true, subtree: true, attributes: true, characterData: true});
+        try {  // Catches requests which weren't counted, such as images, and those started before this ran
+            new PerformanceObserver(busy).observe({entryTypes: ["resource"]});
+        } catch (error) {
+            // Browsers without PerformanceObserver
+        }
+    })();
+}
+"""
+
+# Waits until the page has loaded, has no fetch/XHR requests in flight, and has had no network or DOM activity for
+# "idle" milliseconds
+# Args: idle (milliseconds), timeout (milliseconds)
+# Returns: {"met": bool, "pending": requests still in flight}
+WAIT_FOR_IDLE = IDLE_MONITOR + """
+var idle = arguments[0], timeout = arguments[1], done = arguments[arguments.length - 1];
+var monitor = window.__waIdle, start = performance.now();
+
+function check() {
+    var now = performance.now(), quiet = now - monitor.last;
+    var settled = document.readyState === "complete" && !monitor.pending;
+    if (settled && quiet >= idle) {
+        done({"met": true, "pending": 0});
+    } else if (now - start >= timeout) {
+        done({"met": false, "pending": monitor.pending});
+    } else {
+        // Sleep until the page could next be idle, checking often while it's still busy
+        setTimeout(check, Math.max(10, Math.min(settled ? idle - quiet : 50, timeout - (now - start))));
+    }
+}
+check();
+"""
+
+
+# Reads the text of many elements, following the same rules as WebAutomation.get_text()
+# Args: locators (list of [element_id, element_type])
+# Returns: {"texts": list of text (null where not found), "missing": list of indexes of locators not found}
+READ_TEXTS = LOCATE + """
+var texts = [], missing = [];
+arguments[0].forEach(function (locator, index) {
+    var elements = waLocate(locator[1], locator[0]);
+    if (elements.length) {
+        texts.push(waText(elements[0]));
+    } else {
+        texts.push(null);
+        missing.push(index);
+    }
+});
+return {"texts": texts, "missing": missing};
+"""
+
+
+def condition(kind, element_id=None, element_type=None, value=None, name=None):
+    """ Build one condition for WebAutomation.wait_for_conditions()
+
+        Args:
+            kind (str): One of:
+                "present" / "absent": element exists / does not exist
+                "visible" / "hidden": element is displayed / is not displayed (or does not exist)
+                "text": element's text (or textbox value) equals "value"
+                "attribute": element's "name" attribute matches the regular expression "value"
+                "url_changes": URL is no longer "value"
+                "url_contains": URL contains "value"
+            element_id (str): Name/ID/XPATH/etc of element. Not used for URL conditions
+            element_type (str): Valid element type (see ELEMENT_TYPES). Not used for URL conditions
+            value (str): Expected text, attribute pattern or URL
+            name (str): Attribute name, for "attribute"
+
+        Returns:
+            dict to pass to the browser
+    """
+
+    assert kind in CONDITIONS, "Invalid condition provided"
+    if not kind.startswith("url_"):
+        assert element_type in ELEMENT_TYPES, "Invalid element type provided"
+    if kind == "attribute":
+        assert name, "Attribute name is required"
+    return {"condition": kind, "element_id": element_id, "element_type": element_type, "value": value, "name": name}
+
+
+def split_locators(locators):
+    """ Accept locators as a list of (element_id, element_type) pairs, or a dict of them
+
+        Returns:
+            tuple: (keys, pairs). keys is the list of dict keys, or None when given a list
+    """
+    keys = list(locators) if isinstance(locators, dict) else None
+    pairs = [tuple(locators[key]) for key in keys] if keys is not None else [tuple(pair) for pair in locators]
+    for _, element_type in pairs:
+        assert element_type in ELEMENT_TYPES, "Invalid element type provided"  # Notify about user error
+    return keys, pairs
+
+
+# Finds every element matching a locator, without waiting
+# Args: element_id, element_type
+# Returns: list of elements
+FIND_ALL = LOCATE + """
+return waLocate(arguments[1], arguments[0]);
+"""
+
+# Counts the elements matching each locator, without waiting
+# Args: locators (list of [element_id, element_type])
+# Returns: list of counts
+COUNT_ALL = LOCATE + """
+return arguments[0].map(function (locator) {
+    return waLocate(locator[1], locator[0]).length;
+});
+"""
+
+# Sets the values of many form fields, firing the events a user's input would. Frameworks like React keep their own
+# copy of an input's value, so text is set through the browser's native value setter, which they can't intercept
+# Args: fields (list of [element_id, element_type, value]). value is text, true/false for checkboxes and radio
+#       buttons, or an option's value or text (or a list of them) for drop downs
+# Returns: list of indexes of fields not found
+FILL_FORM = LOCATE + """
+function fire(element, type) {
+    element.dispatchEvent(new Event(type, {bubbles: true}));
+}
+function setValue(element, value) {
+    var prototype = element instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    var descriptor = Object.getOwnPropertyDescriptor(prototype, "value");
+    if (descriptor && descriptor.set && element instanceof prototype.constructor) {
+        descriptor.set.call(element, value);
+    } else {
+        element.value = value;
+    }
+}
+
+var missing = [];
+arguments[0].forEach(function (field, index) {
+    var element = waLocate(field[1], field[0])[0], value = field[2];
+    if (!element) {
+        missing.push(index);
+        return;
+    }
+    var type = (element.type || "").toLowerCase();
+    if (type === "checkbox" || type === "radio") {
+        if (element.checked !== Boolean(value)) {
+            if (value || type === "checkbox") {
+                element.click();  // Fires click, input and change, and unticks the rest of a radio group
+            } else {
+                element.checked = false;
+                fire(element, "input");
+                fire(element, "change");
+            }
+        }
+        return;
+    }
+    if (element.tagName.toLowerCase() === "select") {
+        var wanted = [].concat(value).map(String);
+        Array.prototype.forEach.call(element.options, function (option) {
+            option.selected = wanted.indexOf(option.value) >= 0 || wanted.indexOf(option.text.trim()) >= 0;
+        });
+    } else if (element.isContentEditable) {
+        element.textContent = String(value);
+    } else {
+        setValue(element, String(value));
+    }
+    fire(element, "input");
+    fire(element, "change");
+});
+return missing;
+"""
+
+# Finds the form fields to type into, and how each one is filled
+# Args: locators (list of [element_id, element_type])
+# Returns: list of [element, kind, checked, in view] per locator, or null where not found.
+#          kind is "checkbox", "radio", "select" or "text"
+FORM_FIELDS = LOCATE + """
+return arguments[0].map(function (locator) {
+    var element = waLocate(locator[1], locator[0])[0];
+    if (!element) {
+        return null;
+    }
+    var type = (element.type || "").toLowerCase();
+    var kind = type === "checkbox" || type === "radio" ? type : "text";
+    if (element.tagName.toLowerCase() === "select") {
+        kind = "select";
+    }
+    return [element, kind, Boolean(element.checked), waInView(element)];
+});
+"""
+
+# Finds the first element matching each locator, without waiting
+# Args: locators (list of [element_id, element_type])
+# Returns: list of [element, in view], null where not found
+FIND_FIRST = LOCATE + """
+return arguments[0].map(function (locator) {
+    var element = waLocate(locator[1], locator[0])[0];
+    return element ? [element, waInView(element)] : null;
+});
+"""
+
+# Scrolls an element to the middle of the viewport, unless the mouse can already reach it
+# Args: element
+SCROLL_INTO_VIEW = LOCATE + """
+if (!waInView(arguments[0])) {
+    arguments[0].scrollIntoView({block: "center", inline: "center"});
+}
+"""
+
+# Copies the page's elements for snapshot.DomSnapshot. The text inside scripts and styles is left out
+# Returns: {"url": page address, "root": element}, where each element is
+#          [tag, {attribute: value}, value (as read by waText, or null), visible, [child elements and text]]
+SNAPSHOT = LOCATE + """
+var skip = {"script": true, "style": true, "noscript": true, "template": true};
+function copy(element) {
+    var attributes = {}, nodes = [], i, child;
+    for (i = 0; i < element.attributes.length; i++) {
+        attributes[element.attributes[i].name] = element.attributes[i].value;
+    }
+    var tag = element.localName.toLowerCase();
+    if (!skip[tag]) {
+        for (child = element.firstChild; child; child = child.nextSibling) {
+            if (child.nodeType === Node.ELEMENT_NODE) {
+                nodes.push(copy(child));
+            } else if (child.nodeType === Node.TEXT_NODE || child.nodeType === Node.CDATA_SECTION_NODE) {
+                nodes.push(child.data);
+            }
+        }
+    }
+    var value = element.value;
+    if (value === undefined || value === null) {
+        value = element.getAttribute("value");
+    }
+    return [tag, attributes, value === undefined || value === null ? null : String(value), waVisible(element), nodes];
+}
+return {"url": window.location.href, "root": copy(document.documentElement)};
+"""
+
+# Records console messages and uncaught errors in the page (added the first time this runs on a page), and takes
+# what was recorded since the last call
+# Args: limit (most messages kept in the page between calls. The oldest are dropped, and counted)
+# Returns: {"entries": list of [level, message, timestamp in milliseconds], "dropped": count}
+DRAIN_CONSOLE = """
+var limit = arguments[0], hook = window.__waConsole;
+if (!hook) {
+    hook = window.__waConsole = {"entries": [], "dropped": 0};
+    var record = function (level, message) {
+        if (hook.entries.length >= limit) {
+            hook.entries.shift();
+            hook.dropped++;
+        }
+        hook.entries.push([level, message, Date.now()]);
+    };
+    var describe = function (value) {
+        if (typeof value === "object" && value !== null && !(value instanceof Error)) {
+            try {
+                return JSON.stringify(value);
+            } catch (error) {
+                // Circular, or otherwise can't be written as JSON
+            }
+        }
+        return String(value);
+    };
+    var levels = {"debug": "DEBUG", "log": "INFO", "info": "INFO", "warn": "WARNING", "error": "SEVERE"};
+    Object.keys(levels).forEach(function (method) {
+        var original = console[method];
+        console[method] = function () {
+            record(levels[method], Array.prototype.map.call(arguments, describe).join(" "));
+            return original.apply(console, arguments);
+        };
+    });
+    window.addEventListener("error", function (event) {
+        record("SEVERE", event.message + " (" + event.filename + ":" + event.lineno + ")");
+    });
+    window.addEventListener("unhandledrejection", function (event) {
+        record("SEVERE", "Uncaught (in promise) " + describe(event.reason));
+    });
+}
+var result = {"entries": hook.entries, "dropped": hook.dropped};
+hook.entries = [];
+hook.dropped = 0;
+return result;
+"""
+
+# Reads how long the page took to load, from the Navigation and Resource Timing APIs. Times are in milliseconds from
+# the start of navigation
+# Args: slowest (number of resources to return)
+# Returns: {"url", "navigation", "ttfb", "dom_content_loaded", "load" (0 if not finished), "transfer_size",
+#           "resources": slowest resources first, as {"name", "type", "start", "duration", "size"}}
+PAGE_TIMING = """
+var slowest = arguments[0], done = arguments[arguments.length - 1];
+function report() {
+    var entry = performance.getEntriesByType("navigation")[0], result = {"url": window.location.href};
+    if (entry) {
+        result.navigation = entry.type;
+        result.ttfb = entry.responseStart - entry.startTime;
+        result.dom_content_loaded = entry.domContentLoadedEventEnd - entry.startTime;
+        result.load = entry.loadEventEnd ? entry.loadEventEnd - entry.startTime : 0;
+        result.transfer_size = entry.transferSize || 0;
+    } else {  // Browsers without Navigation Timing level 2
+        var timing = performance.timing;
+        result.navigation = ["navigate", "reload", "back_forward"][performance.navigation.type] || "navigate";
+        result.ttfb = timing.responseStart - timing.navigationStart;
+        result.dom_content_loaded = timing.domContentLoadedEventEnd - timing.navigationStart;
+        result.load = timing.loadEventEnd ? timing.loadEventEnd - timing.navigationStart : 0;
+        result.transfer_size = 0;
+    }
+    result.resources = performance.getEntriesByType("resource").map(function (resource) {
+        return {"name": resource.name, "type": resource.initiatorType, "start": resource.startTime,
+                "duration": resource.duration, "size": resource.transferSize || 0};
+    }).sort(function (first, second) {
+        return second.duration - first.duration;
+    }).slice(0, slowest);
+    done(result);
+}
+if (document.readyState === "complete") {
+    setTimeout(report, 0);  // loadEventEnd is only set once every load event handler has run
+} else {
+    report();  // Still loading, eg: with the "eager" page load strategy
+}
+"""
@@ -0,0 +1,177 @@
+""" Watches the processes behind a WebAutomation browser, and makes sure none are left running
+
+    Every browser launched is shut down when its WebAutomation object is closed, leaves a "with" block, or at the
+    latest when the interpreter exits. Its driver and browser processes are then waited for, and killed if they linger.
+
+    psutil is optional. With it, memory, CPU time and open handles can be read for the driver and everything it
+    started, browsers can be recycled when they use too much memory, and leftover processes are reaped. Without it,
+    shutting down is left to the driver's quit(). It is only imported when first needed, to keep importing the wrapper
+    quick.
+
+    Example:
+        web = WebAutomation(max_navigations=500, max_memory=1500)  # Relaunched every 500 pages, or over 1.5 GB
+        print(web.lifecycle.usage())
+"""
+
+import atexit
+import logging
+import weakref
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+ResourceUsage = namedtuple("ResourceUsage", "processes rss cpu_time cpu_percent handles")
+ResourceUsage.__doc__ = """ Resources used by a browser driver and every process it started
+
+    processes: Number of processes
+    rss: Resident memory, in bytes
+    cpu_time: CPU time used since they started, in seconds
+    cpu_percent: CPU used since the last usage() (of one core, so may be over 100). 0 the first time
+    handles: Open file descriptors (POSIX) or handles (Windows)
+"""
+
+_running = weakref.WeakSet()  # WebAutomation objects whose browser is running, closed at exit
+
+
+def _psutil():
+    """ The psutil module, or None if it isn't installed. See above """
+    try:
+        import psutil  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    return psutil
+
+
+def track(web):
+    """ Note a browser was launched, so it is closed at exit if nothing else closes it """
+    _running.add(web)
+
+
+def untrack(web):
+    """ Note a browser was closed """
+    _running.discard(web)
+
+
+@atexit.register
+def _close_running():
+    """ Close every browser still running when the interpreter exits """
+    for web in list(_running):
+        try:
+            web.close()
+        except Exception:
+            logging.debug("Error closing browser at exit", exc_info=True)
+
+
+def origin(url):
+    """ Origin (scheme://host:port) of a web page's URL, or None for pages such as about:blank """
+    parts = urlsplit(url or "")
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def driver_pid(driver):
+    """ Process ID of a Selenium driver's local service (geckodriver, chromedriver), or None if not known """
+    process = getattr(getattr(driver, "service", None), "process", None)
+    return getattr(process, "pid", None)
+
+
+class BrowserLifecycle:
+    """ Resource usage and recycling of one WebAutomation object's browser """
+    def __init__(self, web, max_navigations=None, max_memory=None):
+        """ Setup requirements
+            Args:
+                web (WebAutomation): Browser to watch
+                max_navigations (int): Optional, relaunch the browser after this many pages have been opened
+                max_memory (float): Optional, relaunch the browser once its processes use this many MB. Needs psutil
+        """
+        assert max_memory is None or _psutil() is not None, "psutil is needed to recycle browsers by memory use"
+        self.web = web
+        self.max_navigations = max_navigations
+        self.max_memory = max_memory
+        self.navigations = 0  # Pages opened since the browser was launched
+        self.origins = set()  # Origins of the pages opened, whose cookies and storage a pool clears between sessions
+        self.recycles = 0
+        self._processes = {}  # pid: psutil.Process, kept so cpu_percent() has something to compare with
+
+    def processes(self):
+        """ The driver's process and everything it started, such as the browser. Empty without psutil, or for a
+            browser which wasn't launched here
+        """
+
+        pid = driver_pid(self.web._selenium_driver) if self.web.started else None  # pylint: disable=protected-access
+        psutil = _psutil() if pid is not None else None
+        if psutil is None:
+            return []
+        try:
+            driver = self._processes.get(pid) or psutil.Process(pid)
+            found = [driver] + driver.children(recursive=True)
+        except psutil.Error:
+            return []
+        self._processes = {process.pid: self._processes.get(process.pid, process) for process in found}
+        return list(self._processes.values())
+
+    def usage(self):
+        """ Resources used by the driver and browser processes
+
+            Returns:
+                ResourceUsage, or None without psutil or for a browser which wasn't launched here
+        """
+
+        processes = self.processes()
+        if not processes:
+            return None
+        psutil = _psutil()
+        rss = cpu_time = cpu_percent = handles = 0
+        for process in processes:
+            try:
+                with process.oneshot():
+                    rss += process.memory_info().rss
+                    times = process.cpu_times()
+                    cpu_time += times.user + times.system
+                    cpu_percent += process.cpu_percent()
+                    handles += process.num_handles() if psutil.WINDOWS else process.num_fds()
+            except psutil.Error:  # Exited, or not ours to read
+                continue
+        return ResourceUsage(len(processes), rss, cpu_time, cpu_percent, handles)
+
+    def navigated(self, url=None):
+        """ Count a page being opened, and note its origin """
+        self.navigations += 1
+        if origin(url):
+            self.origins.add(origin(url))
+
+    def worn_out(self):
+        """ Whether the browser has opened max_navigations pages, or uses more than max_memory """
+        if self.max_navigations is not None and self.navigations >= self.max_navigations:
+            return True
+        if self.max_memory is not None:
+            usage = self.usage()
+            return usage is not None and usage.rss >= self.max_memory * 1024 * 1024
+        return False
+
+    def launched(self):
+        """ Reset the counters for a newly launched browser """
+        self.navigations = 0
+        self.origins = set()
+        self._processes = {}
+
+    @staticmethod
+    def reap(processes, timeout=5):
+        """ Wait for processes to exit after the driver quit, then kill any which haven't
+
+            Returns:
+                int: Number of processes killed
+        """
+        if not processes:
+            return 0
+        psutil = _psutil()
+        _, alive = psutil.wait_procs(processes, timeout=timeout)
+        for process in alive:
+            try:
+                process.kill()
+            except psutil.Error:
+                pass
+        if alive:
+            psutil.wait_procs(alive, timeout=1)
+            logging.warning("Killed %s browser processes which didn't exit", len(alive))
+        return len(alive)
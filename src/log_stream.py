@@ -0,0 +1,203 @@
+""" Collects browser console messages and browser driver logs in the background, while automation runs
+
+    Chrome's logs are read through the driver (get_log), in the background. Firefox's driver has no logs to read, so a
+    hook which records console messages and uncaught errors is added to each page instead. Reading the hook means
+    running a script in the page, which would dismiss an open alert, and would queue behind a long wait. So it is never
+    done in the background: only on the calling thread, when WebAutomation opens or leaves a page, on drain(), and on
+    stop(). It is skipped while an alert is open. Messages logged on a page before the hook is added, just after the
+    page loads, aren't seen.
+
+    Example:
+        collector = web.collect_logs(level="WARNING")
+        ...
+        for entry in collector.drain():
+            print(entry.level, entry.message)
+"""
+
+import logging
+import threading
+from collections import deque, namedtuple
+from time import sleep, time
+from selenium.common import exceptions
+from . import browser_scripts
+
+LogEntry = namedtuple("LogEntry", "source level message timestamp")
+LogEntry.__doc__ = """ One log message
+
+    source: "browser" (console messages and page errors) or "driver" (the browser driver's own log)
+    level: "DEBUG", "INFO", "WARNING" or "SEVERE"
+    message: Text of the message
+    timestamp: time() when the message was logged
+"""
+
+# Log levels, lowest first. FINE and ALL come from Chrome's driver, and are treated as DEBUG
+LEVELS = {"ALL": 0, "DEBUG": 0, "FINE": 0, "INFO": 1, "WARNING": 2, "SEVERE": 3}
+
+
+class LogCollector:
+    """ Moves log messages out of the browser into a bounded queue. In the background for Chrome, see above """
+    def __init__(self, web, level="INFO", sources=("browser", "driver"), interval=1.0, size=10000):
+        """ Setup requirements
+            Args:
+                web (WebAutomation): Browser to collect from
+                level (str): Lowest level kept. See LEVELS
+                sources (tuple): "browser" and/or "driver". Only Chrome has driver logs
+                interval (float): Seconds between collections
+                size (int): Most messages queued. The oldest are dropped (and counted) when full
+        """
+
+        assert level.upper() in LEVELS, "Invalid log level provided"
+        self.web = web
+        self.level = LEVELS[level.upper()]
+        self.sources = tuple(sources)
+        self.interval = interval
+        self.in_page = web.browser_name != "chrome"  # Read from a hook in the page, on the calling thread only
+        self.dropped = 0  # Messages dropped because the queue, or the page's own buffer, was full
+        self.collected = 0
+        self._entries = deque(maxlen=size)
+        self._changed = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._active = False
+
+    def start(self):
+        """ Start collecting. In the background for driver logs, otherwise when asked. See this module's description """
+        if not self._active:
+            self._active = True
+            if not self.in_page:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="log collector", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        """ Collect once more, then stop collecting """
+        if self._active:
+            self._active = False
+            if self._thread is not None:
+                self._stop.set()
+                self._thread.join()  # Collects once more as it finishes
+                self._thread = None
+            else:
+                self.collect()
+        with self._changed:
+            self._changed.notify_all()
+
+    @property
+    def running(self):
+        """ Whether messages are being collected """
+        return self._active
+
+    def _run(self):
+        """ Background thread started by start(), for driver logs """
+        while not self._stop.wait(self.interval):
+            self.collect()
+        self.collect()
+
+    def collect(self):
+        """ Move any new messages from the browser into the queue. Done every interval by the background thread, or
+            by WebAutomation around page changes for in-page hooks
+
+            Returns:
+                int: Number of messages queued
+        """
+
+        if not self.web.started:  # Don't launch a lazy browser just to read its logs
+            return 0
+        try:
+            entries, dropped = self._read()
+        except Exception:
+            logging.debug("Could not collect browser logs", exc_info=True)
+            return 0
+
+        entries = [entry for entry in entries if LEVELS.get(entry.level, 1) >= self.level]
+        with self._changed:
+            self.dropped += dropped
+            for entry in entries:
+                if len(self._entries) == self._entries.maxlen:
+                    self.dropped += 1
+                self._entries.append(entry)
+            self.collected += len(entries)
+            if entries:
+                self._changed.notify_all()
+        return len(entries)
+
+    def _read(self):
+        """ New log messages from the browser
+
+            Returns:
+                tuple: (list of LogEntry, number of messages the page dropped before they could be read)
+        """
+
+        driver = self.web.selenium_driver
+        entries = []
+        dropped = 0
+        if self.web.browser_name == "chrome":
+            for source in self.sources:
+                for entry in driver.get_log(source):
+                    entries.append(LogEntry(source, entry.get("level", "INFO").upper(), entry.get("message", ""),
+                                            entry.get("timestamp", time() * 1000) / 1000))
+        elif "browser" in self.sources:
+            try:
+                driver.switch_to.alert  # pylint: disable=pointless-statement
+                return entries, dropped  # Running a script now would dismiss the alert
+            except exceptions.NoAlertPresentException:
+                pass
+            result = driver.execute_script(browser_scripts.DRAIN_CONSOLE, self._entries.maxlen)
+            dropped = result["dropped"]
+            entries = [LogEntry("browser", level, message, timestamp / 1000)
+                       for level, message, timestamp in result["entries"]]
+        return entries, dropped
+
+    def drain(self):
+        """ Take every queued message, after collecting from the page's hook if there is one
+
+            Returns:
+                list of LogEntry, oldest first
+        """
+        if self.in_page and self.running:
+            self.collect()
+        with self._changed:
+            entries = list(self._entries)
+            self._entries.clear()
+        return entries
+
+    def stream(self, timeout=None):
+        """ Yield messages as they are collected, until the collector is stopped. An in-page hook is read on the
+            calling thread, every interval while waiting, so a timeout is needed then
+
+            Args:
+                timeout (float): Also stop after this many seconds without a new message. Optional for driver logs
+
+            Yields:
+                LogEntry, oldest first
+        """
+        assert timeout is not None or not self.in_page, "Reading an in-page hook needs a timeout"
+        while True:
+            if self.in_page:
+                self._poll(timeout)
+            with self._changed:
+                if not self._entries and self.running and not self.in_page:
+                    self._changed.wait(timeout)
+                if not self._entries:
+                    return
+                entry = self._entries.popleft()
+            yield entry
+
+    def _poll(self, timeout):
+        """ Read the page's hook every interval, until there are messages queued or timeout seconds have passed """
+        deadline = time() + timeout
+        while self.running and not self._entries:
+            self.collect()
+            if self._entries or time() >= deadline:
+                return
+            sleep(min(self.interval, max(0, deadline - time())))
+
+    def stats(self):
+        """ Counters
+
+            Returns:
+                dict: collected (messages kept since starting), dropped, queued (waiting to be taken)
+        """
+        with self._changed:
+            return {"collected": self.collected, "dropped": self.dropped, "queued": len(self._entries)}
@@ -0,0 +1,157 @@
+""" Page load timings, read from the browser's Navigation and Resource Timing APIs, and statistics over many of them
+
+    Example:
+        aggregator = TimingAggregator()
+        for _ in range(100):
+            web.open_url("http://localhost:5000/long", timing=aggregator)
+        print(aggregator.report())
+"""
+
+import math
+import threading
+from collections import namedtuple
+from urllib.parse import urlsplit, urlunsplit
+
+PageTiming = namedtuple("PageTiming", "url navigation ttfb dom_content_loaded load transfer_size resources")
+PageTiming.__doc__ = """ How long a page took to load. Times are in seconds from the start of navigation
+
+    url: Address of the page
+    navigation: "navigate", "reload" or "back_forward"
+    ttfb: Time to the first byte of the response
+    dom_content_loaded: Time until the DOMContentLoaded event finished
+    load: Time until the load event finished, or None if the page hadn't finished loading
+    transfer_size: Bytes transferred for the page itself
+    resources: The slowest resources, slowest first. dicts of name (URL), type (eg: "script"), start, duration
+               (seconds) and size (bytes transferred, 0 if cached or cross origin)
+"""
+
+METRICS = ("ttfb", "dom_content_loaded", "load")
+
+
+def page_timing(result):
+    """ PageTiming from the result of browser_scripts.PAGE_TIMING """
+    return PageTiming(
+        result["url"],
+        result["navigation"],
+        result["ttfb"] / 1000,
+        result["dom_content_loaded"] / 1000,
+        result["load"] / 1000 if result["load"] else None,
+        result["transfer_size"],
+        [dict(resource, start=resource["start"] / 1000, duration=resource["duration"] / 1000)
+         for resource in result["resources"]],
+    )
+
+
+class StreamingHistogram:
+    """ Approximate percentiles of a stream of positive numbers, in constant memory
+
+        Values are counted in buckets whose bounds grow by a fixed ratio, so every percentile is within "precision"
+        (relative) of the true value, however many values are added.
+    """
+    def __init__(self, precision=0.01, smallest=1e-6):
+        """ Setup requirements
+            Args:
+                precision (float): Relative error allowed. 0.01 = 1%
+                smallest (float): Values below this are counted as this
+        """
+        self.precision = precision
+        self.smallest = smallest
+        self._log_ratio = math.log(1 + 2 * precision)
+        self._buckets = {}  # Bucket number: count
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """ Count one value """
+        value = max(value, self.smallest)
+        bucket = int(math.log(value / self.smallest) / self._log_ratio)
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, fraction):
+        """ Nearest rank percentile, like tracing.percentile(). Eg: percentile(0.95). None if empty """
+        if not self.count:
+            return None
+        rank = min(self.count, max(1, math.ceil(fraction * self.count)))
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                # Middle of the bucket, clamped to the values actually seen
+                middle = self.smallest * math.exp((bucket + 0.5) * self._log_ratio)
+                return min(self.max, max(self.min, middle))
+        return self.max
+
+    def stats(self):
+        """ dict of count, mean, min, p50, p95, p99, max """
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+def _page_key(url):
+    """ Default grouping for TimingAggregator: the URL without its query string or fragment """
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
+
+class TimingAggregator:
+    """ Percentiles of each page's load timings, over a long run, without keeping every sample """
+    def __init__(self, key=_page_key, precision=0.01):
+        """ Setup requirements
+            Args:
+                key (function): Groups timings. Called with the page URL. Defaults to the URL without its query string
+                precision (float): Relative error allowed in percentiles. See StreamingHistogram
+        """
+        self.key = key
+        self.precision = precision
+        self._pages = {}  # key: {metric: StreamingHistogram}
+        self._lock = threading.Lock()
+
+    def add(self, timing):
+        """ Count a PageTiming """
+        with self._lock:
+            histograms = self._pages.setdefault(
+                self.key(timing.url), {metric: StreamingHistogram(self.precision) for metric in METRICS})
+            for metric in METRICS:
+                value = getattr(timing, metric)
+                if value is not None:
+                    histograms[metric].add(value)
+
+    def summary(self):
+        """ Statistics for each page
+
+            Returns:
+                dict: {page: {metric: stats}}. Metrics are ttfb, dom_content_loaded and load.
+                      stats is a dict of count, mean, min, p50, p95, p99, max (seconds)
+        """
+        with self._lock:
+            return {page: {metric: histogram.stats() for metric, histogram in histograms.items()}
+                    for page, histograms in sorted(self._pages.items())}
+
+    def report(self):
+        """ Summary as a text table """
+
+        lines = [f"{'page':<50} {'metric':<20} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+        for page, metrics in self.summary().items():
+            for metric, stats in metrics.items():
+                if stats["count"]:
+                    lines.append(f"{page:<50} {metric:<20} {stats['count']:>7} {stats['p50'] * 1000:>9.1f} "
+                                 f"{stats['p95'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f}")
+        return "\n".join(lines)
+
+    def reset(self):
+        """ Forget every timing """
+        with self._lock:
+            self._pages.clear()
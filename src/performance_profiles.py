@@ -0,0 +1,216 @@
+""" Named performance profiles for WebAutomation(performance_profile=...)
+
+    A profile sets the page load strategy, blocks resource types and URL patterns the automation never looks at, and
+    switches off browser background services and animations.
+
+    Profile settings:
+        page_load_strategy (str): "normal" = open_url() waits for the load event (everything downloaded);
+                                  "eager" = waits for DOMContentLoaded only; "none" = returns once navigation starts
+        block (list): Resource types to block. Any of RESOURCE_PATTERNS: "image", "font", "media", "stylesheet"
+        block_urls (list): URL patterns to block, with * as a wildcard. Eg: "*google-analytics.com*"
+        disable_background (bool): Turn off update checks, prefetching, safe browsing, sync and telemetry
+        disable_animations (bool): Ask pages for reduced motion, and turn off the browser's own animations
+
+    Firefox blocks through a proxy auto-config script, which the browser skips for localhost, so block patterns only
+    apply to other hosts there. The script replaces Firefox's own proxy settings, so requests it doesn't block are
+    sent through the proxy set in the environment (HTTP_PROXY, HTTPS_PROXY and NO_PROXY, or the system settings on
+    Windows and macOS), if any. Chrome blocks through the DevTools protocol, for every host, but only in the tab the
+    browser starts with: tabs opened later with new_tab() load everything.
+"""
+
+import base64
+import json
+import urllib.request
+from urllib.parse import urlsplit
+
+# URL patterns for each blockable resource type
+RESOURCE_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*", "*.bmp*", "*.avif*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"],
+    "media": ["*.mp4*", "*.webm*", "*.ogg*", "*.ogv*", "*.mp3*", "*.wav*", "*.m4a*", "*.m3u8*"],
+    "stylesheet": ["*.css*"],
+}
+
+# Common third party analytics and advertising hosts
+TRACKERS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*connect.facebook.net*",
+    "*hotjar.com*",
+    "*scorecardresearch.com*",
+    "*segment.io*",
+    "*newrelic.com*",
+    "*nr-data.net*",
+]
+
+PROFILES = {
+    "default": {
+        "page_load_strategy": "normal",
+        "block": [],
+        "block_urls": [],
+        "disable_background": False,
+        "disable_animations": False,
+    },
+    "fast": {
+        "page_load_strategy": "eager",
+        "block": ["font", "media"],
+        "block_urls": TRACKERS,
+        "disable_background": True,
+        "disable_animations": True,
+    },
+    "minimal": {
+        "page_load_strategy": "eager",
+        "block": ["image", "font", "media", "stylesheet"],
+        "block_urls": TRACKERS,
+        "disable_background": True,
+        "disable_animations": True,
+    },
+}
+
+# Address blocked requests are sent to. Nothing listens on the discard port, so they fail immediately
+_BLOCKED_PROXY = "PROXY 127.0.0.1:9"
+
+
+def resolve_profile(profile):
+    """ Turn a profile name or dict into a complete profile
+
+        Args:
+            profile (str or dict): Name from PROFILES, or a dict of settings to change from "default". None = "default"
+
+        Returns:
+            dict of every profile setting
+    """
+
+    if profile is None:
+        profile = "default"
+    if isinstance(profile, str):
+        assert profile in PROFILES, f"Invalid performance profile provided. Choose from: {', '.join(PROFILES)}"
+        profile = PROFILES[profile]
+
+    resolved = dict(PROFILES["default"])
+    resolved.update(profile)
+    assert resolved["page_load_strategy"] in ("normal", "eager", "none"), "Invalid page load strategy provided"
+    for resource in resolved["block"]:
+        assert resource in RESOURCE_PATTERNS, f"Invalid resource type provided: {resource}"
+    return resolved
+
+
+def blocked_patterns(profile):
+    """ Every URL pattern a profile blocks """
+    patterns = []
+    for resource in profile["block"]:
+        patterns.extend(RESOURCE_PATTERNS[resource])
+    patterns.extend(profile["block_urls"])
+    return patterns
+
+
+def _pac_proxy(url):
+    """ Proxy auto-config result for a proxy URL. Eg: "http://proxy:3128" -> "PROXY proxy:3128" """
+    if not url:
+        return "DIRECT"
+    parts = urlsplit(url if "://" in url else "http://" + url)
+    kind = "SOCKS5" if parts.scheme.startswith("socks") else "PROXY"
+    return f"{kind} {parts.netloc.rpartition('@')[2]}"  # Without any user name and password
+
+
+def pac_url(patterns, proxies=None):
+    """ Proxy auto-config script, as a data URL, which sends requests matching patterns nowhere
+
+        Args:
+            patterns (list): URL patterns to block, with * as a wildcard
+            proxies (dict): Proxies to send every other request through, as from urllib.request.getproxies():
+                            {"http": url, "https": url, "no": comma separated hosts}. None = connect directly
+    """
+
+    proxies = proxies or {}
+    bypass = [host.strip().lstrip(".") for host in proxies.get("no", "").split(",") if host.strip()]
+    if "*" in bypass:  # Every host is connected to directly
+        proxies, bypass = {}, []
+    checks = " || ".join(f"shExpMatch(url, {json.dumps(pattern)})" for pattern in patterns)
+    lines = [f"if ({checks}) {{ return \"{_BLOCKED_PROXY}\"; }}"]
+    for host in bypass:
+        lines.append(f"if (host === {json.dumps(host)} || dnsDomainIs(host, {json.dumps('.' + host)})) "
+                     f"{{ return \"DIRECT\"; }}")
+    https = _pac_proxy(proxies.get("https") or proxies.get("http"))
+    lines.append(f"return url.substring(0, 6) === \"https:\" ? {json.dumps(https)} : "
+                 f"{json.dumps(_pac_proxy(proxies.get('http')))};")
+    script = "function FindProxyForURL(url, host) {\n" + "\n".join(lines) + "\n}"
+    return "data:application/x-ns-proxy-autoconfig;base64," + base64.b64encode(script.encode()).decode()
+
+
+def configure_chrome(profile, options, capabilities):
+    """ Apply a profile to Chrome options and capabilities, before the browser starts """
+
+    capabilities["pageLoadStrategy"] = profile["page_load_strategy"]
+    prefs = {}
+
+    if "image" in profile["block"]:
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        prefs["profile.managed_default_content_settings.images"] = 2
+
+    if profile["disable_background"]:
+        for argument in ("--disable-background-networking", "--disable-component-update", "--disable-default-apps",
+                         "--disable-sync", "--no-first-run", "--disable-client-side-phishing-detection",
+                         "--safebrowsing-disable-auto-update", "--dns-prefetch-disable",
+                         "--disable-features=Translate,OptimizationHints,MediaRouter"):
+            options.add_argument(argument)
+        prefs["net.network_prediction_options"] = 2  # No prefetching
+        prefs["safebrowsing.enabled"] = False
+
+    if profile["disable_animations"]:
+        options.add_argument("--force-prefers-reduced-motion")
+        options.add_argument("--wm-window-animations-disabled")
+
+    if prefs:
+        options.add_experimental_option("prefs", prefs)
+
+
+def configure_chrome_driver(profile, driver):
+    """ Apply the parts of a profile Chrome only accepts once running. Blocking only covers the current tab """
+    patterns = blocked_patterns(profile)
+    if patterns:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+def configure_firefox(profile, options):
+    """ Apply a profile to Firefox options, before the browser starts """
+
+    options.set_capability("pageLoadStrategy", profile["page_load_strategy"])
+
+    if "image" in profile["block"]:
+        options.set_preference("permissions.default.image", 2)
+    if "font" in profile["block"]:
+        options.set_preference("gfx.downloadable_fonts.enabled", False)
+    if "media" in profile["block"]:
+        options.set_preference("media.autoplay.default", 5)  # Block all autoplay
+
+    patterns = blocked_patterns(profile)
+    if patterns:
+        options.set_preference("network.proxy.type", 2)  # Proxy auto-config
+        options.set_preference("network.proxy.autoconfig_url", pac_url(patterns, urllib.request.getproxies()))
+        options.set_preference("network.proxy.autoconfig_url.include_path", True)  # Let patterns see HTTPS paths
+
+    if profile["disable_background"]:
+        for name, value in (("app.update.auto", False),
+                            ("app.update.enabled", False),
+                            ("browser.search.update", False),
+                            ("extensions.update.enabled", False),
+                            ("browser.safebrowsing.malware.enabled", False),
+                            ("browser.safebrowsing.phishing.enabled", False),
+                            ("browser.safebrowsing.downloads.enabled", False),
+                            ("browser.safebrowsing.blockedURIs.enabled", False),
+                            ("network.prefetch-next", False),
+                            ("network.dns.disablePrefetch", True),
+                            ("network.http.speculative-parallel-limit", 0),
+                            ("browser.newtabpage.enabled", False),
+                            ("datareporting.healthreport.uploadEnabled", False),
+                            ("datareporting.policy.dataSubmissionEnabled", False),
+                            ("toolkit.telemetry.enabled", False)):
+            options.set_preference(name, value)
+
+    if profile["disable_animations"]:
+        options.set_preference("ui.prefersReducedMotion", 1)
+        options.set_preference("toolkit.cosmeticAnimations.enabled", False)
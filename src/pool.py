@@ -0,0 +1,246 @@
+""" Keeps a number of pre-launched WebAutomation sessions, and lends them out instead of starting a new browser """
+
+import logging
+import threading
+from contextlib import contextmanager
+from queue import Queue, Empty
+from time import time
+from selenium.common import exceptions
+from .lifecycle import origin
+from .web_automation import WebAutomation
+
+
+class _PooledSession:  # pylint: disable=too-few-public-methods
+    """ A browser session along with the book keeping the pool needs for it """
+    def __init__(self, web):
+        self.web = web
+        self.created = time()
+        self.uses = 0
+
+
+class WebAutomationPool:
+    """ Pool of warm browser sessions
+
+        Example:
+            pool = WebAutomationPool(size=4, headless=True)
+            with pool.session() as web:
+                web.open_url("http://localhost:5000")
+            pool.close()
+    """
+    def __init__(self, size=2, max_age=None, max_uses=None, **web_kwargs):
+        """ Launches "size" browsers up front
+
+            Args:
+                size (int): Number of browser sessions to keep
+                max_age (int): If set, sessions older than this many seconds are replaced instead of being lent out
+                max_uses (int): If set, sessions are replaced after being lent out this many times
+                web_kwargs: Passed to WebAutomation() for every session launched. Eg: browser_name, headless
+        """
+
+        self.size = size
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.web_kwargs = web_kwargs
+        self._idle = Queue()  # Sessions ready to be lent out
+        self._lock = threading.Lock()
+        self._total = 0  # Sessions alive, whether idle or lent out
+        self._closed = False
+        self._stats = {
+            "requests": 0,  # Calls to session()
+            "hits": 0,  # Requests served by an idle, healthy session without waiting
+            "misses": 0,  # Requests which had to wait for a session or launch one
+            "launches": 0,  # Browsers started
+            "replacements": 0,  # Sessions thrown away for being dead, too old or failing to reset
+            "wait_time": 0.0,  # Total seconds callers spent waiting for a session
+            "max_wait_time": 0.0,
+        }
+
+        # Warm up the pool
+        for _ in range(size):
+            self._reserve_slot()
+            self._idle.put(self._launch())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @contextmanager
+    def session(self, timeout=None):
+        """ Borrow a browser session. It is reset and returned to the pool when the block exits
+
+            Args:
+                timeout (int): Seconds to wait for a free session. Waits forever when None
+
+            Returns:
+                WebAutomation object
+        """
+
+        entry = self._acquire(timeout)
+        try:
+            yield entry.web
+        finally:
+            self._release(entry)
+
+    def stats(self):
+        """ Pool statistics
+
+            Returns:
+                dict of counters, plus "hit_rate" and "average_wait_time"
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self._total
+            stats["idle"] = self._idle.qsize()
+        stats["hit_rate"] = stats["hits"] / stats["requests"] if stats["requests"] else 0.0
+        stats["average_wait_time"] = stats["wait_time"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+    def close(self):
+        """ Shut down every idle session. Sessions currently lent out are shut down when they are returned """
+        self._closed = True
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except Empty:
+                break
+            self._retire(entry, replaced=False)
+
+    ####################################################################
+
+    def _reserve_slot(self):
+        """ Claim room for one more session, if the pool is not full
+
+            Returns:
+                True if the caller may launch a session
+        """
+        with self._lock:
+            if self._total >= self.size:
+                return False
+            self._total += 1
+            return True
+
+    def _launch(self):
+        """ Start a new browser. The caller must have reserved a slot """
+        try:
+            web = WebAutomation(**self.web_kwargs)
+        except:
+            with self._lock:
+                self._total -= 1
+            raise
+        with self._lock:
+            self._stats["launches"] += 1
+        return _PooledSession(web)
+
+    def _retire(self, entry, replaced=True):
+        """ Shut down a session and free its slot """
+        try:
+            entry.web.close()
+        except Exception:  # Session is likely dead already
+            logging.debug("Error shutting down pooled browser session", exc_info=True)
+        with self._lock:
+            self._total -= 1
+            if replaced:
+                self._stats["replacements"] += 1
+
+    def _is_usable(self, entry):
+        """ Whether a session may be lent out """
+        if self.max_age is not None and time() - entry.created > self.max_age:
+            return False
+        if self.max_uses is not None and entry.uses >= self.max_uses:
+            return False
+        return entry.web.is_alive()
+
+    def _acquire(self, timeout):
+        """ Get a healthy session, launching or waiting for one as needed """
+
+        assert not self._closed, "Pool has been closed"
+        start = time()
+        hit = True
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except Empty:
+                hit = False
+                if self._reserve_slot():
+                    entry = self._launch()
+                else:
+                    remaining = None if timeout is None else max(0, timeout - (time() - start))
+                    try:
+                        entry = self._idle.get(timeout=remaining)
+                    except Empty:
+                        raise exceptions.TimeoutException("No browser session became free within the timeout")
+
+            if self._is_usable(entry):
+                break
+            hit = False
+            self._retire(entry)  # Dead or too old, so loop around to get another
+
+        waited = time() - start
+        entry.uses += 1
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["hits" if hit else "misses"] += 1
+            self._stats["wait_time"] += waited
+            self._stats["max_wait_time"] = max(self._stats["max_wait_time"], waited)
+        return entry
+
+    def _release(self, entry):
+        """ Reset a session and make it available again """
+
+        if self._closed:
+            self._retire(entry, replaced=False)
+            return
+
+        try:
+            self._reset(entry.web)
+        except Exception:
+            logging.warning("Pooled browser session failed to reset, replacing it", exc_info=True)
+            self._retire(entry)
+            if not self._reserve_slot():
+                return
+            try:
+                entry = self._launch()
+            except Exception:  # Not raised, as that would hide any error from the caller's block
+                logging.warning("Failed to launch a browser to replace the pooled session", exc_info=True)
+                return
+
+        self._idle.put(entry)
+
+    @staticmethod
+    def _reset(web):
+        """ Return a browser to a clean state: single new window, no alerts, cookies, or storage
+
+            Storage is cleared for every origin opened with open_url(), or open in a window when the session is
+            returned. Session storage goes with the windows, which are all replaced by a new one.
+        """
+
+        driver = web.selenium_driver
+        web.check_for_alert()  # Accepts any alert left open
+        origins = set(web.lifecycle.origins)
+
+        # Replace every window with a new one, noting the pages they were on
+        handles = driver.window_handles
+        window = web._new_window()  # pylint: disable=protected-access
+        for handle in handles:
+            driver.switch_to.window(handle)
+            web.check_for_alert()
+            origins.add(origin(driver.current_url))
+            driver.close()
+        driver.switch_to.window(window)
+        web._reset_windows(window)  # pylint: disable=protected-access
+        origins.discard(None)
+
+        if web.browser_name == "chrome":
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            for page_origin in origins:
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": page_origin, "storageTypes": "all"})
+        else:
+            # Firefox's driver can only clear cookies and storage for the page loaded, so load each origin in turn
+            for page_origin in sorted(origins):
+                driver.get(page_origin)
+                driver.delete_all_cookies()
+                driver.execute_script("try { window.localStorage.clear(); } catch (e) {}")
+            driver.get("about:blank")
+        web.lifecycle.origins.clear()
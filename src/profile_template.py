@@ -0,0 +1,153 @@
+""" Browser profiles built once, with a warm HTTP cache, and cloned cheaply for each session
+
+    A fresh profile starts with an empty cache, so every session downloads every static file again. A template is a
+    profile which has already visited a list of pages. Each browser launched from it gets its own clone, so sessions
+    never change the template or each other. Cache files are cloned copy-on-write where the file system supports it
+    (reflinks, eg: Btrfs, XFS), or else copied. Every other file is copied.
+
+    Example:
+        template = ProfileTemplate("profiles/firefox")
+        template.build(["http://localhost:5000/drag"])  # Once
+        web = WebAutomation(profile_template=template)  # Every session
+"""
+
+import errno
+import json
+import logging
+import os
+import shutil
+import tempfile
+from time import time
+
+CACHE_DIRS = {"cache2", "Cache", "Code Cache", "GPUCache"}  # Firefox and Chrome HTTP and compiled code caches
+LOCK_FILES = {"lock", ".parentlock", "parent.lock", "SingletonLock", "SingletonCookie", "SingletonSocket"}
+FICLONE = 0x40049409  # Linux ioctl which clones a file copy-on-write
+METADATA = "template.json"
+
+
+def _reflink(source, destination):
+    """ Clone a file copy-on-write. Raises OSError where the file system (or OS) can't """
+    try:
+        import fcntl  # pylint: disable=import-outside-toplevel
+    except ImportError:  # Windows
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported") from None
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(destination)
+            raise
+    shutil.copystat(source, destination)
+
+
+class ProfileTemplate:
+    """ Read-only browser profile, with a warm cache, which each session gets a cheap clone of """
+    def __init__(self, path, browser_name="firefox", clone_dir=None):
+        """ Setup requirements
+            Args:
+                path (str): Directory holding the template. Created by build()
+                browser_name (str): "firefox" or "chrome". Taken from the template once built
+                clone_dir (str): Optional, where clones are made. Defaults to the template's parent directory, as
+                                 reflinks only work within one file system
+        """
+        self.path = os.path.abspath(path)
+        self.clone_dir = clone_dir or os.path.dirname(self.path)
+        self.metadata = {}
+        if os.path.exists(os.path.join(self.path, METADATA)):
+            with open(os.path.join(self.path, METADATA)) as hdl:
+                self.metadata = json.load(hdl)
+            browser_name = self.metadata["browser_name"]
+        self.browser_name = browser_name.lower()
+        self._building = False
+        self._reflinks = True  # Until the file system says otherwise
+
+    @property
+    def built(self):
+        """ Whether build() has been run """
+        return bool(self.metadata)
+
+    def build(self, urls, settle=True, **kwargs):
+        """ Create the template: launch a browser with an empty profile, visit each URL to fill its cache, then quit
+
+            Args:
+                urls (list): Pages to visit. Their scripts, style sheets, images, etc are cached too
+                settle (bool or float): Passed to WebAutomation.open_url(), so files fetched after loading are cached
+                kwargs: Passed to WebAutomation(). Eg: headless, performance_profile
+        """
+
+        from .web_automation import WebAutomation  # pylint: disable=import-outside-toplevel
+
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.path)
+        self._building = True
+        try:
+            with WebAutomation(browser_name=self.browser_name, profile_template=self, **kwargs) as web:
+                for url in urls:
+                    web.open_url(url, settle=settle)
+        finally:
+            self._building = False
+
+        cached = 0
+        for directory, _, files in os.walk(self.path):
+            for name in files:
+                if name in LOCK_FILES:
+                    os.remove(os.path.join(directory, name))
+                elif self._is_cache(os.path.join(directory, name)):
+                    cached += 1
+
+        self.metadata = {"version": 1, "browser_name": self.browser_name, "urls": list(urls), "built": time(),
+                         "cache_files": cached}
+        with open(os.path.join(self.path, METADATA), "w") as hdl:
+            json.dump(self.metadata, hdl, indent=1)
+        logging.info("Built %s profile template at %s, with %s cache files", self.browser_name, self.path, cached)
+
+    def _is_cache(self, path):
+        """ Whether a file in the template is part of a browser cache """
+        return any(part in CACHE_DIRS for part in os.path.relpath(path, self.path).split(os.sep)[:-1])
+
+    def clone(self):
+        """ New profile directory for one browser session. Remove it with release()
+
+            Returns:
+                str: Path of the clone
+        """
+
+        if self._building:
+            return self.path
+        assert self.built, f"Profile template {self.path} has not been built"
+        destination = tempfile.mkdtemp(prefix=f"{os.path.basename(self.path)}-", dir=self.clone_dir)
+        for directory, folders, files in os.walk(self.path):
+            target = os.path.join(destination, os.path.relpath(directory, self.path))
+            for folder in folders:
+                os.makedirs(os.path.join(target, folder), exist_ok=True)
+            for name in files:
+                if name == METADATA or name in LOCK_FILES:
+                    continue
+                source = os.path.join(directory, name)
+                if self._is_cache(source) and not os.path.islink(source):
+                    self._clone_file(source, os.path.join(target, name))
+                else:
+                    shutil.copy2(source, os.path.join(target, name), follow_symlinks=False)
+        return destination
+
+    def _clone_file(self, source, destination):
+        """ Reflink a cache file, or copy it where the file system can't """
+        if self._reflinks:
+            try:
+                return _reflink(source, destination)
+            except OSError:  # Eg: ext4, or on another file system
+                self._reflinks = False
+        return shutil.copy2(source, destination)
+
+    def release(self, directory):
+        """ Remove a clone made by clone() """
+        if directory != self.path:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def arguments(self, directory):
+        """ Command line arguments which make the browser use a clone """
+        if self.browser_name == "chrome":
+            return [f"--user-data-dir={directory}"]
+        return ["-profile", directory]
@@ -0,0 +1,370 @@
+""" Records WebAutomation calls to a scenario file, and plays them back with as few driver requests as possible
+
+    Example:
+        with ScenarioRecorder(web) as recorder:
+            web.open_url("http://localhost:5000/text_entry")
+            web.text_entry("Zebra", "text1", "id")
+            web.get_text("text1", "id")
+        recorder.save("journey.json")
+
+        player = ScenarioPlayer("journey.json")
+        player.play(web, check=True)
+        print(player.report())
+
+    Playback compiles the steps first. Runs of steps which can share a request are merged:
+        get_text / get_texts      -> one get_texts()
+        text_entry / fill_form    -> one fill_form()
+        right_click, double_click, mouse_hover, drag_drop, click_hold -> one sequence()
+        wait_for_element / wait_for_visible on different elements -> one wait_for_conditions()
+    Merged reads, form fills and gestures don't wait for elements by themselves, so they are preceded by one wait for
+    all of their elements. Every other step is played as recorded, including waits for removal, text or attributes,
+    whose order matters: they wait for the page to change from one state to another.
+"""
+
+import inspect
+import json
+import threading
+from collections import namedtuple
+from datetime import datetime
+from functools import wraps
+from time import perf_counter
+from .browser_scripts import condition
+
+VERSION = 1
+
+# Methods recorded, and the name each is saved as
+RECORDED = {name: name for name in (
+    "open_url", "page_navigation", "click", "text_entry", "fill_form", "get_text", "get_texts", "get_url", "exists",
+    "count", "right_click", "double_click", "mouse_hover", "drag_drop", "click_hold", "keyboard_shortcut",
+    "scroll_page", "scroll_to_element", "accept_alert", "get_alert_text", "check_for_alert", "wait_for_element",
+    "wait_for_element_removal", "wait_for_visible", "wait_for_text", "wait_for_attribute", "wait_for_conditions",
+    "wait_for_expected_conditions", "wait_for_idle",
+)}
+RECORDED["read_many"] = "get_texts"
+
+# Steps whose results play(check=True) compares with the recording
+CHECKED = ("get_text", "get_texts", "get_url", "exists", "count", "get_alert_text", "check_for_alert", "wait_for_element",
+           "wait_for_element_removal", "wait_for_visible", "wait_for_text", "wait_for_attribute", "wait_for_conditions",
+           "wait_for_expected_conditions", "wait_for_idle")
+
+# Steps merged when next to each other: action: group. Form fills are grouped by _mergeable()
+_GROUPS = {
+    "get_text": "read",
+    "get_texts": "read",
+    "right_click": "gesture",
+    "double_click": "gesture",
+    "mouse_hover": "gesture",
+    "drag_drop": "gesture",
+    "click_hold": "gesture",
+    "wait_for_element": "wait",  # Once met, these stay met until the page changes, so can be waited for together
+    "wait_for_visible": "wait",
+}
+
+CompiledStep = namedtuple("CompiledStep", "action args steps")
+CompiledStep.__doc__ = """ One call made during playback
+
+    action: WebAutomation method name
+    args: Keyword arguments for it
+    steps: Indexes of the recorded steps it plays
+"""
+
+StepTiming = namedtuple("StepTiming", "action steps duration")
+StepTiming.__doc__ = """ How long one compiled step took to play. steps are the indexes of the recorded steps """
+
+
+def _encode(value):
+    """ Make a recorded argument or result JSON friendly. Dicts with keys other than strings become item lists """
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: _encode(item) for key, item in value.items()}
+        return {"__items__": [[_encode(key), _encode(item)] for key, item in value.items()]}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return bool(value)  # Objects which can't be saved, such as a TimingAggregator, are saved as True
+
+
+def _decode(value):
+    """ Undo _encode(). Dict keys which were lists become tuples. Eg: fill_form() locators """
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if isinstance(value, dict):
+        if "__items__" in value:
+            return {_hashable(_decode(key)): _decode(item) for key, item in value["__items__"]}
+        return {key: _decode(item) for key, item in value.items()}
+    return value
+
+
+def _hashable(value):
+    """ Lists as tuples, so they can be dict keys """
+    return tuple(_hashable(item) for item in value) if isinstance(value, list) else value
+
+
+class ScenarioRecorder:
+    """ Records the public method calls made on a WebAutomation object. Calls made inside other calls aren't recorded """
+    def __init__(self, web):
+        self.web = web
+        self.steps = []  # {"action", "args", "result", "duration"}
+        self._saved = {}  # Method name: instance attribute replaced, or None
+        self._local = threading.local()
+
+    def start(self):
+        """ Start recording """
+        for name, action in RECORDED.items():
+            if name in self._saved or not hasattr(self.web, name):
+                continue
+            self._saved[name] = self.web.__dict__.get(name)
+            setattr(self.web, name, self._wrap(action, getattr(self.web, name)))
+        return self
+
+    def stop(self):
+        """ Stop recording, and put the methods back as they were """
+        for name, previous in self._saved.items():
+            if previous is None:
+                delattr(self.web, name)
+            else:
+                setattr(self.web, name, previous)
+        self._saved = {}
+
+    def _wrap(self, action, method):
+        """ Record calls to a method """
+        signature = inspect.signature(getattr(type(self.web), action))
+
+        @wraps(method)
+        def _recorded(*args, **kwargs):
+            depth = getattr(self._local, "depth", 0)
+            self._local.depth = depth + 1
+            start = perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                self._local.depth = depth
+            if depth == 0:
+                arguments = signature.bind_partial(self.web, *args, **kwargs).arguments
+                arguments.pop(next(iter(signature.parameters)))  # self
+                self.steps.append({"action": action, "args": _encode(dict(arguments)), "result": _encode(result),
+                                   "duration": perf_counter() - start})
+            return result
+
+        return _recorded
+
+    def scenario(self):
+        """ The recording, as saved by save() """
+        return {"version": VERSION, "recorded": datetime.now().isoformat(timespec="seconds"), "steps": self.steps}
+
+    def save(self, path):
+        """ Write the recording to a JSON file """
+        with open(path, "w") as hdl:
+            json.dump(self.scenario(), hdl, separators=(",", ":"))
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def load_scenario(scenario):
+    """ Read a scenario file, or check an already loaded scenario
+
+        Args:
+            scenario (str or dict): Path to a file written by ScenarioRecorder.save(), or the dict it contains
+
+        Returns:
+            dict of version, recorded, steps
+    """
+    if isinstance(scenario, str):
+        with open(scenario) as hdl:
+            scenario = json.load(hdl)
+    assert scenario.get("version") == VERSION, f"Unsupported scenario version: {scenario.get('version')}"
+    return scenario
+
+
+def _locators(step):
+    """ (element_id, element_type) pairs a read, form or gesture step needs """
+    args = step["args"]
+    if step["action"] == "get_texts":
+        return [tuple(pair) for pair in args["locators"]]
+    if step["action"] == "fill_form":
+        return list(args["fields"])
+    if step["action"] == "drag_drop":
+        return [(args["src_element_id"], args["src_element_type"]), (args["dst_element_id"], args["dst_element_type"])]
+    return [(args["element_id"], args["element_type"])]
+
+
+def _wait_condition(step):
+    """ Condition a wait step waits for """
+    args = step["args"]
+    kind = {"wait_for_element": "present", "wait_for_element_removal": "absent", "wait_for_visible": "visible",
+            "wait_for_text": "text", "wait_for_attribute": "attribute"}[step["action"]]
+    return condition(kind, args["element_id"], args["element_type"], value=args.get("text", args.get("pattern")),
+                     name=args.get("attribute"))
+
+
+def _mergeable(step):
+    """ Group a step can be merged into, or None """
+    action, args = step["action"], step["args"]
+    if action == "get_texts" and isinstance(args["locators"], dict):
+        return None  # Results are keyed, so played as recorded
+    if action == "text_entry":
+        return "form_faithful"  # Typed with key presses, like text_entry()
+    if action == "fill_form":
+        return "form_faithful" if args.get("mode") == "faithful" else "form"
+    return _GROUPS.get(action)
+
+
+def compile_steps(steps):
+    """ Merge runs of recorded steps into as few calls as possible. See this module's description
+
+        Args:
+            steps (list): Recorded steps, from a scenario
+
+        Returns:
+            list of CompiledStep
+    """
+
+    compiled = []
+    index = 0
+    while index < len(steps):
+        group = _mergeable(steps[index])
+        end = index + 1
+        if group:
+            seen = set(_locators(steps[index]))
+            while end < len(steps) and _mergeable(steps[end]) == group:
+                if group.startswith("form") or group == "wait":
+                    locators = set(_locators(steps[end]))
+                    if locators & seen:  # The same element filled or waited for twice, so keep the order of the two
+                        break
+                    seen |= locators
+                end += 1
+
+        run = steps[index:end]
+        indexes = list(range(index, end))
+        if len(run) == 1:
+            compiled.append(CompiledStep(run[0]["action"], dict(run[0]["args"]), indexes))
+        else:
+            compiled.extend(_merge(group, run, indexes))
+        index = end
+    return compiled
+
+
+def _merge(group, run, indexes):
+    """ Compiled steps for a run of mergeable steps """
+
+    if group == "wait":
+        timeouts = [step["args"].get("timeout") for step in run]
+        timeout = None if None in timeouts else max(timeouts)
+        return [CompiledStep("wait_for_conditions", {"conditions": [_wait_condition(step) for step in run],
+                                                     "timeout": timeout}, indexes)]
+
+    locators = []
+    for step in run:
+        locators.extend(locator for locator in _locators(step) if locator not in locators)
+    wait = CompiledStep("wait_for_conditions", {"conditions": [condition("present", *locator) for locator in locators]},
+                        [])
+
+    if group == "read":
+        return [wait, CompiledStep("get_texts", {"locators": [locator for step in run for locator in _locators(step)]},
+                                   indexes)]
+
+    if group.startswith("form"):
+        fields = {}
+        for step in run:
+            if step["action"] == "text_entry":
+                fields[(step["args"]["element_id"], step["args"]["element_type"])] = step["args"]["text"]
+            else:
+                fields.update(step["args"]["fields"])
+        mode = "faithful" if group == "form_faithful" else "fast"
+        return [wait, CompiledStep("fill_form", {"fields": fields, "mode": mode}, indexes)]
+
+    return [wait, CompiledStep("sequence", {"gestures": [(step["action"], step["args"]) for step in run]}, indexes)]
+
+
+class ScenarioPlayer:
+    """ Plays a recorded scenario back, compiled into as few driver requests as possible """
+    def __init__(self, scenario):
+        """ Setup requirements
+            Args:
+                scenario (str or dict): Path to a file written by ScenarioRecorder.save(), or the dict it contains
+        """
+        self.scenario = load_scenario(scenario)
+        self.steps = [dict(step, args=_decode(step["args"])) for step in self.scenario["steps"]]
+        self.plan = compile_steps(self.steps)
+        self.timings = []
+
+    def play(self, web, check=False):
+        """ Play every step
+
+            Args:
+                web (WebAutomation): Browser to play the steps in
+                check (bool): True = Raise AssertionError if a read or wait gives a different result from when it was
+                              recorded. See CHECKED
+
+            Returns:
+                list of each recorded step's result
+        """
+
+        results = [None] * len(self.steps)
+        self.timings = []
+        for compiled in self.plan:
+            start = perf_counter()
+            result = self._call(web, compiled)
+            self.timings.append(StepTiming(compiled.action, compiled.steps, perf_counter() - start))
+            self._spread(compiled, result, results)
+
+        if check:
+            for index, (step, result) in enumerate(zip(self.steps, results)):
+                if step["action"] not in CHECKED:
+                    continue
+                expected = _decode(step.get("result"))
+                if _encode(result) != _encode(expected):
+                    raise AssertionError(f"Step {index} ({step['action']}) gave {result!r}, recorded {expected!r}")
+        return results
+
+    @staticmethod
+    def _call(web, compiled):
+        """ Make one compiled call """
+
+        if compiled.action == "sequence":
+            sequence = web.sequence()
+            for action, args in compiled.args["gestures"]:
+                getattr(sequence, action)(**args)
+            return sequence.perform()
+
+        # A wait before merged steps which times out is left to the merged call, which raises NoSuchElementException
+        return getattr(web, compiled.action)(**compiled.args)
+
+    def _spread(self, compiled, result, results):
+        """ Share a compiled call's result out between the recorded steps it played """
+
+        if len(compiled.steps) == 1:
+            results[compiled.steps[0]] = result
+            return
+        if compiled.action == "get_texts":
+            position = 0
+            for index in compiled.steps:
+                step = self.steps[index]
+                if step["action"] == "get_text":
+                    results[index] = result[position]
+                    position += 1
+                else:
+                    count = len(step["args"]["locators"])
+                    results[index] = result[position:position + count]
+                    position += count
+        elif compiled.action == "wait_for_conditions":
+            for index in compiled.steps:
+                results[index] = result
+        # Merged form fills and gestures return None
+
+    def report(self):
+        """ Timings of the last play(), as a text table """
+
+        lines = [f"{'steps':<12} {'call':<24} {'ms':>9}"]
+        for timing in self.timings:
+            steps = f"{timing.steps[0]}-{timing.steps[-1]}" if len(timing.steps) > 1 else \
+                (str(timing.steps[0]) if timing.steps else "")
+            lines.append(f"{steps:<12} {timing.action:<24} {timing.duration * 1000:>9.1f}")
+        total = sum(timing.duration for timing in self.timings)
+        lines.append(f"{'total':<12} {f'{len(self.timings)} calls, {len(self.steps)} steps':<24} {total * 1000:>9.1f}")
+        return "\n".join(lines)
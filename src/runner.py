@@ -0,0 +1,247 @@
+""" Runs many scenarios written against WebAutomation, spread across worker processes which each own a browser
+
+    A scenario is a module level function which takes a WebAutomation object. Eg:
+
+        def scenario_login(web):
+            web.open_url("http://localhost:5000/text_entry")
+            web.text_entry("user", "text1", "id")
+
+    Scenarios are split between workers using how long each one took on previous runs (kept in a history file), so
+    every worker finishes at roughly the same time.
+"""
+
+import importlib
+import inspect
+import json
+import logging
+import multiprocessing
+import os
+import traceback
+from collections import namedtuple
+from queue import Empty
+from statistics import median
+from time import time
+from .web_automation import WebAutomation
+
+ScenarioResult = namedtuple("ScenarioResult", "name worker passed duration error")
+ScenarioResult.__doc__ = """ Outcome of one scenario. "error" is the traceback when it failed, otherwise None """
+
+
+def load_scenarios(module, prefix="scenario_"):
+    """ Collect scenario functions from a module
+
+        Args:
+            module (str or module): Module, or importable module name. Eg: "journeys.checkout"
+            prefix (str): Only functions whose names start with this are collected
+
+        Returns:
+            list of functions, in the order they are defined
+    """
+    if isinstance(module, str):
+        module = importlib.import_module(module)
+    functions = [func for name, func in inspect.getmembers(module, inspect.isfunction)
+                 if name.startswith(prefix) and func.__module__ == module.__name__]
+    return sorted(functions, key=lambda func: func.__code__.co_firstlineno)
+
+
+def scenario_name(func):
+    """ Importable reference to a scenario function. Eg: "journeys.checkout:scenario_login" """
+    return f"{func.__module__}:{func.__qualname__}"
+
+
+def _resolve(name):
+    """ Import the scenario function a name refers to """
+    module_name, func_name = name.split(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def plan_shards(names, durations, workers, default_duration=None):
+    """ Split scenarios between workers so each has about the same total expected run time
+
+        Longest scenarios are handed out first, each to the worker with the least work so far.
+
+        Args:
+            names (list): Scenario names
+            durations (dict): Seconds each scenario took previously, by name
+            workers (int): Number of workers
+            default_duration (float): Expected time of scenarios with no history. Defaults to the median of the rest
+
+        Returns:
+            list of lists of names, one per worker
+    """
+
+    if default_duration is None:
+        known = [durations[name] for name in names if name in durations]
+        default_duration = median(known) if known else 1.0
+
+    shards = [[] for _ in range(workers)]
+    loads = [0.0] * workers
+    for name in sorted(names, key=lambda name: durations.get(name, default_duration), reverse=True):
+        index = loads.index(min(loads))
+        shards[index].append(name)
+        loads[index] += durations.get(name, default_duration)
+    return shards
+
+
+def _worker(index, names, web_kwargs, results):
+    """ Worker process: start a browser, then run each scenario with it, sending results back as they finish """
+
+    busy = 0.0
+    web = None
+    try:
+        web = WebAutomation(**web_kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        for name in names:
+            results.put(("result", ScenarioResult(name, index, False, 0.0, error)))
+        names = []
+
+    for name in names:
+        start = time()
+        try:
+            _resolve(name)(web)
+            passed, error = True, None
+        except Exception:
+            passed, error = False, traceback.format_exc()
+        duration = time() - start
+        busy += duration
+        results.put(("result", ScenarioResult(name, index, passed, duration, error)))
+
+        # Don't let one broken browser fail every scenario after it
+        if not passed and not web.is_alive():
+            try:
+                web.recycle()  # Quits what's left of the old browser first
+            except Exception:
+                logging.exception("Worker %s could not restart its browser", index)
+
+    if web is not None:
+        try:
+            web.close()
+        except Exception:
+            logging.debug("Error shutting down worker browser", exc_info=True)
+    results.put(("done", index, busy))
+
+
+class ScenarioRunner:
+    """ Runs scenarios across a pool of worker processes
+
+        Example:
+            runner = ScenarioRunner(load_scenarios("journeys"), workers=4, history="durations.json", headless=True)
+            for result in runner.run():
+                print(result.name, result.passed)
+            print(runner.report())
+    """
+    def __init__(self, scenarios, workers=None, history=None, **web_kwargs):
+        """ Setup requirements
+            Args:
+                scenarios (list): Module level scenario functions, or names from scenario_name()
+                workers (int): Number of worker processes (and browsers). Defaults to the number of CPUs
+                history (str): Optional, path to a JSON file of previous durations, used to balance workers.
+                               Updated after each run, with the scenarios which passed
+                web_kwargs: Passed to WebAutomation() in each worker. Eg: browser_name, headless
+        """
+
+        self.names = [name if isinstance(name, str) else scenario_name(name) for name in scenarios]
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(self.names) or 1))
+        self.history = history
+        self.web_kwargs = web_kwargs
+        self.results = []
+        self._busy = {}  # Seconds each worker spent running scenarios
+        self._elapsed = 0.0
+
+    def _load_history(self):
+        """ Previous durations, by scenario name """
+        if self.history and os.path.exists(self.history):
+            with open(self.history) as hdl:
+                return json.load(hdl)
+        return {}
+
+    def _save_history(self, durations):
+        """ Blend this run's durations into the history file. Failed scenarios are left out, as one which failed early,
+            or never ran because its worker died, would look nearly free to plan_shards()
+        """
+        if not self.history:
+            return
+        for result in self.results:
+            if not result.passed:
+                continue
+            previous = durations.get(result.name)
+            durations[result.name] = result.duration if previous is None else (previous + result.duration) / 2
+        with open(self.history, "w") as hdl:
+            json.dump(durations, hdl, indent=1, sort_keys=True)
+
+    def run(self):
+        """ Run every scenario
+
+            Yields:
+                ScenarioResult for each scenario, as soon as it finishes
+        """
+
+        durations = self._load_history()
+        shards = plan_shards(self.names, durations, self.workers)
+        context = multiprocessing.get_context()
+        results = context.Queue()
+        processes = [context.Process(target=_worker, args=(index, shard, self.web_kwargs, results), daemon=True)
+                     for index, shard in enumerate(shards)]
+
+        self.results = []
+        self._busy = {}
+        start = time()
+        for process in processes:
+            process.start()
+
+        pending = {index: set(shard) for index, shard in enumerate(shards)}
+        while len(self._busy) < len(processes):
+            try:
+                message = results.get(timeout=1)
+            except Empty:
+                # A worker which died without saying so has its remaining scenarios failed
+                for index, process in enumerate(processes):
+                    if index not in self._busy and not process.is_alive() and results.empty():
+                        for name in sorted(pending[index]):
+                            result = ScenarioResult(name, index, False, 0.0, f"Worker exited with {process.exitcode}")
+                            self.results.append(result)
+                            yield result
+                        self._busy[index] = 0.0
+                continue
+
+            if message[0] == "result":
+                result = message[1]
+                pending[result.worker].discard(result.name)
+                self.results.append(result)
+                yield result
+            else:
+                self._busy[message[1]] = message[2]
+
+        for process in processes:
+            process.join()
+        self._elapsed = time() - start
+        self._save_history(durations)
+
+    def run_all(self):
+        """ Run every scenario, and wait for them all to finish
+
+            Returns:
+                dict from report()
+        """
+        for _ in self.run():
+            pass
+        return self.report()
+
+    def report(self):
+        """ Summary of the last run
+
+            Returns:
+                dict: scenarios, passed, failed, elapsed (seconds), throughput (scenarios per minute),
+                      utilisation (fraction of the run each worker spent running scenarios, by worker)
+        """
+        passed = sum(1 for result in self.results if result.passed)
+        elapsed = self._elapsed or 1e-9
+        return {
+            "scenarios": len(self.results),
+            "passed": passed,
+            "failed": len(self.results) - passed,
+            "elapsed": self._elapsed,
+            "throughput": len(self.results) / elapsed * 60,
+            "utilisation": {index: busy / elapsed for index, busy in sorted(self._busy.items())},
+        }
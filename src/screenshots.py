@@ -0,0 +1,247 @@
+""" Saves screenshots into one archive per session, without holding up the automation
+
+    Only taking the screenshot happens on the calling thread. Decoding, hashing and compressing run on worker threads.
+    Frames are checked in the order they were taken, skipping frames which look the same as the one before, so only
+    the frames kept are compressed. They are then written to a zip archive, in order. The archive's index.json lists
+    every frame, including the skipped ones.
+
+    Pillow is optional. With it, near identical frames are spotted with a perceptual hash (dHash), and frames are
+    recompressed. Without it, only exactly identical frames are skipped, and frames are stored as the browser sent them.
+
+    Example:
+        pipeline = web.record_screenshots("session.zip")
+        web.open_url("http://localhost:5000/button")
+        web.screenshot("button page")
+        web.close()  # Finishes writing the archive
+"""
+
+import base64
+import hashlib
+import io
+import json
+import logging
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+try:
+    from PIL import Image
+except ImportError:  # Optional, see above
+    Image = None
+
+FORMATS = {"png": "PNG", "webp": "WEBP", "jpeg": "JPEG"}  # Extension: Pillow format name
+
+
+def dhash(image, size=8):
+    """ Perceptual difference hash of a Pillow image, as an int of size * size bits
+
+        Each bit says whether a pixel of a small greyscale copy is brighter than the pixel to its right, so the hash
+        barely changes when only a little of the image does.
+    """
+    small = image.convert("L").resize((size + 1, size), Image.BILINEAR)
+    pixels = small.tobytes()  # One byte per pixel
+    value = 0
+    for row in range(size):
+        for column in range(size):
+            left = pixels[row * (size + 1) + column]
+            value = value << 1 | (left > pixels[row * (size + 1) + column + 1])
+    return value
+
+
+def distance(first, second):
+    """ Number of bits which differ between two hashes """
+    return bin(first ^ second).count("1")
+
+
+class ScreenshotPipeline:
+    """ Queue of screenshots, processed in the background and written to a zip archive """
+    def __init__(self, path, workers=2, threshold=4, image_format="png",
+                 quality=80):  # pylint: disable=too-many-arguments
+        """ Setup requirements
+            Args:
+                path (str): Zip archive to create
+                workers (int): Threads decoding, hashing and compressing frames
+                threshold (int): Frames whose perceptual hash differs from the previous frame's by this many bits
+                                 or fewer (out of 64) are skipped. 0 = only skip identical frames. Needs Pillow
+                image_format (str): "png" (lossless), "webp" or "jpeg". Other formats need Pillow
+                quality (int): Quality of "webp" and "jpeg" frames, 1 - 100
+        """
+
+        assert image_format in FORMATS, "Invalid image format provided"
+        assert image_format == "png" or Image is not None, "Pillow is needed to save webp or jpeg frames"
+        self.path = path
+        self.threshold = threshold
+        self.image_format = image_format
+        self.quality = quality
+        self._archive = zipfile.ZipFile(path, "w", zipfile.ZIP_STORED)  # Frames are compressed already
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screenshots")
+        self._lock = threading.Lock()
+        self._taken = 0  # Frames taken so far, and the number of the next one
+        self._next_check = 0  # Number of the next frame to compare with the one before, so frames are checked in order
+        self._hashed = {}  # Frames decoded and hashed but not yet checked, by number: (image, hash, details)
+        self._next = 0  # Number of the next frame to write, so frames are written in order
+        self._processed = {}  # Frames checked (and compressed, if kept) but not yet written, by number
+        self._previous = None  # Hash of the last frame written
+        self._previous_file = None
+        self._index = []
+        self._errors = 0
+        self._bytes = 0
+        self._closed = False
+
+    def capture(self, web, label=None):
+        """ Take a screenshot, and queue it to be processed and written
+
+            Args:
+                web (WebAutomation): Browser to take the screenshot of
+                label (str): Optional, description stored in the index. Eg: the step being performed
+
+            Returns:
+                int: Frame number
+        """
+
+        assert not self._closed, "Screenshot pipeline is closed"
+        taken = time()
+        data = web.selenium_driver.get_screenshot_as_base64()
+        with self._lock:
+            number = self._taken
+            self._taken += 1
+        details = {"frame": number, "label": label, "taken": taken}
+        self._executor.submit(self._process, number, data, details)
+        return number
+
+    def _process(self, number, data, details):
+        """ Worker thread: decode and hash a frame, check any frames which are ready, compress those kept, then write
+            any frames which are ready
+        """
+
+        try:
+            image = base64.b64decode(data)
+            if Image is not None:
+                image = Image.open(io.BytesIO(image))
+                image.load()
+                frame_hash = dhash(image)
+                details["size"] = list(image.size)
+            else:
+                frame_hash = hashlib.sha1(image).hexdigest()
+            result = (image, frame_hash, details)
+        except Exception:
+            logging.exception("Error processing screenshot %s", number)
+            result = (None, None, details)
+
+        with self._lock:
+            self._hashed[number] = result
+            kept = self._check()
+
+        for frame, image, details in kept:
+            try:
+                if Image is not None:
+                    image = self._compress(image)
+            except Exception:
+                logging.exception("Error compressing screenshot %s", frame)
+                image = None
+                details.pop("file")
+                details["skipped"] = "error"
+            with self._lock:
+                self._processed[frame] = (image, details)
+                self._write_ready()
+
+    def _check(self):
+        """ Compare frames with the one before, in order, as they become ready. Called with the lock held
+
+            Returns:
+                list of (number, image, details) for the frames kept, which the caller compresses and passes on to
+                self._processed. Frames skipped are passed on straight away
+        """
+
+        kept = []
+        while self._next_check in self._hashed:
+            number = self._next_check
+            image, frame_hash, details = self._hashed.pop(number)
+            self._next_check += 1
+            if image is None:
+                details["skipped"] = "error"
+            elif self._is_duplicate(frame_hash):
+                details["skipped"] = "duplicate"
+                details["same_as"] = self._previous_file
+            else:
+                details["file"] = f"frames/{number:06d}.{self.image_format}"
+                self._previous = frame_hash
+                self._previous_file = details["file"]
+                kept.append((number, image, details))
+                continue
+            self._processed[number] = (None, details)
+        self._write_ready()
+        return kept
+
+    def _write_ready(self):
+        """ Write frames which are ready, in frame order. Called with the lock held """
+        while self._next in self._processed:
+            self._write(*self._processed.pop(self._next))
+            self._next += 1
+
+    def _compress(self, picture):
+        """ Encode a Pillow image in the archive's image format """
+        output = io.BytesIO()
+        if self.image_format == "png":
+            picture.save(output, "PNG", optimize=True)
+        else:
+            picture.convert("RGB").save(output, FORMATS[self.image_format], quality=self.quality)
+        return output.getvalue()
+
+    def _is_duplicate(self, frame_hash):
+        """ Whether a frame looks the same as the last frame kept """
+        if self._previous is None:
+            return False
+        if isinstance(frame_hash, int):
+            return distance(frame_hash, self._previous) <= self.threshold
+        return frame_hash == self._previous
+
+    def _write(self, image, details):
+        """ Add a frame to the archive and index, in frame order. Called with the lock held """
+
+        if details.get("skipped") == "error":
+            self._errors += 1
+        elif image is not None:
+            self._archive.writestr(details["file"], image)
+            self._bytes += len(image)
+        self._index.append(details)
+
+    def stats(self):
+        """ Counters
+
+            Returns:
+                dict: taken, written, duplicates, errors, pending (still being processed), bytes (written)
+        """
+        with self._lock:
+            written = sum(1 for entry in self._index if "file" in entry)
+            return {
+                "taken": self._taken,
+                "written": written,
+                "duplicates": sum(1 for entry in self._index if entry.get("skipped") == "duplicate"),
+                "errors": self._errors,
+                "pending": self._taken - len(self._index),
+                "bytes": self._bytes,
+            }
+
+    def close(self):
+        """ Wait for every frame to be written, then write the index and close the archive """
+
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._archive.writestr("index.json", json.dumps({
+                "version": 1,
+                "perceptual_hash": Image is not None,
+                "threshold": self.threshold,
+                "frames": self._index,
+            }, indent=1))
+            self._archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
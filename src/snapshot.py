@@ -0,0 +1,445 @@
+""" Copy of a web page's elements, taken with WebAutomation.snapshot(), which answers queries without the browser
+
+    Every element type accepted by WebAutomation works against a snapshot. CSS selectors and XPath are answered by
+    small local engines, which cover what's commonly used:
+        css selector: tag, *, #id, .class, [attribute], [attribute=value] (also ~= |= ^= $= *=), :first-child,
+                      :last-child, :only-child, :nth-child(), :first-of-type, :last-of-type, combined with
+                      descendant, >, + and ~, and lists separated by commas
+        xpath: the subset supported by xml.etree.ElementTree. Eg: //div[@id='main']/span[2], //a[.='Home']
+
+    Selectors outside these raise InvalidSelectorException.
+
+    Text follows the same rules as WebAutomation.get_text(): the value of text boxes, nothing for hidden elements,
+    otherwise text close to what the browser renders (innerText).
+"""
+
+import re
+import xml.etree.ElementTree as ET
+from time import time
+from selenium.common import exceptions
+from . import browser_scripts
+
+# Elements whose text starts and ends on a line of its own
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "caption", "dd", "details", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav",
+    "ol", "p", "pre", "section", "summary", "table", "tbody", "tfoot", "thead", "tr", "ul",
+}
+
+_CSS_TOKEN = re.compile(r"""
+    \s*(?P<combinator>[>+~,])\s*
+  | (?P<space>\s+)
+  | \#(?P<id>[-\w]+)
+  | \.(?P<class>[-\w]+)
+  | \[\s*(?P<attribute>[-\w:]+)\s*(?:(?P<operator>[~|^$*]?=)\s*(?P<quote>["']?)(?P<value>.*?)(?P=quote))?\s*\]
+  | :(?P<pseudo>[-\w]+)(?:\((?P<argument>[^)]*)\))?
+  | (?P<tag>\*|[-\w]+)
+""", re.VERBOSE)
+
+_PSEUDO_CLASSES = ("first-child", "last-child", "only-child", "nth-child", "first-of-type", "last-of-type")
+
+
+class SnapshotElement:
+    """ One element of a snapshot """
+    __slots__ = ("tag", "attributes", "value", "visible", "nodes", "children", "parent", "position", "_text")
+
+    def __init__(self, tag, attributes, value, visible, parent, position):  # pylint: disable=too-many-arguments
+        self.tag = tag
+        self.attributes = attributes
+        self.value = value  # Value of a text box (or other element with a value), otherwise None
+        self.visible = visible
+        self.nodes = []  # Child elements and text, in order
+        self.children = []  # Child elements only
+        self.parent = parent
+        self.position = position  # Order in the document
+        self._text = None
+
+    def __repr__(self):
+        return f"<SnapshotElement {self.tag} {self.attributes}>"
+
+    def get_attribute(self, name):
+        """ Value of an attribute, or None """
+        return self.attributes.get(name)
+
+    @property
+    def classes(self):
+        """ Set of class names """
+        return set(self.attributes.get("class", "").split())
+
+    @property
+    def text(self):
+        """ Text of a textbox, or of a tag if not a textbox. See WebAutomation.get_text() """
+        if self._text is None:
+            if self.value is not None:
+                self._text = self.value
+            elif not self.visible:
+                self._text = ""
+            else:
+                parts = []
+                _render(self, parts, self.tag == "pre")
+                text = re.sub(r" *\n[ \n]*", "\n", re.sub(r" {2,}", " ", "".join(parts)))
+                self._text = re.sub(r"[ \t\u00a0]+\n", "\n", text).strip()
+        return self._text
+
+    def iter(self):
+        """ This element and every element inside it, in document order """
+        stack = [self]
+        while stack:
+            element = stack.pop()
+            yield element
+            stack.extend(reversed(element.children))
+
+
+def _render(element, parts, preformatted):
+    """ Append the visible text inside an element to parts, roughly as innerText lays it out """
+    for node in element.nodes:
+        if isinstance(node, str):
+            parts.append(node if preformatted else re.sub(r"\s+", " ", node))
+        elif not node.visible:
+            continue
+        elif node.tag == "br":
+            parts.append("\n")
+        else:
+            block = node.tag in BLOCK_TAGS
+            if block:
+                parts.append("\n")
+            _render(node, parts, preformatted or node.tag == "pre")
+            if block:
+                parts.append("\n")
+            elif node.tag in ("td", "th") and node is not element.children[-1]:
+                parts.append("\t")
+
+
+class DomSnapshot:
+    """ Elements of a page at one moment, indexed by id, class, tag and name
+
+        Example:
+            snapshot = web.snapshot()
+            prices = snapshot.get_texts([(f"price{index}", "id") for index in range(1000)])
+    """
+    def __init__(self, tree, url=None):
+        """ Setup requirements
+            Args:
+                tree (list): Root element from browser_scripts.SNAPSHOT: [tag, attributes, value, visible, nodes]
+                url (str): Address of the page
+        """
+
+        self.url = url
+        self.taken = time()
+        self.elements = []  # Every element, in document order
+        self._by_id = {}
+        self._by_class = {}
+        self._by_tag = {}
+        self._by_name = {}
+        self._tree = None  # ElementTree copy for XPath, built when first needed
+        self._tree_elements = {}  # SnapshotElement for each ElementTree copy, by id()
+        self.root = self._build(tree)
+
+    def _build(self, tree):
+        """ Create the elements from the serialized tree, and index them """
+
+        root = None
+        stack = [(tree, None)]
+        while stack:
+            node, parent = stack.pop()
+            if isinstance(node, str):
+                parent.nodes.append(node)
+                continue
+            tag, attributes, value, visible, nodes = node
+            element = SnapshotElement(tag.lower(), attributes, value, visible, parent, len(self.elements))
+            self.elements.append(element)
+            if parent is None:
+                root = element
+            else:
+                parent.nodes.append(element)
+                parent.children.append(element)
+
+            self._by_tag.setdefault(element.tag, []).append(element)
+            if "id" in attributes:
+                self._by_id.setdefault(attributes["id"], []).append(element)
+            if "name" in attributes:
+                self._by_name.setdefault(attributes["name"], []).append(element)
+            for name in element.classes:
+                self._by_class.setdefault(name, []).append(element)
+
+            stack.extend((child, element) for child in reversed(nodes))
+        return root
+
+    def find_all(self, element_id, element_type):
+        """ Every element matching the identifier, in document order
+
+            Args:
+                element_id (str): Name/ID/XPATH/etc of element
+                element_type (str): Valid element type (see web_automation.PATH_TYPES)
+
+            Returns:
+                list of SnapshotElement, empty if there are none
+        """
+
+        assert element_type in browser_scripts.ELEMENT_TYPES, "Invalid element type provided"  # Notify about user error
+        if element_type == "id":
+            return list(self._by_id.get(element_id, []))
+        if element_type == "name":
+            return list(self._by_name.get(element_id, []))
+        if element_type == "tag":
+            return list(self.elements if element_id == "*" else self._by_tag.get(element_id.lower(), []))
+        if element_type == "class":
+            names = element_id.split()
+            if not names:
+                return []
+            return [element for element in self._by_class.get(names[0], []) if element.classes.issuperset(names)]
+        if element_type in ("link text", "partial link text"):
+            return [element for element in self._by_tag.get("a", [])
+                    if (element.text == element_id if element_type == "link text" else element_id in element.text)]
+        if element_type == "css selector":
+            return self._select(element_id)
+        return self._xpath(element_id)
+
+    def find(self, element_id, element_type):
+        """ First element matching the identifier. Raises NoSuchElementException if there is none """
+        elements = self.find_all(element_id, element_type)
+        if not elements:
+            raise exceptions.NoSuchElementException(f"Element not found in snapshot: {(element_id, element_type)!r}")
+        return elements[0]
+
+    def count(self, element_id, element_type):
+        """ Number of elements matching the identifier """
+        return len(self.find_all(element_id, element_type))
+
+    def exists(self, element_id, element_type):
+        """ Whether an element matching the identifier exists """
+        return self.count(element_id, element_type) > 0
+
+    def get_text(self, element_id, element_type):
+        """ Text from a tag or textbox. See WebAutomation.get_text() """
+        return self.find(element_id, element_type).text
+
+    def get_texts(self, locators):
+        """ Text from many tags or textboxes. See WebAutomation.get_texts()
+
+            Args:
+                locators (list or dict): (element_id, element_type) pairs, or {key: (element_id, element_type)}
+
+            Returns:
+                list of text in the same order as locators, or {key: text} when given a dict
+        """
+        keys, pairs = browser_scripts.split_locators(locators)
+        texts = [self.get_text(element_id, element_type) for element_id, element_type in pairs]
+        if keys is not None:
+            return dict(zip(keys, texts))
+        return texts
+
+    read_many = get_texts
+
+    def get_attribute(self, attribute, element_id, element_type):
+        """ Value of an element's attribute, or None if it doesn't have it """
+        return self.find(element_id, element_type).get_attribute(attribute)
+
+    ####################################################################
+
+    def _select(self, selector):
+        """ Elements matching a CSS selector """
+
+        found = set()
+        for compounds in _parse_css(selector):
+            for element in self._candidates(compounds[-1][1]):
+                if _matches(element, compounds, len(compounds) - 1):
+                    found.add(element.position)
+        return [self.elements[position] for position in sorted(found)]
+
+    def _candidates(self, compound):
+        """ Smallest indexed list of elements which could match a compound selector """
+        if compound["id"]:
+            return self._by_id.get(compound["id"][0], [])
+        if compound["class"]:
+            return self._by_class.get(compound["class"][0], [])
+        if compound["tag"] not in (None, "*"):
+            return self._by_tag.get(compound["tag"], [])
+        return self.elements
+
+    def _xpath(self, path):
+        """ Elements matching an XPath, using ElementTree's XPath support """
+
+        if self._tree is None:
+            self._tree, self._tree_elements = self._element_tree()
+        if path.startswith("/"):
+            path = "." + path  # Relative to the document, which is the parent of <html>
+        elif not path.startswith("."):
+            path = "./" + path
+        try:
+            matches = self._tree.findall(path)
+        except (SyntaxError, KeyError, TypeError) as error:
+            raise exceptions.InvalidSelectorException(
+                f"XPath is not supported in snapshots: {path} ({error}). Query the browser instead") from error
+        return [self._tree_elements[id(match)] for match in matches]
+
+    def _element_tree(self):
+        """ ElementTree copy of the snapshot, under a document element, and each copy's SnapshotElement by id() """
+
+        document = ET.Element("#document")
+        root = ET.SubElement(document, self.root.tag, self.root.attributes)
+        copies = {id(root): self.root}
+        pending = [(self.root, root)]
+        while pending:
+            element, copy = pending.pop()
+            previous = None  # Text after a child element is that child's "tail" in ElementTree
+            for node in element.nodes:
+                if isinstance(node, str):
+                    if previous is None:
+                        copy.text = (copy.text or "") + node
+                    else:
+                        previous.tail = (previous.tail or "") + node
+                else:
+                    previous = ET.SubElement(copy, node.tag, node.attributes)
+                    copies[id(previous)] = node
+                    pending.append((node, previous))
+        return document, copies
+
+
+def _parse_css(selector):
+    """ Parse a CSS selector list
+
+        Returns:
+            list of complex selectors, each a list of (combinator, compound). combinator joins a compound to the one
+            before it (" ", ">", "+", "~", or None for the first). compound is a dict of tag, id, class, attribute
+            and pseudo
+    """
+
+    def _invalid(reason):
+        return exceptions.InvalidSelectorException(f"CSS selector is not supported in snapshots: {selector} ({reason})")
+
+    selectors = [[]]
+    combinator = None  # Combinator waiting for the next compound
+    position = 0
+    text = selector.strip()
+    while position < len(text):
+        match = _CSS_TOKEN.match(text, position)
+        if not match:
+            raise _invalid(f"unexpected {text[position:]!r}")
+        position = match.end()
+        current = selectors[-1]
+
+        if match.group("combinator") == ",":
+            if not current or combinator:
+                raise _invalid("empty selector")
+            selectors.append([])
+            continue
+        if match.group("combinator") or match.group("space"):
+            if not current:
+                raise _invalid("selector starts with a combinator")
+            combinator = match.group("combinator") or " "
+            continue
+
+        if combinator or not current:
+            current.append((combinator, {"tag": None, "id": [], "class": [], "attribute": [], "pseudo": []}))
+            combinator = None
+        compound = current[-1][1]
+        if match.group("tag"):
+            compound["tag"] = match.group("tag").lower()
+        elif match.group("id"):
+            compound["id"].append(match.group("id"))
+        elif match.group("class"):
+            compound["class"].append(match.group("class"))
+        elif match.group("attribute"):
+            compound["attribute"].append((match.group("attribute"), match.group("operator"), match.group("value")))
+        else:
+            pseudo = match.group("pseudo").lower()
+            if pseudo not in _PSEUDO_CLASSES:
+                raise _invalid(f":{pseudo}")
+            compound["pseudo"].append((pseudo, _nth(match.group("argument")) if pseudo == "nth-child" else None))
+
+    if not selectors[-1] or combinator:
+        raise _invalid("selector ends early")
+    return selectors
+
+
+def _nth(argument):
+    """ (a, b) from an :nth-child(an+b) argument """
+    argument = (argument or "").replace(" ", "").lower()
+    if argument == "odd":
+        return 2, 1
+    if argument == "even":
+        return 2, 0
+    match = re.fullmatch(r"(?:([+-]?\d*)n)?([+-]?\d+)?", argument)
+    if not argument or not match:
+        raise exceptions.InvalidSelectorException(f"Invalid :nth-child({argument})")
+    step, offset = match.groups()
+    if step in ("", "+"):
+        step = "1"
+    elif step == "-":
+        step = "-1"
+    return int(step or 0), int(offset or 0)
+
+
+def _attribute_matches(value, operator, expected):
+    """ Whether an attribute value passes a CSS attribute selector """
+    if value is None:
+        return False
+    if operator is None:
+        return True
+    return {
+        "=": lambda: value == expected,
+        "~=": lambda: expected in value.split(),
+        "|=": lambda: value == expected or value.startswith(expected + "-"),
+        "^=": lambda: bool(expected) and value.startswith(expected),
+        "$=": lambda: bool(expected) and value.endswith(expected),
+        "*=": lambda: bool(expected) and expected in value,
+    }[operator]()
+
+
+def _pseudo_matches(element, pseudo, argument):
+    """ Whether an element passes a structural pseudo class """
+    siblings = element.parent.children if element.parent else [element]
+    if pseudo.endswith("of-type"):
+        siblings = [sibling for sibling in siblings if sibling.tag == element.tag]
+    if pseudo in ("first-child", "first-of-type"):
+        return siblings[0] is element
+    if pseudo in ("last-child", "last-of-type"):
+        return siblings[-1] is element
+    if pseudo == "only-child":
+        return len(siblings) == 1
+    step, offset = argument
+    index = siblings.index(element) + 1
+    if step == 0:
+        return index == offset
+    return (index - offset) % step == 0 and (index - offset) // step >= 0
+
+
+def _compound_matches(element, compound):
+    """ Whether an element matches every part of a compound selector. Eg: div.item[title] """
+    if compound["tag"] not in (None, "*") and element.tag != compound["tag"]:
+        return False
+    if any(element.attributes.get("id") != value for value in compound["id"]):
+        return False
+    if compound["class"] and not element.classes.issuperset(compound["class"]):
+        return False
+    if not all(_attribute_matches(element.attributes.get(name), operator, value)
+               for name, operator, value in compound["attribute"]):
+        return False
+    return all(_pseudo_matches(element, pseudo, argument) for pseudo, argument in compound["pseudo"])
+
+
+def _matches(element, compounds, index):
+    """ Whether an element matches compounds[index], with the compounds before it matching its relatives """
+
+    combinator, compound = compounds[index]
+    if not _compound_matches(element, compound):
+        return False
+    if index == 0:
+        return True
+
+    if combinator in (">", " "):
+        parent = element.parent
+        while parent is not None:
+            if _matches(parent, compounds, index - 1):
+                return True
+            if combinator == ">":
+                return False
+            parent = parent.parent
+        return False
+
+    siblings = element.parent.children if element.parent else [element]
+    before = siblings[:siblings.index(element)]
+    if combinator == "+":
+        return bool(before) and _matches(before[-1], compounds, index - 1)
+    return any(_matches(sibling, compounds, index - 1) for sibling in before)
@@ -0,0 +1,183 @@
+""" Runs several independent journeys in one browser, each in its own tab
+
+    A Tab has the same methods as WebAutomation, and switches the browser to its window before each call. One browser
+    can then serve several journeys, for much less memory than a browser each.
+
+    Example:
+        def journey(tab):
+            tab.open_url("http://localhost:5000/button")
+            yield 1.5  # Think time. Other tabs run meanwhile
+            tab.click("button1", "id")
+
+        scheduler = TabScheduler(web)
+        for _ in range(5):
+            scheduler.add(journey)
+        for result in scheduler.run():
+            print(result.name, result.passed, result.duration)
+"""
+
+import heapq
+import itertools
+import traceback
+from collections import namedtuple
+from functools import wraps
+from time import sleep, time
+from . import actions
+
+TabResult = namedtuple("TabResult", "name tab passed duration error")
+TabResult.__doc__ = """ Outcome of one journey. "tab" is its number, in the order added. "error" is the traceback
+    when it failed, otherwise None
+"""
+
+
+class Tab:
+    """ One tab of a WebAutomation browser, with the same methods as WebAutomation
+
+        Each method call switches to the tab first, if it isn't the current one, and holds the browser until it
+        returns, so tabs can be shared between threads. The browser only runs one command at a time, so tabs interleave
+        rather than run in parallel. Elements are cached per tab.
+
+        click_hold_async() and collect_logs() work in the background, on whichever tab is current when they run.
+    """
+    def __init__(self, web, handle):
+        """ Setup requirements
+            Args:
+                web (WebAutomation): Browser the tab belongs to
+                handle (str): Window handle of the tab
+        """
+        self.web = web
+        self.handle = handle
+        self.closed = False
+
+    def __getattr__(self, name):
+        attribute = getattr(self.web, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+
+        @wraps(attribute)
+        def _in_tab(*args, **kwargs):
+            with self.web._window_lock:  # pylint: disable=protected-access
+                self.activate()
+                return attribute(*args, **kwargs)
+
+        return _in_tab
+
+    def activate(self):
+        """ Switch the browser to this tab. Only needed to use selenium_driver directly """
+        assert not self.closed, "Tab is closed"
+        with self.web._window_lock:  # pylint: disable=protected-access
+            self.web._switch_window(self.handle)  # pylint: disable=protected-access
+
+    @property
+    def selenium_driver(self):
+        """ Selenium driver, switched to this tab. Not thread-safe: another thread's tab may switch the browser away
+            before the driver is used, so only use it where one thread has the browser
+        """
+        self.activate()
+        return self.web.selenium_driver
+
+    def sequence(self):
+        """ Start a chain of gestures, performed in this tab. See WebAutomation.sequence() """
+        return _TabSequence(self)
+
+    def close(self):
+        """ Close the tab. The browser switches back to its first tab """
+        if not self.closed:
+            with self.web._window_lock:  # pylint: disable=protected-access
+                self.web._close_window(self.handle)  # pylint: disable=protected-access
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f"Tab({self.handle!r})"
+
+
+class _TabSequence(actions.ActionSequence):
+    """ Chain of gestures which holds the browser in its tab while they're performed """
+    def perform(self):
+        with self._web.web._window_lock:  # pylint: disable=protected-access
+            return super().perform()
+
+
+class TabScheduler:
+    """ Interleaves journeys, each in its own tab of one browser
+
+        A journey is a generator function which takes a Tab. Each time it yields, other journeys get the browser:
+        yield a number of seconds to be resumed no sooner than that (eg: think time, or waiting for a slow page),
+        or None to be resumed as soon as the others have had a turn. A plain function (which doesn't yield) runs to the
+        end in one turn.
+    """
+    def __init__(self, web):
+        """ Setup requirements
+            Args:
+                web (WebAutomation): Browser to open the tabs in
+        """
+        self.web = web
+        self._journeys = []  # (name, function, url)
+
+    def add(self, journey, url=None, name=None):
+        """ Queue a journey to run
+
+            Args:
+                journey (function): Generator function taking a Tab. See this class's description
+                url (str): Optional, opened in the tab before the journey starts
+                name (str): Optional, name in the results. Defaults to the function's name
+        """
+        self._journeys.append((name or journey.__name__, journey, url))
+
+    def run(self):
+        """ Run every journey queued, opening a tab for each, and closing it once the journey finishes
+
+            Yields:
+                TabResult, as each journey finishes
+        """
+
+        journeys, self._journeys = self._journeys, []
+        ready = []  # Heap of (time to resume, order, number, name, tab, generator, start time)
+        order = itertools.count()
+        for number, (name, journey, url) in enumerate(journeys):
+            start = time()
+            tab = self.web.new_tab(url)
+            try:
+                steps = journey(tab)
+            except Exception:  # Plain function, which failed
+                self._close(tab)
+                yield TabResult(name, number, False, time() - start, traceback.format_exc())
+                continue
+            if not hasattr(steps, "send"):  # Plain function, which already ran
+                tab.close()
+                yield TabResult(name, number, True, time() - start, None)
+                continue
+            heapq.heappush(ready, (start, next(order), number, name, tab, steps, start))
+
+        while ready:
+            resume, _, number, name, tab, steps, start = heapq.heappop(ready)
+            delay = resume - time()
+            if delay > 0:
+                sleep(delay)
+            try:
+                wait = next(steps)
+            except StopIteration:
+                tab.close()
+                yield TabResult(name, number, True, time() - start, None)
+                continue
+            except Exception:
+                error = traceback.format_exc()
+                self._close(tab)
+                yield TabResult(name, number, False, time() - start, error)
+                continue
+            heapq.heappush(ready, (time() + (wait or 0), next(order), number, name, tab, steps, start))
+
+    @staticmethod
+    def _close(tab):
+        """ Close a failed journey's tab, which may have an alert open """
+        try:
+            tab.check_for_alert()
+            tab.close()
+        except Exception:
+            tab.closed = True  # Left for the browser to close
@@ -0,0 +1,220 @@
+""" Times every WebDriver command sent by WebAutomation, and every public WebAutomation method call
+
+    Example:
+        tracer = Tracer(sinks=[RingBufferSink(), JsonLinesSink("trace.jsonl")])
+        web = WebAutomation(tracer=tracer)
+        ...
+        print(tracer.report())
+"""
+
+import json
+import math
+import threading
+from collections import deque, namedtuple
+from functools import wraps
+from time import time, perf_counter
+
+TraceRecord = namedtuple("TraceRecord", "kind name locator duration outcome method timestamp")
+TraceRecord.__doc__ = """ One timed call
+
+    kind: "command" (sent to the browser driver) or "method" (public WebAutomation method)
+    name: Driver command (eg: "findElement", "clickElement") or method name
+    locator: "strategy=value" for find commands, element ID for element commands, otherwise None
+    duration: Seconds
+    outcome: "ok", or the name of the exception raised
+    method: Outermost public WebAutomation method running when a command was sent, if any
+    timestamp: time() when the call started
+"""
+
+
+class RingBufferSink:
+    """ Keeps the most recent records in memory """
+    def __init__(self, size=10000):
+        self.records = deque(maxlen=size)
+
+    def write(self, record):
+        """ Store a record, dropping the oldest if full """
+        self.records.append(record)
+
+
+class JsonLinesSink:
+    """ Appends each record to a file as one line of JSON """
+    def __init__(self, path):
+        self._hdl = open(path, "a", buffering=1)  # pylint: disable=consider-using-with
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        """ Write a record """
+        line = json.dumps(record._asdict())
+        with self._lock:
+            self._hdl.write(line + "\n")
+
+    def close(self):
+        """ Close the file """
+        self._hdl.close()
+
+
+class CallbackSink:
+    """ Calls a function with each record """
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, record):
+        """ Pass a record on """
+        self.callback(record)
+
+
+def percentile(samples, fraction):
+    """ Nearest rank percentile of sorted samples. Eg: percentile(samples, 0.95) """
+    if not samples:
+        return None
+    rank = math.ceil(fraction * len(samples))
+    return samples[min(len(samples), max(1, rank)) - 1]
+
+
+def _locator(params):
+    """ Short description of what a driver command was aimed at """
+    if not params:
+        return None
+    if "using" in params:
+        return f"{params['using']}={params.get('value')}"
+    if "id" in params:
+        return str(params["id"])
+    return None
+
+
+class Tracer:
+    """ Records timings to sinks, and keeps recent samples for summary() """
+    def __init__(self, sinks=None, keep=10000):
+        """ Setup requirements
+            Args:
+                sinks (list): Objects with a write(record) method, or functions which are called with each record
+                keep (int): Number of recent samples kept for each command and method, for summary()
+        """
+        self.sinks = [sink if hasattr(sink, "write") else CallbackSink(sink) for sink in (sinks or [])]
+        self.keep = keep
+        self._samples = {}  # (kind, name): deque of (duration, outcome)
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Stack of public methods running on each thread
+
+    def attach(self, web):
+        """ Start timing a WebAutomation object's public methods, and its driver's commands """
+
+        for name in dir(type(web)):
+            if name.startswith("_") or not callable(getattr(type(web), name)):
+                continue
+            method = getattr(web, name)
+            if getattr(method, "_traced", False):
+                continue
+            setattr(web, name, self._wrap_method(name, method))
+
+        if web.started:  # Otherwise the driver is attached when the browser is launched
+            self.attach_driver(web.selenium_driver)
+
+    def attach_driver(self, driver):
+        """ Start timing every command sent through a Selenium driver """
+
+        if getattr(driver, "_traced", False):
+            return
+        execute = driver.execute
+
+        def _execute(driver_command, params=None):
+            start = perf_counter()
+            started = time()
+            outcome = "ok"
+            try:
+                return execute(driver_command, params)
+            except Exception as error:
+                outcome = type(error).__name__
+                raise
+            finally:
+                self._record("command", driver_command, _locator(params), perf_counter() - start, outcome, started)
+
+        driver.execute = _execute
+        driver._traced = True  # pylint: disable=protected-access
+
+    def _wrap_method(self, name, method):
+        """ Time a public method, and note it as the method running while its commands are sent """
+
+        @wraps(method)
+        def _traced(*args, **kwargs):
+            stack = self._stack()
+            stack.append(name)
+            start = perf_counter()
+            started = time()
+            outcome = "ok"
+            try:
+                return method(*args, **kwargs)
+            except Exception as error:
+                outcome = type(error).__name__
+                raise
+            finally:
+                stack.pop()
+                self._record("method", name, None, perf_counter() - start, outcome, started)
+
+        _traced._traced = True  # pylint: disable=protected-access
+        return _traced
+
+    def _stack(self):
+        """ Public methods running on this thread, outermost first """
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _record(self, kind, name, locator, duration, outcome, started):  # pylint: disable=too-many-arguments
+        """ Send a record to every sink, and keep its sample """
+
+        stack = self._stack()
+        method = stack[0] if stack else None
+        record = TraceRecord(kind, name, locator, duration, outcome, method, started)
+        with self._lock:
+            samples = self._samples.setdefault((kind, name), deque(maxlen=self.keep))
+            samples.append((duration, outcome))
+            if kind == "command" and method:
+                # Also keep driver time spent inside each public method, eg: "get_text/findElement"
+                key = ("command", f"{method}/{name}")
+                self._samples.setdefault(key, deque(maxlen=self.keep)).append((duration, outcome))
+        for sink in self.sinks:
+            sink.write(record)
+
+    def summary(self):
+        """ Timing statistics over the kept samples
+
+            Returns:
+                dict: {"commands": {name: stats}, "methods": {name: stats}}. Command names include
+                      "method/command" entries for commands sent by each public method.
+                      stats is a dict of count, errors, total, mean, p50, p95, p99 (seconds)
+        """
+
+        with self._lock:
+            samples = {key: list(values) for key, values in self._samples.items()}
+
+        summary = {"commands": {}, "methods": {}}
+        for (kind, name), values in sorted(samples.items()):
+            durations = sorted(duration for duration, _ in values)
+            summary["commands" if kind == "command" else "methods"][name] = {
+                "count": len(durations),
+                "errors": sum(1 for _, outcome in values if outcome != "ok"),
+                "total": sum(durations),
+                "mean": sum(durations) / len(durations),
+                "p50": percentile(durations, 0.50),
+                "p95": percentile(durations, 0.95),
+                "p99": percentile(durations, 0.99),
+            }
+        return summary
+
+    def report(self):
+        """ Summary as a text table, slowest total time first """
+
+        lines = [f"{'name':<50} {'count':>7} {'total s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+        for kind, entries in self.summary().items():
+            lines.append(f"[{kind}]")
+            for name, stats in sorted(entries.items(), key=lambda item: item[1]["total"], reverse=True):
+                lines.append(f"{name:<50} {stats['count']:>7} {stats['total']:>9.3f} {stats['p50'] * 1000:>9.1f} "
+                             f"{stats['p95'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f}")
+        return "\n".join(lines)
+
+    def reset(self):
+        """ Forget the kept samples """
+        with self._lock:
+            self._samples.clear()
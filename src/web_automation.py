@@ -1,49 +1,253 @@
-""" Performs web page automation either in a visible browser, or a headless one (invisible) """
+""" Performs web page automation either in a visible browser, or a headless one (invisible)
+
+    selenium.webdriver is only imported once a browser is launched, since importing it loads every browser's driver
+    module. Importing this module on its own stays quick.
+"""
 
 import logging
-from time import time, sleep
-from selenium import webdriver
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.common.keys import Keys
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import time
 from selenium.common import exceptions
+from . import actions, browser_scripts, performance_profiles
+from .browser_scripts import condition
+from .log_stream import LogCollector
+from .lifecycle import BrowserLifecycle, track, untrack
+from .page_timing import page_timing
+from .profile_template import ProfileTemplate
+from .snapshot import DomSnapshot
+from .tabs import Tab
+
+# Element types accepted by this wrapper, and the WebDriver locator strategy each one maps to
+PATH_TYPES = {
+    "id": "id",
+    "xpath": "xpath",
+    "link text": "link text",
+    "partial link text": "partial link text",
+    "name": "name",
+    "class": "class name",
+    "css selector": "css selector",
+    "tag": "tag name"
+}
+
+SLOWEST_RESOURCES = 10  # Resources listed in page timings
+IDLE_TIME = 0.5  # Seconds without network or DOM activity which wait_for_idle() counts as idle
 
 
 class WebAutomation:  # pylint: disable=too-many-public-methods
     """ Returns browser object with which to interface """
-    def __init__(self, browser_name="firefox", headless=False, executable=None):
+    def __init__(self, browser_name="firefox", headless=False, executable=None, element_cache=False,
+                 tracer=None, implicit_wait=True, performance_profile=None,
+                 lazy=False, max_navigations=None, max_memory=None,
+                 profile_template=None):  # pylint: disable=too-many-arguments
         """ Setup requirements
             Args:
                 browser_name (str): "firefox" or "chrome"
                 headless (bool): True = Do not show browser; False = Show browser during automation
                 executable (str): Optional, if set, should be a direct path to the browser executable
+                element_cache (bool): True = Reuse elements which were already found, instead of asking the browser
+                                      to find them again. Cleared on navigation
+                tracer (tracing.Tracer): Optional, times every driver command and public method call
+                implicit_wait (bool): True = The driver waits for elements to appear (implicitly_wait);
+                                      False = The driver's implicit wait stays at 0, and waits are timed here
+                                      instead, per call. No extra requests are spent changing the driver's
+                                      wait time, which also makes it safe to share the driver between threads
+                performance_profile (str or dict): Optional, name from performance_profiles.PROFILES ("default",
+                                                   "fast", "minimal"), or a dict of profile settings. Sets the page
+                                                   load strategy, and blocks resources and background services
+                lazy (bool): True = Don't launch the browser until it's first used, or prewarm() is called
+                max_navigations (int): Optional, open_url() relaunches the browser after this many pages. See recycle()
+                max_memory (float): Optional, open_url() relaunches the browser once the driver and browser processes
+                                    use this many MB of memory. Needs psutil
+                profile_template (ProfileTemplate or str): Optional, start each browser from a clone of this profile
+                                                           (or the template at this path), with its warm cache.
+                                                           See profile_template.py
         """
 
-        self.selenium_driver = None
+        self._selenium_driver = None
+        self._lazy_pending = lazy  # Browser is still to be launched on first use
+        self._launch_lock = threading.RLock()
+        self._prewarm_thread = None
+        self._prewarm_error = None
+        self._executor = None  # Runs gestures started by click_hold_async()
+        self._log_collectors = []
+        self.screenshots = None  # screenshots.ScreenshotPipeline started by record_screenshots()
+        self.owns_browser = True  # False when attached to a browser launched by someone else
         self.browser_name = browser_name.lower()
         self.headless = headless
         self.webdriver_wait = 20  # How long to wait for elements to appear and events to occur in seconds
         self.executable = executable
-        self.launch_browser()
+        self.element_cache = element_cache
+        self._element_cache = {}  # (element_type, element_id): element object
+        self._element_cache_url = None  # URL the cached elements were found on, if known
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._script_timeout = None  # Last script timeout sent to the driver, in seconds
+        self._idle_monitor_driver = None  # Chrome driver told to add browser_scripts.IDLE_MONITOR to every page
+        self._window_lock = threading.RLock()  # Held by Tab while it switches to its window and runs a call
+        self._window = None  # Handle of the current window, once tabs are used
+        self._first_window = None
+        self._window_caches = {}  # Window handle: (element cache, URL) of windows other than the current one
+        self.tracer = tracer
+        self.implicit_wait = implicit_wait
+        self.performance_profile = performance_profiles.resolve_profile(performance_profile)
+        self.lifecycle = BrowserLifecycle(self, max_navigations, max_memory)  # Resource usage and recycling
+        if isinstance(profile_template, str):
+            profile_template = ProfileTemplate(profile_template, self.browser_name)
+        assert profile_template is None or profile_template.browser_name == self.browser_name, \
+            "Profile template is for a different browser"
+        self.profile_template = profile_template
+        self._profile_dir = None  # Clone of the profile template the browser is using
+        if tracer:
+            tracer.attach(self)
+        if not lazy:
+            self.launch_browser()
+
+    @classmethod
+    def attach(cls, session_url, session_id, w3c=True, fallback=True, **kwargs):
+        """ Use a browser which is already running, eg: launched by another process, instead of launching one
+
+            close() leaves an attached browser running, for its owner to shut down. The driver's implicit wait belongs
+            to the session, so it is set to suit this object's implicit_wait, for the owner too.
 
-    def launch_browser(self):
-        """ Launch browser and create instance. Sets self.selenium_driver """
+            Args:
+                session_url (str): URL of the browser driver. See export_session()
+                session_id (str): Browser session to use. See export_session()
+                w3c (bool): Whether the session talks the W3C WebDriver protocol
+                fallback (bool): True = Launch a new browser if the session no longer exists;
+                                 False = Raise WebDriverException
+                kwargs: Passed to WebAutomation(). Eg: browser_name, headless. Used when launching a new browser
 
+            Returns:
+                WebAutomation object
+        """
+
+        kwargs["lazy"] = True
+        web = cls(**kwargs)
         try:
-            # Chrome
-            if self.browser_name == "chrome":
-                self.start_chrome()
-
-            # Firefox
-            elif self.browser_name == "firefox":
-                self.start_firefox()
-        except:
-            logging.error("Error starting web browser")
-            raise
+            web.selenium_driver = _attached_driver(session_url, session_id, w3c)
+            alive = web.is_alive()
+        except Exception:
+            alive = False
+
+        if alive:
+            web.owns_browser = False
+            web._lazy_pending = False  # pylint: disable=protected-access
+            # Otherwise the owner's wait applies, and find_all() / exists() block for the whole of it
+            web.selenium_driver.implicitly_wait(web.webdriver_wait if web.implicit_wait else 0)
+            if web.tracer:
+                web.tracer.attach_driver(web.selenium_driver)
+            return web
+
+        if not fallback:
+            raise exceptions.WebDriverException(f"Browser session {session_id} at {session_url} no longer exists")
+        logging.warning("Browser session %s no longer exists, launching a new browser", session_id)
+        web.selenium_driver = None
+        web.launch_browser()
+        return web
+
+    def export_session(self):
+        """ Connection details for WebAutomation.attach(), so other processes can use this browser
+
+            Returns:
+                dict: session_url, session_id, w3c, browser_name. Can be passed straight to attach(**details)
+        """
+        driver = self.selenium_driver
+        return {
+            "session_url": driver.command_executor._url,  # pylint: disable=protected-access
+            "session_id": driver.session_id,
+            "w3c": driver.w3c,
+            "browser_name": self.browser_name,
+        }
+
+    @property
+    def selenium_driver(self):
+        """ Selenium driver object. In lazy mode, the browser is launched on first access """
+        if self._prewarm_thread is not None:
+            self._join_prewarm()
+        if self._selenium_driver is None and self._lazy_pending:
+            self._launch_lazy()
+        return self._selenium_driver
+
+    @selenium_driver.setter
+    def selenium_driver(self, driver):
+        self._selenium_driver = driver
+
+    @property
+    def started(self):
+        """ Whether the browser has been launched. Doesn't launch it in lazy mode """
+        return self._selenium_driver is not None
+
+    def prewarm(self):
+        """ Launch the browser on a background thread, so it's ready (or nearly) when first used
+
+            Only does anything in lazy mode, before the browser has been launched. Errors launching the browser are
+            raised when it's first used.
+        """
+        with self._launch_lock:
+            if self._selenium_driver is not None or not self._lazy_pending or self._prewarm_thread:
+                return
+            self._prewarm_thread = threading.Thread(target=self._prewarm, name="prewarm browser", daemon=True)
+            self._prewarm_thread.start()
+
+    def _prewarm(self):
+        """ Background thread started by prewarm() """
+        try:
+            self.launch_browser()
+        except Exception as error:
+            self._prewarm_error = error
+
+    def _join_prewarm(self):
+        """ Wait for prewarm() to finish launching the browser, and raise any error it had """
+        thread = self._prewarm_thread
+        if thread is None or thread is threading.current_thread():
+            return  # Not prewarming, or still launching
+        thread.join()
+        self._prewarm_thread = None
+        if self._prewarm_error:
+            error, self._prewarm_error = self._prewarm_error, None
+            raise error
+
+    def _launch_lazy(self):
+        """ Launch the browser on first use """
+
+        if self._prewarm_thread is threading.current_thread():
+            return  # Still launching
+        with self._launch_lock:
+            if self._selenium_driver is None and self._lazy_pending:
+                self.launch_browser()
+
+    def launch_browser(self):
+        """ Launch browser and create instance. Sets self.selenium_driver once the browser is fully set up """
+
+        with self._launch_lock:
+            self._script_timeout = None
+            driver = None
+            try:
+                # Chrome
+                if self.browser_name == "chrome":
+                    driver = self.start_chrome()
+
+                # Firefox
+                elif self.browser_name == "firefox":
+                    driver = self.start_firefox()
+            except:
+                logging.error("Error starting web browser")
+                self._release_profile()  # The browser never started, so nothing else will
+                raise
+            self._lazy_pending = False
+            self.owns_browser = True
+            self.lifecycle.launched()
+            track(self)  # Closed at exit, if not before
+
+            if self.tracer:
+                self.tracer.attach_driver(driver)
+            self.selenium_driver = driver
 
     def start_chrome(self):
-        """ Configure and start Chrome """
+        """ Configure and start Chrome. Returns its Selenium driver """
+        from selenium import webdriver  # pylint: disable=import-outside-toplevel
 
         # Setup browser options
         options = webdriver.chrome.options.Options()  # Create options object
@@ -64,17 +268,25 @@ class WebAutomation:  # pylint: disable=too-many-public-methods
                 self.executable
             )
 
-        # Set Capabilities
-        cap = webdriver.common.desired_capabilities.DesiredCapabilities.CHROME
-        cap["loggingPrefs"] = {"browser": "ALL"}
+        # Set Capabilities. Copied, so Selenium's defaults aren't changed for every other Chrome instance
+        cap = dict(webdriver.common.desired_capabilities.DesiredCapabilities.CHROME)
+        cap["loggingPrefs"] = {"browser": "ALL", "driver": "WARNING"}
+        cap["goog:loggingPrefs"] = cap["loggingPrefs"]  # Name used when Chrome's driver talks the W3C protocol
+        performance_profiles.configure_chrome(self.performance_profile, options, cap)
+        for argument in self._profile_arguments():
+            options.add_argument(argument)
 
         # Create instance
-        self.selenium_driver = webdriver.Chrome(options=options, desired_capabilities=cap)  # Create instance
-        self.selenium_driver.implicitly_wait(self.webdriver_wait)  # Sets wait time
-        self.selenium_driver.maximize_window()  # Maximize window
+        driver = webdriver.Chrome(options=options, desired_capabilities=cap)  # Create instance
+        performance_profiles.configure_chrome_driver(self.performance_profile, driver)
+        if self.implicit_wait:
+            driver.implicitly_wait(self.webdriver_wait)  # Sets wait time
+        driver.maximize_window()  # Maximize window
+        return driver
 
     def start_firefox(self):
-        """ Configure and start Firefox """
+        """ Configure and start Firefox. Returns its Selenium driver """
+        from selenium import webdriver  # pylint: disable=import-outside-toplevel
 
         # Setup browser options
         options = webdriver.firefox.options.Options()  # Create options object
@@ -86,135 +298,316 @@ class WebAutomation:  # pylint: disable=too-many-public-methods
         if self.headless:
             options.add_argument("--headless")
 
+        performance_profiles.configure_firefox(self.performance_profile, options)
+        for argument in self._profile_arguments():
+            options.add_argument(argument)
+
         # Create instance
         try:
             # If user specifies an exact location, use it instead of the $PATH variable
-            self.selenium_driver = webdriver.Firefox(options=options, firefox_binary=self.executable)
+            driver = webdriver.Firefox(options=options, firefox_binary=self.executable)
         except exceptions.WebDriverException:
             logging.error(
                 "Error creating Selenium driver. Your web browser or browser driver may be out of date. \
                 Updating both should fix this.")
             raise
-        self.selenium_driver.implicitly_wait(self.webdriver_wait)
-        self.selenium_driver.maximize_window()
-
-    def _find_element(self, element_id, element_type):
+        if self.implicit_wait:
+            driver.implicitly_wait(self.webdriver_wait)
+        driver.maximize_window()
+        return driver
+
+    def _profile_arguments(self):
+        """ Browser arguments to start from a clone of the profile template, if there is one """
+        if self.profile_template is None:
+            return []
+        self._profile_dir = self.profile_template.clone()
+        return self.profile_template.arguments(self._profile_dir)
+
+    def _release_profile(self):
+        """ Remove the clone of the profile template the browser was started from, if any """
+        if self._profile_dir is not None:
+            self.profile_template.release(self._profile_dir)
+            self._profile_dir = None
+
+    def _find_element(self, element_id, element_type, use_cache=True):
         """ When provided an identifier, returns the element object which can be used by Selenium functions
 
             Exits with an exception if not found within the self.webdriver_wait timeout.
 
             Args:
                 element_id (str): Name/ID/XPATH/etc of element
-                element_type (str): Valid element type (see path_types below)
+                element_type (str): Valid element type (see PATH_TYPES)
+                use_cache (bool): False = Always ask the browser, even when the element cache is enabled
 
             Returns:
                 element object
         """
 
-        # Get object for the provided identifier
-        path_types = {
-            "id": self.selenium_driver.find_element_by_id,
-            "xpath": self.selenium_driver.find_element_by_xpath,
-            "link text": self.selenium_driver.find_element_by_link_text,
-            "partial link text": self.selenium_driver.find_element_by_partial_link_text,
-            "name": self.selenium_driver.find_element_by_name,
-            "class": self.selenium_driver.find_element_by_class_name,
-            "css selector": self.selenium_driver.find_element_by_css_selector,
-            "tag": self.selenium_driver.find_element_by_tag_name
-        }
+        assert element_type in PATH_TYPES, "Invalid element type provided"  # Notify about user error
+
+        # Reuse the element if it was already found
+        key = (element_type, element_id)
+        if use_cache and self.element_cache:
+            element = self._element_cache.get(key)
+            if element is not None:
+                self._cache_hits += 1
+                return element
+            self._cache_misses += 1
 
-        assert element_type in path_types, "Invalid element type provided"  # Notify about user error
-        element = path_types[element_type](element_id)  # Get element object
+        try:
+            element = self.selenium_driver.find_element(PATH_TYPES[element_type], element_id)  # Get element object
+        except exceptions.NoSuchElementException:
+            if self.implicit_wait:
+                raise
+            # Wait here instead of in the driver, then try once more
+            if not self.wait_for_conditions([condition("present", element_id, element_type)]):
+                raise
+            element = self.selenium_driver.find_element(PATH_TYPES[element_type], element_id)
         assert element is not None, "Element was not found. Likely does not exist on Web Page."
+
+        if self.element_cache:
+            self._element_cache[key] = element
         return element
 
+    def _with_elements(self, func, *locators):
+        """ Find elements, then call func with them
+
+            If a cached element has gone stale (removed from the page, or the page changed), it is found again
+            and func is retried once.
+
+            Args:
+                func (function): Called with one element object per locator
+                locators (tuple): (element_id, element_type) for each element func needs
+
+            Returns:
+                Whatever func returns
+        """
+
+        elements = [self._find_element(element_id, element_type) for element_id, element_type in locators]
+        try:
+            return func(*elements)
+        except exceptions.StaleElementReferenceException:
+            if not self.element_cache:
+                raise
+            for element_id, element_type in locators:
+                self._element_cache.pop((element_type, element_id), None)
+            elements = [self._find_element(element_id, element_type) for element_id, element_type in locators]
+            return func(*elements)
+
+    def clear_element_cache(self):
+        """ Forget every cached element. Done automatically when navigating """
+        self._element_cache.clear()
+        self._element_cache_url = None
+
+    def element_cache_stats(self):
+        """ Element cache counters
+
+            Returns:
+                dict: hits (finds served from the cache), misses (finds sent to the browser), size (elements cached)
+        """
+        return {"hits": self._cache_hits, "misses": self._cache_misses, "size": len(self._element_cache)}
+
+    def _note_url(self, url):
+        """ Clear the element cache if the page URL has changed since elements were cached """
+        if self._element_cache_url is not None and url != self._element_cache_url:
+            self._element_cache.clear()
+        self._element_cache_url = url
+
     ####################################################################
 
+    def wait_for_conditions(self, conditions, match="all", timeout=None):
+        """ Wait until conditions are met, or timeout reached
+
+            The wait runs inside the web page, and finishes as soon as the page changes to meet the conditions,
+            rather than polling from here. Navigating away during the wait is handled by waiting again on the
+            new page.
+
+            Args:
+                conditions (list): Conditions built with browser_scripts.condition(). Eg:
+                                   [condition("visible", "output", "id"), condition("url_contains", value="/done")]
+                match (str): "all" = every condition must be met; "any" = at least one condition must be met
+                timeout (int): Time in seconds. Defaults to self.webdriver_wait
+
+            Returns:
+                True if the conditions were met, False if not after the timeout has been reached
+        """
+
+        assert match in ("all", "any"), "Invalid match provided"
+        return self._wait_in_page(browser_scripts.WAIT_FOR_CONDITIONS, timeout, conditions, match)
+
+    def _wait_in_page(self, script, timeout, *args):
+        """ Run an asynchronous wait script until it reports {"met": true}, or timeout reached
+
+            The script is given args, then the milliseconds left. Navigating away during the wait is handled by
+            waiting again on the new page.
+
+            Returns:
+                True if the script reported met, False if not after the timeout has been reached
+        """
+
+        if timeout is None:
+            timeout = self.webdriver_wait
+        deadline = time() + timeout
+
+        while True:
+            remaining = max(0, deadline - time())
+            self._set_script_timeout(remaining + 5)  # Leave the browser time to report the wait timing out
+            try:
+                result = self.selenium_driver.execute_async_script(script, *args, int(remaining * 1000))
+            except exceptions.JavascriptException as error:
+                if "unload" not in str(error).lower():  # Page navigated away, so wait again on the new page
+                    raise
+                result = None
+
+            if result and result["met"]:
+                return True
+            if time() >= deadline:
+                return False
+
+    def wait_for_idle(self, idle_time=IDLE_TIME, timeout=None):
+        """ Wait until the page has had no network requests or DOM changes for idle_time seconds, or timeout reached
+
+            For pages which keep fetching and rendering after the load event. Requests are counted by wrapping
+            fetch() and XMLHttpRequest. Chrome counts them from the start of every page; other browsers from the
+            first wait on each page, with earlier activity taken from the browser's resource timings. Pages which
+            never stop changing (eg: animations driven by scripts, or long polling) time out.
+
+            Args:
+                idle_time (float): Seconds without activity which count as idle
+                timeout (int): Time in seconds. Defaults to self.webdriver_wait
+
+            Returns:
+                True if the page went idle, False if not after the timeout has been reached
+        """
+
+        driver = self.selenium_driver
+        if self.browser_name == "chrome" and self._idle_monitor_driver is not driver \
+                and hasattr(driver, "execute_cdp_cmd"):
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": browser_scripts.IDLE_MONITOR})
+            self._idle_monitor_driver = driver
+        return self._wait_in_page(browser_scripts.WAIT_FOR_IDLE, timeout, int(idle_time * 1000))
+
+    def _set_script_timeout(self, seconds):
+        """ Make sure scripts are allowed to run for at least "seconds" """
+        if self._script_timeout is None or self._script_timeout < seconds:
+            self.selenium_driver.set_script_timeout(seconds)
+            self._script_timeout = seconds
+
     def wait_for_element(self, element_id, element_type, timeout=None):
         """ Wait until element appears, or timeout reached
 
             Args:
                 element_id (str): Name/ID/XPATH/etc of element
-                element_type (str): If None, we will try to automatically determine the type of element
-                timeout (int): If set, driver wait is changed temporarily to "timeout". Time is in seconds
+                element_type (str): Valid element type (see PATH_TYPES)
+                timeout (int): Time in seconds. Defaults to self.webdriver_wait
 
             Returns:
                 True if element exists, False if not after the timeout has been reached
         """
-
-        # Change driver wait, if user requests it
-        if timeout:
-            self.selenium_driver.implicitly_wait(timeout)  # Sets wait time
-
-        # Try to access the element, and wait until it's found or timeout occurs
-        try:
-            result = True
-            self._find_element(element_id, element_type)  # Use implicitly_wait()
-        except exceptions.NoSuchElementException:
-            result = False
-        finally:
-            # Reset the wait time to default
-            self.selenium_driver.implicitly_wait(self.webdriver_wait)  # Sets wait time
-
-        return result  # Return True/False
+        return self.wait_for_conditions([condition("present", element_id, element_type)], timeout=timeout)
 
     def wait_for_element_removal(self, element_id, element_type, timeout=20):
-        """ Wait until element appears, or timeout reached
+        """ Wait until element is removed, or timeout reached
 
             Args:
                 element_id (str): Name/ID/XPATH/etc of element
-                element_type (str): If None, we will try to automatically determine the type of element
-                timeout (int): If set, driver wait is changed temporarily to "timeout". Time is in seconds
+                element_type (str): Valid element type (see PATH_TYPES)
+                timeout (int): Time in seconds
 
             Returns:
                 True if element does NOT exist
         """
+        return self.wait_for_conditions([condition("absent", element_id, element_type)], timeout=timeout)
 
-        # Sets wait time to minimum, so we don't waste time after the element's removal
-        self.selenium_driver.implicitly_wait(1)
+    def wait_for_visible(self, element_id, element_type, timeout=None):
+        """ Wait until element is displayed, or timeout reached
 
-        # Try to access the element, and wait until it's found or timeout occurs
-        result = True
-        etime = time() + timeout
-        while result:
-            result = self.wait_for_element(element_id, element_type, timeout=1)  # Check for elements existence
-            if result:
-                sleep(1)
-                if time() > etime:  # Timeout reached
-                    break
+            Returns:
+                True if element is visible, False if not after the timeout has been reached
+        """
+        return self.wait_for_conditions([condition("visible", element_id, element_type)], timeout=timeout)
 
-        # Reverse result, to make it more obvious that the test was successful
-        result = [True, False][result]
+    def wait_for_text(self, text, element_id, element_type, timeout=None):
+        """ Wait until element's text (or textbox value) equals "text", or timeout reached. See get_text()
 
-        # Reset to default wait time
-        self.selenium_driver.implicitly_wait(self.webdriver_wait)
+            Returns:
+                True if the text matches, False if not after the timeout has been reached
+        """
+        return self.wait_for_conditions([condition("text", element_id, element_type, value=text)], timeout=timeout)
 
-        return result  # Return True/False
+    def wait_for_attribute(self, attribute, pattern, element_id, element_type, timeout=None):
+        """ Wait until element's attribute matches a regular expression, or timeout reached
 
-    def wait_for_expected_conditions(self, url=None, is_in_url=None):
+            Args:
+                attribute (str): Attribute name. Eg: "class"
+                pattern (str): JavaScript regular expression. Eg: "^active$"
+                element_id (str): Name/ID/XPATH/etc of element
+                element_type (str): Valid element type (see PATH_TYPES)
+                timeout (int): Time in seconds. Defaults to self.webdriver_wait
+
+            Returns:
+                True if the attribute matches, False if not after the timeout has been reached
+        """
+        return self.wait_for_conditions([condition("attribute", element_id, element_type, value=pattern,
+                                                   name=attribute)], timeout=timeout)
+
+    def wait_for_expected_conditions(self, url=None, is_in_url=None, conditions=None, match="all", timeout=None):
         """ Wait for a condition to become available
 
-            Available Conditions:
-            https://seleniumhq.github.io/selenium/docs/api/py/webdriver_support/\
-                selenium.webdriver.support.expected_conditions.html
+            Raises selenium.common.exceptions.TimeoutException if the conditions are not met in time.
 
-            Args (must pick only one):
+            Args (must pick at least one of url, is_in_url, or conditions):
                 url (str): Waits for URL to change
-                is_in (str): Waits until URL contains the provided string
+                is_in_url (str): Waits until URL contains the provided string
+                conditions (list): Conditions built with browser_scripts.condition(). See wait_for_conditions()
+                match (str): "all" = every condition must be met; "any" = at least one condition must be met
+                timeout (int): Time in seconds. Defaults to self.webdriver_wait
         """
 
-        # Set time to wait, using default wait time
-        wait = WebDriverWait(self.selenium_driver, self.webdriver_wait)
-
-        # Wait depending on which type user selected
+        conditions = list(conditions or [])
         if url:
-            wait.until(EC.url_changes(url))
+            conditions.append(condition("url_changes", value=url))
         elif is_in_url:
-            wait.until(EC.url_contains(is_in_url))
+            conditions.append(condition("url_contains", value=is_in_url))
+
+        if not self.wait_for_conditions(conditions, match=match, timeout=timeout):
+            raise exceptions.TimeoutException("Expected conditions were not met")
+        self.clear_element_cache()
 
-    def open_url(self, url):
-        """ Go to URL in browser, and wait for page to load per the self.webdriver_wait time """
+    def open_url(self, url, timing=False, settle=False):
+        """ Go to URL in browser, and wait for page to load per the self.webdriver_wait time
+
+            Args:
+                url (str): Address to go to
+                timing (bool or TimingAggregator): True = return how long the page took to load;
+                                                   page_timing.TimingAggregator = also add the timing to it
+                settle (bool or float): True = also wait until the page stops fetching and changing. See
+                                        wait_for_idle(). A number = the idle time to wait for, in seconds
+
+            Returns:
+                page_timing.PageTiming when timing is set, otherwise None
+        """
+        self.clear_element_cache()
+        self._collect_page_logs()  # Before the page's messages are lost
+        if self.owns_browser and self.lifecycle.worn_out():
+            self.recycle()
         self.selenium_driver.get(url)
+        self.lifecycle.navigated(url)
+        self._collect_page_logs()  # Adds the console hook to the new page
+        if settle and not self.wait_for_idle(IDLE_TIME if settle is True else settle):
+            logging.warning("%s was still busy after %s seconds", url, self.webdriver_wait)
+        return self._page_timing(timing)
+
+    def _page_timing(self, timing):
+        """ Read how long the current page took to load, for open_url() and page_navigation() """
+        if not timing:
+            return None
+        result = self.selenium_driver.execute_async_script(browser_scripts.PAGE_TIMING, SLOWEST_RESOURCES)
+        self._note_url(result["url"])
+        record = page_timing(result)
+        if hasattr(timing, "add"):
+            timing.add(record)
+        return record
 
     def text_entry(self, text, element_id, element_type):
         """ Enter text into a text box
@@ -226,13 +619,73 @@ class WebAutomation:  # pylint: disable=too-many-public-methods
                                        Set it to the type you expect. Eg: "id"
         """
 
-        element = self._find_element(element_id, element_type)  # Get element object
-        element.click()  # Set focus
-        try:
-            element.clear()  # Remove any existing text
-        except exceptions.InvalidElementStateException:  # Ignore this when we need to enter text in non-text fields
-            pass
-        element.send_keys(text)  # Enter text
+        def _enter(element):
+            element.click()  # Set focus
+            try:
+                element.clear()  # Remove any existing text
+            except exceptions.InvalidElementStateException:  # Ignore this when we need to enter text in non-text fields
+                pass
+            element.send_keys(text)  # Enter text
+
+        self._with_elements(_enter, (element_id, element_type))
+
+    def fill_form(self, fields, mode="fast"):
+        """ Fill in many form fields at once. Like get_texts(), this does not wait for elements to appear
+
+            Args:
+                fields (dict): {(element_id, element_type): value}. value is the text for text boxes, True/False to
+                               tick/untick checkboxes and radio buttons, or the value or text of the option to choose
+                               in a drop down (a list of them for multiple choice drop downs)
+                mode (str): "fast" = set every value in one request, firing the input and change events pages listen
+                            for; "faithful" = click and type into each field with real key presses, all sent in one
+                            request. Drop downs are still set as in "fast" mode
+        """
+
+        assert mode in ("fast", "faithful"), "Invalid mode provided"
+        fields = [[element_id, element_type, value] for (element_id, element_type), value in fields.items()]
+        for field in fields:
+            assert field[1] in PATH_TYPES, "Invalid element type provided"  # Notify about user error
+
+        def _check_found(missing):
+            if missing:
+                raise exceptions.NoSuchElementException(
+                    f"Elements not found: {', '.join(repr(tuple(fields[index][:2])) for index in missing)}")
+
+        if mode == "faithful":
+            found = self.selenium_driver.execute_script(browser_scripts.FORM_FIELDS,
+                                                        [field[:2] for field in fields])
+            _check_found([index for index, element in enumerate(found) if element is None])
+            fields = self._type_fields(found, fields)
+        if fields:
+            _check_found(self.selenium_driver.execute_script(browser_scripts.FILL_FORM, fields))
+
+    def _type_fields(self, found, fields):
+        """ Click and type into form fields with a single Actions request, for fill_form(mode="faithful")
+
+            Args:
+                found (list): [element, kind, checked, in view] for each field, from browser_scripts.FORM_FIELDS
+                fields (list): [element_id, element_type, value] for each field
+
+            Returns:
+                list of the fields which can't be typed into, to set with browser_scripts.FILL_FORM instead
+        """
+
+        select_all = actions.META if sys.platform == "darwin" else actions.CONTROL
+        payload = actions.ActionPayload()
+        remaining = []
+        for (element, kind, checked, in_view), field in zip(found, fields):
+            value = field[2]
+            if kind == "select" or (kind == "radio" and not value and checked):  # Clicking can't untick a radio
+                remaining.append(field)
+            elif kind in ("checkbox", "radio"):
+                if bool(value) != checked:
+                    payload.reach(element, in_view).click(element)
+            else:
+                payload.reach(element, in_view).click(element)
+                payload.key_down(select_all).press("a").key_up(select_all).press(actions.BACKSPACE)
+                payload.type_text(str(value))
+        payload.perform(self.selenium_driver)
+        return remaining
 
     def click(self, element_id, element_type):
         """ Click on anything which has an identifiable name
@@ -243,12 +696,106 @@ class WebAutomation:  # pylint: disable=too-many-public-methods
                                        Set it to the type you expect. Eg: "id"
         """
 
-        element = self._find_element(element_id, element_type)  # Get element object
-        element.click()  # Click on object
+        self._with_elements(lambda element: element.click(), (element_id, element_type))  # Click on object
 
     def get_text(self, element_id, element_type):
         """ Retrieves text from a tag or textbox and returns it """
-        element = self._find_element(element_id, element_type)  # Get element object
+        return self._with_elements(self._element_text, (element_id, element_type))
+
+    def get_texts(self, locators):
+        """ Retrieves text from many tags or textboxes in a single request to the browser. See get_text()
+
+            Unlike get_text(), this does not wait for elements to appear.
+
+            Args:
+                locators (list or dict): (element_id, element_type) pairs, or {key: (element_id, element_type)}
+
+            Returns:
+                list of text in the same order as locators, or {key: text} when given a dict
+        """
+
+        keys, pairs = browser_scripts.split_locators(locators)
+
+        result = self.selenium_driver.execute_script(browser_scripts.READ_TEXTS, [list(pair) for pair in pairs])
+        if result["missing"]:
+            raise exceptions.NoSuchElementException(
+                f"Elements not found: {', '.join(repr(pairs[index]) for index in result['missing'])}")
+
+        if keys is not None:
+            return dict(zip(keys, result["texts"]))
+        return result["texts"]
+
+    read_many = get_texts
+
+    def snapshot(self):
+        """ Copy the page's elements in one request, to query without asking the browser again
+
+            The snapshot accepts the same element types as this class, and answers find_all(), exists(), count(),
+            get_text(), get_texts() and get_attribute() locally. It doesn't change when the page does, so take a new
+            one after the page changes.
+
+            Returns:
+                snapshot.DomSnapshot
+        """
+        result = self.selenium_driver.execute_script(browser_scripts.SNAPSHOT)
+        self._note_url(result["url"])
+        return DomSnapshot(result["root"], result["url"])
+
+    def find_all(self, element_id, element_type):
+        """ Every element matching the identifier, without waiting for any to appear
+
+            Returns:
+                list of element objects, empty if there are none
+        """
+        assert element_type in PATH_TYPES, "Invalid element type provided"  # Notify about user error
+        if not self.implicit_wait:
+            return self.selenium_driver.find_elements(PATH_TYPES[element_type], element_id)
+        # find_elements() would wait the full implicit wait when nothing matches, so search from the page instead
+        return self.selenium_driver.execute_script(browser_scripts.FIND_ALL, element_id, element_type)
+
+    def count(self, element_id, element_type):
+        """ Number of elements matching the identifier, without waiting for any to appear """
+        return self.count_many([(element_id, element_type)])[0]
+
+    def exists(self, element_id, element_type):
+        """ Whether an element exists, without waiting for it to appear
+
+            Returns:
+                True if element exists, False if not
+        """
+        return self.count(element_id, element_type) > 0
+
+    def count_many(self, locators):
+        """ Count the elements matching many identifiers in a single request, without waiting
+
+            Args:
+                locators (list or dict): (element_id, element_type) pairs, or {key: (element_id, element_type)}
+
+            Returns:
+                list of counts in the same order as locators, or {key: count} when given a dict
+        """
+        keys, pairs = browser_scripts.split_locators(locators)
+        counts = self.selenium_driver.execute_script(browser_scripts.COUNT_ALL, [list(pair) for pair in pairs])
+        if keys is not None:
+            return dict(zip(keys, counts))
+        return counts
+
+    def exists_many(self, locators):
+        """ Check whether many elements exist in a single request, without waiting
+
+            Args:
+                locators (list or dict): (element_id, element_type) pairs, or {key: (element_id, element_type)}
+
+            Returns:
+                {key: True/False} when given a dict, otherwise {(element_id, element_type): True/False}
+        """
+        keys, pairs = browser_scripts.split_locators(locators)
+        counts = self.count_many(pairs)
+        return {key: count > 0 for key, count in zip(keys if keys is not None else pairs, counts)}
+
+    @staticmethod
+    def _element_text(element):
+        """ Text of a textbox, or of a tag if not a textbox """
         value = element.get_attribute("value")  # Try to read as a textbox first, produces None if not a textbox
         if value is None:
             return element.text  # Should be a tag, so return it's text
@@ -260,7 +807,9 @@ class WebAutomation:  # pylint: disable=too-many-public-methods
             Returns:
                 URL (string)
         """
-        return self.selenium_driver.current_url
+        url = self.selenium_driver.current_url
+        self._note_url(url)
+        return url
 
     def accept_alert(self):
         """ Accept an alert """
@@ -282,41 +831,89 @@ class WebAutomation:  # pylint: disable=too-many-public-methods
         return result
 
     def click_hold(self, seconds, element_id, element_type):
-        """ Left click and hold specified number of seconds """
-        element = self._find_element(element_id, element_type)  # Get element object
-        action = ActionChains(self.selenium_driver).click_and_hold(element)
-        action.perform()
-        sleep(seconds)
-        action = ActionChains(self.selenium_driver).release(element)
-        action.perform()
+        """ Left click and hold specified number of seconds
+
+            The hold is a pause inside a single Actions request, timed by the browser.
+        """
+        self._with_elements(lambda element: self._hold_payload(element, seconds).perform(self.selenium_driver),
+                            (element_id, element_type))
+
+    def click_hold_async(self, seconds, element_id, element_type, callback=None):
+        """ Start a click_hold() without waiting for it to finish
+
+            The element is found straight away, then the hold runs on a background thread. Holds and other gestures
+            started this way run one after another. Don't send this browser anything else until the hold is done.
+            Use asyncio.wrap_future() to await the result from asyncio code.
+
+            Args:
+                seconds (float): Time to hold the mouse button down
+                element_id (str): Name/ID/XPATH/etc of element
+                element_type (str): Valid element type (see PATH_TYPES)
+                callback (function): Optional, called with the future once the hold is finished
+
+            Returns:
+                concurrent.futures.Future, whose result() is None, or raises the error the hold failed with
+        """
+
+        payload = self._with_elements(lambda element: self._hold_payload(element, seconds), (element_id, element_type))
+        future = self._background().submit(payload.perform, self.selenium_driver)
+        if callback:
+            future.add_done_callback(callback)
+        return future
+
+    def _hold_payload(self, element, seconds):
+        """ Actions which press the left mouse button on an element, and release it "seconds" later. The element is
+            scrolled into view by a script first, as wheel input isn't supported by older drivers
+        """
+        self.selenium_driver.execute_script(browser_scripts.SCROLL_INTO_VIEW, element)
+        return actions.ActionPayload().move_to(element).pointer_down().pause(seconds).pointer_up()
+
+    def _background(self):
+        """ Thread which runs gestures started without waiting for them. Created on first use """
+        with self._launch_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="web automation")
+            return self._executor
 
     def right_click(self, element_id, element_type):
         """ Right (context) click on element """
-        element = self._find_element(element_id, element_type)  # Get element object
-        action = ActionChains(self.selenium_driver).context_click(element)
-        action.perform()
+        self._with_elements(lambda element: self._action_chains().context_click(element).perform(),
+                            (element_id, element_type))
 
     def double_click(self, element_id, element_type):
         """ Double left click on element """
-        element = self._find_element(element_id, element_type)  # Get element object
-        action = ActionChains(self.selenium_driver).double_click(element)
-        action.perform()
+        self._with_elements(lambda element: self._action_chains().double_click(element).perform(),
+                            (element_id, element_type))
 
     def mouse_hover(self, element_id, element_type):
         """ Hover mouse over element """
-        element = self._find_element(element_id, element_type)  # Get element object
-        action = ActionChains(self.selenium_driver).move_to_element(element)
-        action.perform()
+        self._with_elements(lambda element: self._action_chains().move_to_element(element).perform(),
+                            (element_id, element_type))
 
     def drag_drop(self, src_element_id, src_element_type, dst_element_id, dst_element_type):
         """ Hover mouse over element  """
-        src_element = self._find_element(src_element_id, src_element_type)  # Get element object
-        dst_element = self._find_element(dst_element_id, dst_element_type)  # Get element object
-        action = ActionChains(self.selenium_driver).drag_and_drop(src_element, dst_element)
-        action.perform()
+        self._with_elements(lambda src, dst: self._action_chains().drag_and_drop(src, dst).perform(),
+                            (src_element_id, src_element_type), (dst_element_id, dst_element_type))
+
+    def sequence(self):
+        """ String gestures together, then perform them all in one request. Eg:
+
+                web.sequence().click("menu", "id").hover("submenu", "id").pause(0.5).click("item3", "id").perform()
+
+            Returns:
+                actions.ActionSequence, with click, double_click, right_click, hover, click_hold, drag_drop, key,
+                keys and pause methods which can be chained, and perform() to send them
+        """
+        return actions.ActionSequence(self)
+
+    def _action_chains(self):
+        """ New ActionChains for this browser """
+        from selenium.webdriver.common.action_chains import ActionChains  # pylint: disable=import-outside-toplevel
+        return ActionChains(self.selenium_driver)
 
     def keyboard_shortcut(self, character, control=False, alt=False, shift=False):
         """ Send any key press - UNTESTED """
+        from selenium.webdriver.common.keys import Keys  # pylint: disable=import-outside-toplevel
         key_combo = ""
         if control:
             key_combo += Keys.CONTROL
@@ -393,18 +990,222 @@ class WebAutomation:  # pylint: disable=too-many-public-methods
 
     def scroll_to_element(self, element_id, element_type):
         """ Move element until in view """
-        element = self._find_element(element_id, element_type)  # Get element object
-        self.selenium_driver.execute_script("arguments[0].scrollIntoView();", element)
+        self._with_elements(lambda element: self.selenium_driver.execute_script("arguments[0].scrollIntoView();",
+                                                                               element),
+                            (element_id, element_type))
+
+    def page_navigation(self, command, timing=False):
+        """ Various actions outside the web page
 
-    def page_navigation(self, command):
-        """ Various actions outside the web page """
+            Args:
+                command (str): "back", "forward" or "refresh"
+                timing (bool or TimingAggregator): See open_url(). Pages the browser restores from its back/forward
+                                                   cache report the timing of when they were first loaded
+
+            Returns:
+                page_timing.PageTiming when timing is set, otherwise None
+        """
+        self.clear_element_cache()
+        self._collect_page_logs()
         if command == 'back':
             self.selenium_driver.back()
         elif command == 'forward':
             self.selenium_driver.forward()
         elif command == 'refresh':
             self.selenium_driver.refresh()
+        self.lifecycle.navigated()
+        self._collect_page_logs()
+        return self._page_timing(timing)
 
-    def close(self):
-        """ Shut down the web browser driver. Failure to call this will result in zombie processes """
+    def new_tab(self, url=None):
+        """ Open a new tab in this browser, to run another journey in. See tabs.TabScheduler
+
+            Once tabs are open, calls made on this object go to whichever tab was used last.
+
+            Args:
+                url (str): Optional, address to open in the tab
+
+            Returns:
+                tabs.Tab, with the same methods as this class
+        """
+
+        with self._window_lock:
+            driver = self.selenium_driver
+            if self._window is None:
+                self._window = self._first_window = driver.current_window_handle
+            tab = Tab(self, self._new_window())
+            if url:
+                tab.open_url(url)
+            return tab
+
+    def _new_window(self):
+        """ Open a tab, leaving the current window selected. Returns its handle """
+        driver = self.selenium_driver
+        # W3C New Window, which Selenium 3 doesn't have a method for
+        driver.command_executor._commands.setdefault(  # pylint: disable=protected-access
+            "newWindow", ("POST", "/session/$sessionId/window/new"))
+        return driver.execute("newWindow", {"type": "tab"})["value"]["handle"]
+
+    def _switch_window(self, handle):
+        """ Make a window current, unless it already is, keeping each window's element cache apart """
+        if handle == self._window:
+            return
+        if self._window is not None:
+            self._window_caches[self._window] = (self._element_cache, self._element_cache_url)
+        self.selenium_driver.switch_to.window(handle)
+        self._element_cache, self._element_cache_url = self._window_caches.pop(handle, ({}, None))
+        self._window = handle
+
+    def _close_window(self, handle):
+        """ Close a window, then switch back to the first window, or to the next one left when that was closed """
+        self._switch_window(handle)
         self.selenium_driver.close()
+        self._element_cache, self._element_cache_url = {}, None
+        self._window = None
+        if handle == self._first_window:
+            handles = self.selenium_driver.window_handles
+            self._first_window = handles[0] if handles else None
+        if self._first_window is not None:
+            self._switch_window(self._first_window)
+
+    def _reset_windows(self, handle):
+        """ Forget every window's state, after windows were closed without Tab. handle = the current window """
+        self._window_caches.clear()
+        self.clear_element_cache()
+        self._window = self._first_window = handle
+
+    def collect_logs(self, level="INFO", sources=("browser", "driver"), interval=1.0, size=10000):
+        """ Start collecting browser console messages and driver logs. Stopped by close()
+
+            Chrome's logs are collected in the background. Firefox's are collected as pages are opened and left, and
+            on drain(). See log_stream.py
+
+            Args:
+                level (str): Lowest level kept: "DEBUG", "INFO", "WARNING" or "SEVERE"
+                sources (tuple): "browser" and/or "driver". Only Chrome has driver logs
+                interval (float): Seconds between collections
+                size (int): Most messages queued. The oldest are dropped (and counted) when full
+
+            Returns:
+                log_stream.LogCollector, to take messages from with drain() or stream()
+        """
+        collector = LogCollector(self, level=level, sources=sources, interval=interval, size=size).start()
+        self._log_collectors.append(collector)
+        return collector
+
+    def _collect_page_logs(self):
+        """ Read console messages from collectors' in-page hooks, which is only done on the calling thread """
+        for collector in self._log_collectors:
+            if collector.in_page and collector.running:
+                collector.collect()
+
+    def record_screenshots(self, path, **kwargs):
+        """ Start saving screenshot() frames to a zip archive, processed in the background. Finished by close()
+
+            Args:
+                path (str): Zip archive to create
+                kwargs: Passed to screenshots.ScreenshotPipeline(). Eg: workers, threshold, image_format
+
+            Returns:
+                screenshots.ScreenshotPipeline
+        """
+        from .screenshots import ScreenshotPipeline  # pylint: disable=import-outside-toplevel
+
+        if self.screenshots is not None:
+            self.screenshots.close()
+        self.screenshots = ScreenshotPipeline(path, **kwargs)
+        return self.screenshots
+
+    def screenshot(self, label=None):
+        """ Take a screenshot for the archive started by record_screenshots()
+
+            Only taking the screenshot holds up the caller. Frames which look the same as the one before aren't saved.
+
+            Args:
+                label (str): Optional, description stored in the archive's index. Eg: the step being performed
+
+            Returns:
+                int: Frame number
+        """
+        assert self.screenshots is not None, "Call record_screenshots() first"
+        return self.screenshots.capture(self, label)
+
+    def is_alive(self):
+        """ Check whether the browser still responds to commands
+
+            Returns:
+                True if the browser session is usable, False if it has crashed or been shut down
+        """
+        try:
+            self.selenium_driver.current_window_handle  # pylint: disable=pointless-statement
+        except Exception:
+            return False
+        return True
+
+    def recycle(self):
+        """ Replace the browser with a newly launched one, to free the memory it has built up
+
+            Done by open_url() once the browser has opened max_navigations pages, or uses more than max_memory.
+            Cookies, tabs and everything else in the old browser are lost.
+        """
+        self._join_prewarm()
+        with self._launch_lock:
+            self._quit_browser()
+            self.lifecycle.recycles += 1
+            self.launch_browser()
+
+    def _quit_browser(self):
+        """ Quit the browser and its driver, then make sure their processes have exited """
+        processes = self.lifecycle.processes()  # Found first, as the driver's children are orphaned when it exits
+        try:
+            self._selenium_driver.quit()
+        except Exception:  # Crashed, or already shut down
+            logging.debug("Error quitting the browser", exc_info=True)
+        self.lifecycle.reap(processes)
+        self._selenium_driver = None
+        self._release_profile()
+        untrack(self)
+        self.clear_element_cache()
+        self._window = self._first_window = None
+        self._window_caches = {}
+
+    def close(self):
+        """ Shut down the web browser and its driver. Also done on leaving a "with" block, and at exit
+
+            A browser joined with attach() is left running.
+        """
+        self._lazy_pending = False  # Never launched, so nothing to shut down
+        if self._prewarm_thread is not None:
+            self._prewarm_thread.join()  # Then the browser it launched is shut down below
+            self._prewarm_thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)  # Let a hold finish before the browser goes
+            self._executor = None
+        for collector in self._log_collectors:
+            collector.stop()  # Collects once more, so messages logged up to now aren't lost
+        self._log_collectors = []
+        if self.screenshots is not None:
+            self.screenshots.close()  # Finish writing the archive
+        if self.started and self.owns_browser:
+            self._quit_browser()
+        untrack(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _attached_driver(session_url, session_id, w3c):
+    """ Selenium driver which joins an existing browser session, rather than starting a new one """
+    from selenium.webdriver.remote.webdriver import WebDriver  # pylint: disable=import-outside-toplevel
+
+    class _AttachedDriver(WebDriver):  # pylint: disable=abstract-method
+        """ Remote driver whose start_session() joins session_id """
+        def start_session(self, capabilities, browser_profile=None):
+            self.session_id = session_id
+            self.w3c = w3c
+            self.capabilities = capabilities
+
+    return _AttachedDriver(command_executor=session_url, desired_capabilities={})
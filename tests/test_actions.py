@@ -0,0 +1,42 @@
+""" Tests actions.py """
+from src import actions
+
+
+def test_payload_ticks():
+    """ Verify every input source gets one action per tick, pausing where another source acts """
+    payload = actions.ActionPayload().click("element-id").pause(0.5).key_down(actions.CONTROL).press("a")
+    sources = {source["type"]: source["actions"] for source in payload.to_w3c()["actions"]}
+    assert set(sources) == {"pointer", "key"}
+    assert len(payload) == 7
+    assert all(len(steps) == len(payload) for steps in sources.values())
+    assert sources["pointer"][0]["origin"] == {actions.W3C_ELEMENT: "element-id"}
+    assert [step["type"] for step in sources["pointer"]] == ["pointerMove", "pointerDown", "pointerUp", "pause",
+                                                             "pause", "pause", "pause"]
+    assert sources["pointer"][3]["duration"] == 500
+    assert [step["type"] for step in sources["key"][4:]] == ["keyDown", "keyDown", "keyUp"]
+    assert sources["key"][0] == {"type": "pause", "duration": 0}
+
+
+def test_wheel_only_when_off_screen():
+    """ Verify wheel input is only sent to reach elements which are off-screen, or after the page has scrolled """
+
+    class _Web:
+        """ Stands in for a WebAutomation object, whose "low" element is below the fold """
+        def __init__(self):
+            self.selenium_driver = self
+            self.sent = None
+
+        def execute_script(self, _, locators):
+            """ [element, in view] for each locator """
+            return [[element_id, element_id != "low"] for element_id, _ in locators]
+
+        def execute(self, _, body):
+            """ Note the actions sent """
+            self.sent = {source["type"]: source["actions"] for source in body["actions"]}
+
+    web = _Web()
+    actions.ActionSequence(web).drag_drop("src", "id", "dst", "id").perform()
+    assert set(web.sent) == {"pointer"}
+    actions.ActionSequence(web).click("low", "id").click("src", "id").perform()
+    assert [step["type"] for step in web.sent["wheel"]] == ["scroll", "pause", "pause", "pause", "scroll", "pause",
+                                                            "pause", "pause"]
@@ -0,0 +1,90 @@
+""" Tests async_web_automation.py against the local web server, with a local geckodriver """
+import asyncio
+import os
+import aiohttp
+from src.async_web_automation import AsyncWebAutomation
+
+HOST = "http://localhost:5000"
+HEADLESS = not os.environ.get("disable_headless")
+
+
+def run(scenario):
+    """ Run a scenario coroutine with a fresh browser """
+    async def _run():
+        async with AsyncWebAutomation(browser_name="firefox", headless=HEADLESS) as web:
+            return await scenario(web)
+    return asyncio.run(_run())
+
+
+def test_click_button():
+    """ Verify we can press a button and read the result """
+    async def scenario(web):
+        await web.open_url(f"{HOST}/button")
+        await web.click("button1", "id")
+        assert await web.wait_for_text("Passed", "output", "id", timeout=5)
+        assert await web.get_text("output", "id") == "Passed"
+    run(scenario)
+
+
+def test_text_entry():
+    """ Enter text into input text box """
+    async def scenario(web):
+        await web.open_url(f"{HOST}/text_entry")
+        assert await web.get_text("text1", "id") == "default value"
+        await web.text_entry("Zebra", "text1", "id")
+        assert await web.get_texts([("text1", "id")]) == ["Zebra"]
+    run(scenario)
+
+
+def test_wait_for_idle():
+    """ Verify opening a page can wait for its fetches to finish """
+    async def scenario(web):
+        await web.open_url(f"{HOST}/fetching", settle=True)
+        assert await web.get_text("fetched", "id") == "3"
+    run(scenario)
+
+
+def test_wait_for_element_removal():
+    """ Test waiting for an element to appear and be deleted """
+    async def scenario(web):
+        await web.open_url(f"{HOST}/remove_element")
+        assert await web.wait_for_element("output", "id")
+        assert await web.wait_for_element_removal("output", "id")
+    run(scenario)
+
+
+def test_alert():
+    """ Verify text in an alert popup """
+    async def scenario(web):
+        await web.open_url(f"{HOST}/alert")
+        assert await web.get_alert_text() == "This is an alert"
+        assert await web.check_for_alert()
+        assert not await web.check_for_alert()
+    run(scenario)
+
+
+def test_keyboard_shortcut():
+    """ Verify key presses reach the page, with their modifiers """
+    async def scenario(web):
+        await web.open_url(f"{HOST}/button")
+        await web.execute_script("window.keys = []; document.body.addEventListener('keydown', function(event) {"
+                                 " window.keys.push([event.key, event.shiftKey]); });")
+        await web.keyboard_shortcut("a", shift=True)
+        await web.keyboard_shortcut("escape")
+        assert [key for key in await web.execute_script("return window.keys;") if key[0] != "Shift"] == [
+            ["A", True], ["Escape", False]]
+    run(scenario)
+
+
+def test_concurrent_sessions():
+    """ Verify one event loop drives several browsers at once, sharing one connection pool """
+    async def journey(http, value):
+        async with AsyncWebAutomation(headless=HEADLESS, http_session=http) as web:
+            await web.open_url(f"{HOST}/params?value={value}")
+            return await web.get_text("text", "id")
+
+    async def scenario():
+        async with aiohttp.ClientSession() as http:
+            return await asyncio.gather(*(journey(http, value) for value in ("one", "two", "three")))
+
+    assert asyncio.run(scenario()) == ["one", "two", "three"]
@@ -1,6 +1,6 @@
 """ Web server which serves web pages for testing the selenium wrapper """
 
-from flask import Flask, request
+from flask import Flask, request, send_from_directory
 
 app = Flask(__name__)
 
@@ -30,6 +30,41 @@ text_entry = f"""
 </body></html>
 """
 
+form_page = f"""
+{generic}
+<form method="GET" action="/output" oninput="document.getElementById('events').innerHTML++">
+<input type="text" value="default value" id="text1" name="text1">
+<textarea id="area1"></textarea>
+<input type="checkbox" id="check1">
+<input type="radio" name="colour" value="red" id="red" checked>
+<input type="radio" name="colour" value="blue" id="blue">
+<select id="select1"><option value="a">Alpha</option><option value="b">Bravo</option></select>
+<input type="submit">
+</form>
+<div id="events">0</div>
+</body></html>
+"""
+
+# Fetches three times after loading, 200 ms apart, then shows how many fetches it made
+fetching_page = """<html><body><div id="fetched">0</div><script>
+function next(count) {
+    document.getElementById("fetched").innerHTML = count;
+    if (count < 3) {
+        setTimeout(function () { fetch("/output").then(function () { next(count + 1); }); }, 200);
+    }
+}
+window.onload = function () { next(0); };
+</script></body></html>
+"""
+
+blocks_page = """<html><body><div id="blocks">
+  <h1>Title  </h1>
+  <p>First   paragraph,<br>second line</p>
+  <p>Non&nbsp;breaking</p>
+  <ul><li>One</li><li>Two</li></ul>
+  <span>Inline</span> <span>spans</span>
+</div></body></html>"""
+
 alert_page = """<html><body><script>alert("This is an alert")</script></body></html>"""
 
 delayed_element = """
@@ -192,25 +227,20 @@ window.onload = function() {
 """
 
 
+# The jquery files are sent with an ETag, so browsers can cache them
 @app.route("/jquery-1.7.2.min.js")
 def jquery():
-    with open("tests/test_data/jquery-1.7.2.min.js") as hdl:
-        data = hdl.read()
-    return data
+    return send_from_directory(app.root_path, "jquery-1.7.2.min.js")
 
 
 @app.route("/jquery-ui.min.js")
 def jquery2():
-    with open("tests/test_data/jquery-ui.min.js") as hdl:
-        data = hdl.read()
-    return data
+    return send_from_directory(app.root_path, "jquery-ui.min.js")
 
 
 @app.route("/jquery.ui.touch-punch.min.js")
 def jquery3():
-    with open("tests/test_data/jquery.ui.touch-punch.min.js") as hdl:
-        data = hdl.read()
-    return data
+    return send_from_directory(app.root_path, "jquery.ui.touch-punch.min.js")
 
 
 @app.route("/")
@@ -260,6 +290,16 @@ def textbox():
     return text_entry
 
 
+@app.route("/form")
+def form():
+    return form_page
+
+
+@app.route("/fetching")
+def fetching():
+    return fetching_page
+
+
 @app.route("/button")
 def button():
     return button_page
@@ -276,6 +316,11 @@ def params():
     return f'<html><body><div id="text">{text}</div></body></html>'
 
 
+@app.route("/blocks")
+def blocks():
+    return blocks_page
+
+
 if __name__ == "__main__":
     """ For manually testing the webpages """
     app.run()
@@ -0,0 +1,79 @@
+""" Tests lifecycle.py """
+import subprocess
+import sys
+from time import sleep, time
+import pytest
+from src.lifecycle import BrowserLifecycle
+from src.web_automation import WebAutomation
+
+HOST = "http://localhost:5000"
+
+
+class _Driver:
+    """ Stands in for a Selenium driver, whose service is a process which starts a child process """
+    def __init__(self):
+        code = "import subprocess, sys, time; subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']);" \
+               "time.sleep(60)"
+        self.process = subprocess.Popen([sys.executable, "-c", code])
+        self.service = self
+
+    def quit(self):
+        """ Stop the service, leaving its child running, like a driver which didn't shut the browser down """
+        self.process.terminate()
+        self.process.wait()
+
+
+class _Web:
+    """ Stands in for a WebAutomation object """
+    started = True
+
+    def __init__(self):
+        self._selenium_driver = _Driver()
+
+
+def test_navigations():
+    """ Verify a browser is worn out after the maximum number of pages """
+    lifecycle = BrowserLifecycle(None, max_navigations=2)
+    lifecycle.navigated()
+    assert not lifecycle.worn_out()
+    lifecycle.navigated()
+    assert lifecycle.worn_out()
+    lifecycle.launched()
+    assert not lifecycle.worn_out()
+
+
+def test_usage_and_reap():
+    """ Verify the whole process tree is measured, and processes left behind on quitting are killed """
+    psutil = pytest.importorskip("psutil")
+    web = _Web()
+    lifecycle = BrowserLifecycle(web, max_memory=1)
+    try:
+        deadline = time() + 10
+        while len(lifecycle.processes()) < 2 and time() < deadline:  # Give the child time to start
+            sleep(0.05)
+        usage = lifecycle.usage()
+        assert usage.processes == 2
+        assert usage.rss > 1024 * 1024
+        assert usage.handles > 0
+        assert lifecycle.worn_out()  # Uses over 1 MB
+
+        processes = lifecycle.processes()
+        web._selenium_driver.quit()  # pylint: disable=protected-access
+        assert lifecycle.reap(processes, timeout=0.5) == 1
+        for process in processes:
+            assert not process.is_running() or process.status() == psutil.STATUS_ZOMBIE  # Killed, not yet waited for
+    finally:
+        web._selenium_driver.process.kill()  # pylint: disable=protected-access
+
+
+def test_recycle():
+    """ Verify the browser is relaunched after the maximum number of pages, and quit when the block ends """
+    with WebAutomation(headless=True, max_navigations=2) as web:
+        for _ in range(3):
+            web.open_url(f"{HOST}/button")
+        assert web.lifecycle.recycles == 1
+        assert web.lifecycle.navigations == 1
+        driver = web.selenium_driver
+    assert not web.started
+    with pytest.raises(Exception):
+        driver.current_url  # pylint: disable=pointless-statement
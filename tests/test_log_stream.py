@@ -0,0 +1,81 @@
+""" Tests log_stream.py """
+from time import sleep
+import pytest
+from selenium.common import exceptions
+from src.log_stream import LogCollector
+
+HOST = "http://localhost:5000"
+
+
+class _Page:
+    """ Stands in for a Firefox WebAutomation object, whose page has logged "count" messages """
+    browser_name = "firefox"
+    started = True
+
+    def __init__(self, count):
+        self.selenium_driver = self
+        self.switch_to = self
+        self.count = count
+
+    @property
+    def alert(self):
+        """ No alert is open """
+        raise exceptions.NoAlertPresentException()
+
+    def execute_script(self, _, limit):
+        """ Messages the console hook recorded, keeping the newest "limit" """
+        entries = [["WARNING" if index % 2 else "INFO", f"message {index}", 1000 * index] for index in range(self.count)]
+        return {"entries": entries[-limit:], "dropped": max(0, self.count - limit)}
+
+
+def test_bounded_queue():
+    """ Verify the queue keeps the newest messages at or above the level, and counts the rest as dropped """
+    collector = LogCollector(_Page(30), level="WARNING", size=10)
+    assert collector.collect() == 5  # The page dropped 20 of 30, and 5 of the rest are INFO
+    assert collector.collect() == 5
+    entries = collector.drain()
+    assert len(entries) == 10
+    assert entries[-1].message == "message 29"
+    assert entries[-1].timestamp == 29
+    assert collector.stats() == {"collected": 10, "dropped": 40, "queued": 0}
+    assert list(collector.stream(timeout=0)) == []
+
+
+
+def test_stream_in_page():
+    """ Verify an in-page hook is streamed from the calling thread, which needs a timeout, without a background thread """
+    page = _Page(2)
+    collector = LogCollector(page, level="INFO", interval=0.05).start()
+    assert collector._thread is None  # pylint: disable=protected-access
+    with pytest.raises(AssertionError):
+        next(collector.stream())
+    stream = collector.stream(timeout=0.2)
+    assert next(stream).message == "message 0"
+    page.count = 0  # Nothing more logged
+    assert [entry.message for entry in stream] == ["message 1"]
+    collector.stop()
+    assert not collector.running
+
+def test_console_messages(web):
+    """ Verify console messages are collected and filtered by level """
+    collector = web.collect_logs(level="WARNING", interval=0.1)
+    web.open_url(f"{HOST}/button")
+    web.selenium_driver.execute_script("console.info('ignored'); console.warn('careful'); console.error('broken');")
+    collector.stop()
+    messages = [entry.message for entry in collector.drain() if entry.source == "browser"]
+    assert any("careful" in message for message in messages)
+    assert any("broken" in message for message in messages)
+    assert not any("ignored" in message for message in messages)
+
+
+def test_alert_left_open(web):
+    """ Verify collecting doesn't dismiss an alert, and messages are still collected once it's accepted """
+    collector = web.collect_logs(level="WARNING", interval=0.05)
+    web.open_url(f"{HOST}/alert")
+    sleep(0.3)  # Several intervals
+    assert collector.drain() == [] or web.browser_name == "chrome"
+    assert web.get_alert_text() == "This is an alert"
+    web.accept_alert()
+    web.open_url(f"{HOST}/button")
+    web.selenium_driver.execute_script("console.warn('after');")
+    assert any("after" in entry.message for entry in collector.drain())
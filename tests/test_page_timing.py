@@ -0,0 +1,46 @@
+""" Tests page_timing.py """
+import random
+from src.page_timing import PageTiming, StreamingHistogram, TimingAggregator
+from src.tracing import percentile
+
+HOST = "http://localhost:5000"
+
+
+def test_streaming_percentiles():
+    """ Verify percentiles stay within the precision asked for, without keeping the samples """
+    generator = random.Random(1)
+    samples = [generator.lognormvariate(-2, 1) for _ in range(20000)]
+    histogram = StreamingHistogram(precision=0.01)
+    for sample in samples:
+        histogram.add(sample)
+    ordered = sorted(samples)
+    for fraction in (0.5, 0.95, 0.99):
+        assert abs(histogram.percentile(fraction) / percentile(ordered, fraction) - 1) <= 0.01
+    assert histogram.stats()["max"] == ordered[-1]
+    assert len(histogram._buckets) < 1500  # pylint: disable=protected-access
+    assert StreamingHistogram().percentile(0.5) is None
+
+
+def test_aggregator():
+    """ Verify timings are grouped by page, ignoring the query string """
+    aggregator = TimingAggregator()
+    for index in range(10):
+        aggregator.add(PageTiming(f"{HOST}/params?value={index}", "navigate", 0.01 * (index + 1), 0.2, None, 0, []))
+    summary = aggregator.summary()
+    assert list(summary) == [f"{HOST}/params"]
+    assert summary[f"{HOST}/params"]["ttfb"]["count"] == 10
+    assert summary[f"{HOST}/params"]["load"]["count"] == 0  # The load event hadn't finished
+    assert 0.049 < summary[f"{HOST}/params"]["ttfb"]["p50"] < 0.051
+    assert "/params" in aggregator.report()
+
+
+def test_open_url_timing(web):
+    """ Verify open_url() reports how long the page took, and adds it to an aggregator """
+    aggregator = TimingAggregator()
+    timing = web.open_url(f"{HOST}/drag", timing=aggregator)
+    assert timing.url == f"{HOST}/drag"
+    assert 0 <= timing.ttfb <= timing.dom_content_loaded <= timing.load
+    assert any(resource["name"].endswith(".js") for resource in timing.resources)
+    assert web.page_navigation("refresh", timing=True).navigation == "reload"
+    assert web.open_url(f"{HOST}/button") is None
+    assert aggregator.summary()[f"{HOST}/drag"]["load"]["count"] == 1
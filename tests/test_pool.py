@@ -0,0 +1,97 @@
+""" Tests pool.py """
+import os
+import pytest
+from src.pool import WebAutomationPool, _PooledSession
+
+HOST = "http://localhost:5000"
+OTHER_HOST = "http://127.0.0.1:5000"
+
+
+@pytest.fixture(scope="function")
+def pool(request):
+    """ Pool holding a single headless browser """
+    obj = WebAutomationPool(size=1, browser_name="firefox", headless=not os.environ.get("disable_headless"))
+    request.addfinalizer(obj.close)
+    return obj
+
+
+def test_session_reused(pool):
+    """ Verify the same browser is lent out again rather than a new one launched """
+    with pool.session() as web:
+        first = web
+        web.open_url(f"{HOST}/button")
+    with pool.session() as web:
+        assert web is first
+        assert web.get_url() == "about:blank"  # Reset on return
+
+    stats = pool.stats()
+    assert stats["launches"] == 1
+    assert stats["hits"] == 2
+    assert stats["hit_rate"] == 1.0
+
+
+def test_state_reset(pool):
+    """ Verify cookies, storage and extra windows are removed when a session is returned """
+    with pool.session() as web:
+        for host in (HOST, OTHER_HOST):  # Different origins
+            web.open_url(f"{host}/button")
+            web.selenium_driver.add_cookie({"name": "pool", "value": "dirty"})
+            web.selenium_driver.execute_script("localStorage.setItem('pool', 'dirty');"
+                                               " sessionStorage.setItem('pool', 'dirty');")
+        web.selenium_driver.execute_script("window.open('about:blank');")
+
+    with pool.session() as web:
+        assert len(web.selenium_driver.window_handles) == 1
+        for host in (HOST, OTHER_HOST):
+            web.open_url(f"{host}/button")
+            assert web.selenium_driver.get_cookie("pool") is None
+            assert web.selenium_driver.execute_script(
+                "return [localStorage.getItem('pool'), sessionStorage.getItem('pool')];") == [None, None]
+
+
+def test_dead_session_replaced(pool):
+    """ Verify a crashed browser is replaced with a new one """
+    with pool.session() as web:
+        web.selenium_driver.quit()
+
+    with pool.session() as web:
+        assert web.is_alive()
+
+    stats = pool.stats()
+    assert stats["replacements"] == 1
+    assert stats["launches"] == 2
+
+
+def test_max_uses():
+    """ Verify sessions are replaced after being lent out the maximum number of times """
+    with WebAutomationPool(size=1, max_uses=1, headless=True) as pool:
+        with pool.session() as web:
+            first = web
+        with pool.session() as web:
+            assert web is not first
+        assert pool.stats()["misses"] == 1
+
+
+def test_failed_replacement(monkeypatch):
+    """ Verify an error launching a replacement session doesn't hide the error from the borrower's block """
+
+    class _Web:
+        """ Stands in for a WebAutomation object which can't be reset """
+        def close(self):
+            """ Nothing to shut down """
+
+    def _fail(*_, **__):
+        raise RuntimeError("No browser")
+
+    pool = WebAutomationPool(size=0)
+    monkeypatch.setattr(pool, "_reset", _fail)
+    monkeypatch.setattr("src.pool.WebAutomation", _fail)
+    pool.size = 1
+    pool._reserve_slot()  # pylint: disable=protected-access
+    entry = _PooledSession(_Web())
+    with pytest.raises(ValueError):
+        try:
+            raise ValueError("Borrower's error")
+        finally:
+            pool._release(entry)  # pylint: disable=protected-access
+    assert pool.stats()["size"] == 0
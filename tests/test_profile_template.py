@@ -0,0 +1,75 @@
+""" Tests profile_template.py """
+import json
+import os
+import pytest
+from src.profile_template import ProfileTemplate
+from src.web_automation import WebAutomation
+
+HOST = "http://localhost:5000"
+JQUERY = f"{HOST}/jquery-1.7.2.min.js"
+
+
+def test_clone(tmp_path):
+    """ Verify every file is cloned separately from the template, and lock files are left out """
+    path = tmp_path / "firefox"
+    (path / "cache2" / "entries").mkdir(parents=True)
+    (path / "cache2" / "entries" / "ABC123").write_bytes(b"cached")
+    (path / "prefs.js").write_text("user_pref('a', 1);")
+    (path / "lock").write_text("")
+    (path / "template.json").write_text(json.dumps({"version": 1, "browser_name": "firefox"}))
+
+    template = ProfileTemplate(str(path), browser_name="chrome")
+    assert template.browser_name == "firefox"  # Taken from the template
+    clone = template.clone()
+    try:
+        assert os.path.dirname(clone) == str(tmp_path)
+        assert sorted(os.listdir(clone)) == ["cache2", "prefs.js"]
+        cached = os.path.join(clone, "cache2", "entries", "ABC123")
+        with open(cached, "rb") as hdl:
+            assert hdl.read() == b"cached"
+        assert not os.path.samefile(cached, path / "cache2" / "entries" / "ABC123")
+        assert not os.path.samefile(os.path.join(clone, "prefs.js"), path / "prefs.js")
+        assert template.arguments(clone) == ["-profile", clone]
+    finally:
+        template.release(clone)
+    assert not os.path.exists(clone)
+    assert os.path.exists(path / "cache2" / "entries" / "ABC123")
+
+
+def test_clone_released_on_failed_launch(tmp_path):
+    """ Verify the clone is removed when the browser fails to start """
+    path = tmp_path / "firefox"
+    path.mkdir()
+    (path / "template.json").write_text(json.dumps({"version": 1, "browser_name": "firefox"}))
+
+    class _BrokenBrowser(WebAutomation):
+        """ Browser which fails to start after its profile is cloned """
+        def start_firefox(self):
+            self._profile_arguments()
+            raise RuntimeError("No browser")
+
+    web = _BrokenBrowser(profile_template=str(path), lazy=True)
+    with pytest.raises(RuntimeError):
+        web.launch_browser()
+    assert web._profile_dir is None  # pylint: disable=protected-access
+    assert sorted(os.listdir(tmp_path)) == ["firefox"]
+
+
+def _jquery_size(web):
+    """ Bytes transferred for jquery when the drag page was last opened """
+    timing = web.open_url(f"{HOST}/drag", timing=True)
+    return next(resource["size"] for resource in timing.resources if resource["name"] == JQUERY)
+
+
+def test_warm_cache(tmp_path):
+    """ Verify a session started from a template has jquery cached already, where a fresh session downloads it """
+    template = ProfileTemplate(str(tmp_path / "firefox"))
+    template.build([f"{HOST}/drag"], headless=True)
+    assert template.metadata["cache_files"] > 0
+
+    with WebAutomation(headless=True) as web:
+        assert _jquery_size(web) > 10000
+    with WebAutomation(headless=True, profile_template=template) as web:
+        clone = web._profile_dir  # pylint: disable=protected-access
+        assert _jquery_size(web) < 10000  # Only revalidated
+    assert not os.path.exists(clone)
@@ -0,0 +1,107 @@
+""" Tests recording.py """
+import json
+from src.recording import ScenarioPlayer, ScenarioRecorder, compile_steps
+
+HOST = "http://localhost:5000"
+
+
+def _step(action, **args):
+    """ A recorded step """
+    return {"action": action, "args": args, "result": None, "duration": 0}
+
+
+def test_compile():
+    """ Verify runs of reads, form fills, gestures and waits are merged, and other steps are kept in order """
+    steps = [
+        _step("open_url", url=f"{HOST}/form"),
+        _step("wait_for_element", element_id="text1", element_type="id"),
+        _step("wait_for_visible", element_id="area1", element_type="id", timeout=3),
+        _step("text_entry", text="Zebra", element_id="text1", element_type="id"),
+        _step("text_entry", text="Lion", element_id="area1", element_type="id"),
+        _step("text_entry", text="Tiger", element_id="text1", element_type="id"),  # Same field again
+        _step("get_text", element_id="text1", element_type="id"),
+        _step("get_texts", locators=[("area1", "id"), ("select1", "id")]),
+        _step("click", element_id="check1", element_type="id"),
+        _step("mouse_hover", element_id="blue", element_type="id"),
+        _step("double_click", element_id="red", element_type="id"),
+    ]
+    plan = compile_steps(steps)
+    assert [(step.action, step.steps) for step in plan] == [
+        ("open_url", [0]),
+        ("wait_for_conditions", [1, 2]),
+        ("wait_for_conditions", []),
+        ("fill_form", [3, 4]),
+        ("text_entry", [5]),
+        ("wait_for_conditions", []),
+        ("get_texts", [6, 7]),
+        ("click", [8]),
+        ("wait_for_conditions", []),
+        ("sequence", [9, 10]),
+    ]
+    assert plan[1].args["timeout"] is None  # The longest of the waits merged
+    assert plan[3].args == {"fields": {("text1", "id"): "Zebra", ("area1", "id"): "Lion"}, "mode": "faithful"}
+    assert plan[6].args["locators"] == [("text1", "id"), ("area1", "id"), ("select1", "id")]
+
+
+def test_compile_waits():
+    """ Verify waits are only merged when they can be met together, so order-dependent waits are played in turn """
+    steps = [
+        _step("wait_for_element", element_id="output", element_type="id"),
+        _step("wait_for_element_removal", element_id="output", element_type="id"),
+        _step("wait_for_element", element_id="text1", element_type="id"),
+        _step("wait_for_visible", element_id="text1", element_type="id"),
+        _step("wait_for_text", text="Zebra", element_id="text1", element_type="id"),
+        _step("wait_for_text", text="Lion", element_id="text1", element_type="id"),
+    ]
+    assert [(step.action, step.steps) for step in compile_steps(steps)] == [
+        ("wait_for_element", [0]),
+        ("wait_for_element_removal", [1]),
+        ("wait_for_element", [2]),
+        ("wait_for_visible", [3]),
+        ("wait_for_text", [4]),
+        ("wait_for_text", [5]),
+    ]
+
+
+def test_save_and_load(tmp_path):
+    """ Verify fill_form() fields, which have tuple keys, survive being saved """
+
+    class _Web:
+        """ Stands in for a WebAutomation object """
+        def fill_form(self, fields, mode="fast"):
+            """ Fill in nothing """
+
+        def get_text(self, element_id, element_type):
+            """ Text of every element """
+            return f"{element_id} text"
+
+    web = _Web()
+    with ScenarioRecorder(web) as recorder:
+        web.fill_form({("text1", "id"): "Zebra"})
+        assert web.get_text("text1", element_type="id") == "text1 text"
+    assert "get_text" not in web.__dict__  # Methods put back
+    path = tmp_path / "scenario.json"
+    recorder.save(str(path))
+    assert json.loads(path.read_text())["version"] == 1
+
+    player = ScenarioPlayer(str(path))
+    assert player.steps[0]["args"] == {"fields": {("text1", "id"): "Zebra"}}
+    assert player.steps[1]["args"] == {"element_id": "text1", "element_type": "id"}
+    assert player.play(web, check=True) == [None, "text1 text"]
+    assert "2 calls, 2 steps" in player.report()
+
+
+def test_record_and_play(web, tmp_path):
+    """ Record a form being filled in, then play it back with fewer calls """
+    path = str(tmp_path / "scenario.json")
+    with ScenarioRecorder(web) as recorder:
+        web.open_url(f"{HOST}/form")
+        web.text_entry("Zebra", "text1", "id")
+        web.text_entry("Lion", "area1", "id")
+        web.get_text("text1", "id")
+        web.get_text("area1", "id")
+    recorder.save(path)
+
+    player = ScenarioPlayer(path)
+    assert player.play(web, check=True)[3:] == ["Zebra", "Lion"]
+    assert len(player.timings) == 5  # open_url, wait, fill_form, wait, get_texts
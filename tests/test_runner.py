@@ -0,0 +1,76 @@
+""" Tests runner.py """
+import json
+import sys
+from src.runner import ScenarioResult, ScenarioRunner, load_scenarios, plan_shards
+
+HOST = "http://localhost:5000"
+
+
+def scenario_button(web):
+    """ Press a button """
+    web.open_url(f"{HOST}/button")
+    web.click("button1", "id")
+    assert web.wait_for_text("Passed", "output", "id", timeout=5)
+
+
+def scenario_text_entry(web):
+    """ Enter text """
+    web.open_url(f"{HOST}/text_entry")
+    web.text_entry("Zebra", "text1", "id")
+    assert web.get_text("text1", "id") == "Zebra"
+
+
+def scenario_failure(web):
+    """ Always fails """
+    web.open_url(f"{HOST}/button")
+    assert web.get_text("output", "id") == "never"
+
+
+def test_plan_shards():
+    """ Verify the longest scenarios are spread out first, so workers get equal amounts of work """
+    durations = {"a": 10, "b": 6, "c": 5, "d": 4, "e": 1}
+    shards = plan_shards(list(durations), durations, 2)
+    assert shards == [["a", "d"], ["b", "c", "e"]]
+
+
+def test_plan_shards_unknown_duration():
+    """ Verify scenarios without history are expected to take the median time """
+    shards = plan_shards(["a", "b", "c", "new"], {"a": 1, "b": 3, "c": 5}, 2)
+    assert sorted(len(shard) for shard in shards) == [2, 2]
+
+
+def test_history_leaves_out_failures(tmp_path):
+    """ Verify scenarios which failed, or never ran, don't make it into the history as nearly free """
+    history = tmp_path / "durations.json"
+    history.write_text(json.dumps({"a": 4.0, "b": 6.0}))
+    runner = ScenarioRunner(["a", "b", "c"], history=str(history))
+    runner.results = [ScenarioResult("a", 0, True, 2.0, None), ScenarioResult("b", 0, False, 0.0, "Worker exited"),
+                      ScenarioResult("c", 1, False, 0.1, "AssertionError")]
+    runner._save_history(runner._load_history())  # pylint: disable=protected-access
+    assert json.loads(history.read_text()) == {"a": 3.0, "b": 6.0}
+
+
+def test_load_scenarios():
+    """ Verify scenarios are collected from a module in the order they are defined """
+    names = [func.__name__ for func in load_scenarios(sys.modules[__name__])]
+    assert names == ["scenario_button", "scenario_text_entry", "scenario_failure"]
+
+
+def test_run(tmp_path):
+    """ Verify scenarios run across workers, and failures are reported rather than stopping the run """
+    history = tmp_path / "durations.json"
+    runner = ScenarioRunner(load_scenarios(sys.modules[__name__]), workers=2, history=str(history), headless=True)
+    results = {result.name.split(":")[1]: result for result in runner.run()}
+
+    assert results["scenario_button"].passed
+    assert results["scenario_text_entry"].passed
+    assert not results["scenario_failure"].passed
+    assert "AssertionError" in results["scenario_failure"].error
+
+    report = runner.report()
+    assert report["scenarios"] == 3
+    assert report["failed"] == 1
+    assert report["throughput"] > 0
+    assert set(report["utilisation"]) == {0, 1}
+    assert history.exists()
+    assert not any(name.endswith("scenario_failure") for name in json.loads(history.read_text()))
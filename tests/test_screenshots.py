@@ -0,0 +1,87 @@
+""" Tests screenshots.py """
+import base64
+import io
+import json
+import zipfile
+import pytest
+from src import screenshots
+
+HOST = "http://localhost:5000"
+
+
+def _png(colour, box=None):
+    """ Base64 PNG of a page in one colour, with an optional black box (left, top, right, bottom) on it """
+    image_module = pytest.importorskip("PIL.Image")
+    image = image_module.new("RGB", (320, 240), colour)
+    if box:
+        image.paste((0, 0, 0), box)
+    output = io.BytesIO()
+    image.save(output, "PNG")
+    return base64.b64encode(output.getvalue()).decode()
+
+
+class _Browser:
+    """ Stands in for a WebAutomation object, whose screenshots are taken from a list """
+    def __init__(self, frames):
+        self.selenium_driver = self
+        self.frames = list(frames)
+
+    def get_screenshot_as_base64(self):
+        """ Next screenshot """
+        return self.frames.pop(0)
+
+
+def _index(path):
+    """ Index and file names of an archive """
+    with zipfile.ZipFile(path) as archive:
+        return json.loads(archive.read("index.json")), archive.namelist()
+
+
+def test_near_duplicates_skipped(tmp_path, monkeypatch):
+    """ Verify frames which barely changed are skipped without being compressed, and the rest are written in order """
+    white = _png("white")
+    frames = [white, _png("white", (300, 230, 302, 232)), _png("white", (100, 60, 220, 180)), white]
+    browser = _Browser(frames)
+    compressed = []
+    compress = screenshots.ScreenshotPipeline._compress  # pylint: disable=protected-access
+    monkeypatch.setattr(screenshots.ScreenshotPipeline, "_compress",
+                        lambda pipeline, picture: compressed.append(picture) or compress(pipeline, picture))
+    path = str(tmp_path / "session.zip")
+    with screenshots.ScreenshotPipeline(path, workers=4) as pipeline:
+        for step in range(len(frames)):
+            assert pipeline.capture(browser, f"step {step}") == step
+    index, names = _index(path)
+    assert [frame.get("skipped") for frame in index["frames"]] == [None, "duplicate", None, None]
+    assert index["frames"][1]["same_as"] == "frames/000000.png"
+    assert names == ["frames/000000.png", "frames/000002.png", "frames/000003.png", "index.json"]
+    assert pipeline.stats()["duplicates"] == 1
+    assert len(compressed) == 3
+
+
+def test_exact_duplicates_without_pillow(tmp_path, monkeypatch):
+    """ Verify only identical frames are skipped when Pillow isn't installed """
+    white = _png("white")
+    browser = _Browser([white, white, _png("white", (300, 230, 302, 232))])
+    monkeypatch.setattr(screenshots, "Image", None)
+    path = str(tmp_path / "session.zip")
+    with screenshots.ScreenshotPipeline(path) as pipeline:
+        for _ in range(3):
+            pipeline.capture(browser)
+    index, _ = _index(path)
+    assert [frame.get("skipped") for frame in index["frames"]] == [None, "duplicate", None]
+    assert not index["perceptual_hash"]
+
+
+def test_screenshot(web, tmp_path):
+    """ Verify screenshots from the browser are archived when the browser is closed """
+    path = str(tmp_path / "session.zip")
+    web.record_screenshots(path)
+    web.open_url(f"{HOST}/button")
+    web.screenshot("before")
+    web.screenshot("same page")
+    web.click("button1", "id")
+    web.screenshot("after")
+    web.screenshots.close()
+    index, _ = _index(path)
+    assert [frame["label"] for frame in index["frames"]] == ["before", "same page", "after"]
+    assert index["frames"][1]["skipped"] == "duplicate"
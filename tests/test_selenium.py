@@ -1,5 +1,11 @@
 """ Tests web_automation.py. However, we have to use some of it's functions in order to test other functions. """
+from time import sleep, time
+import subprocess
+import sys
 import pytest
+from selenium.common import exceptions
+from src.browser_scripts import condition
+from src.web_automation import WebAutomation
 from tenacity import retry, wait_fixed, stop_after_attempt
 
 HOST = "http://localhost:5000"
@@ -89,6 +95,57 @@ def test_text_entry(web):
     verify(web.get_text, ("text1", "id"), text)
 
 
+@pytest.mark.parametrize("mode", ["fast", "faithful"])
+def test_fill_form(web, mode):
+    """ Fill in a text box, text area, checkbox, radio button and drop down together """
+    web.open_url(f"{HOST}/form")
+    web.fill_form({("text1", "id"): "Zebra", ("area1", "id"): "Lion", ("check1", "id"): True, ("blue", "id"): True,
+                   ("select1", "id"): "Bravo"}, mode=mode)
+    assert web.get_texts([("text1", "id"), ("area1", "id"), ("select1", "id")]) == ["Zebra", "Lion", "b"]
+    assert web.selenium_driver.execute_script(
+        "return [check1.checked, red.checked, blue.checked]") == [True, False, True]
+    assert int(web.get_text("events", "id")) > 0  # The page saw input events
+    with pytest.raises(exceptions.NoSuchElementException):
+        web.fill_form({("missing", "id"): "Zebra"}, mode=mode)
+
+
+def test_get_texts(web):
+    """ Read text from a textbox and a tag in one call """
+    web.open_url(f"{HOST}/text_entry")
+    assert web.get_texts([("text1", "id"), ("output", "id")]) == [DEFAULT_VALUE, ""]
+    assert web.read_many({"box": ("text1", "id")}) == {"box": DEFAULT_VALUE}
+    with pytest.raises(exceptions.NoSuchElementException):
+        web.get_texts([("text1", "id"), ("missing", "id")])
+
+
+def test_get_texts_blocks(web):
+    """ Verify text read in one call is laid out like Selenium's, across paragraphs, lists and line breaks """
+    web.open_url(f"{HOST}/blocks")
+    text = web.get_text("blocks", "id")
+    assert text == "Title\nFirst paragraph,\nsecond line\nNon breaking\nOne\nTwo\nInline spans"
+    assert web.get_texts([("blocks", "id")]) == [text]
+
+
+def test_exists(web):
+    """ Verify elements are checked for without waiting """
+    web.open_url(f"{HOST}/long")
+    start = time()
+    assert web.exists("ver10", "id")
+    assert not web.exists("missing", "id")
+    assert web.count("div", "tag") == 501
+    assert len(web.find_all("span", "tag")) == 500
+    assert web.find_all("missing", "class") == []
+    assert time() - start < 5  # Misses would take 20 seconds each if the driver waited for them
+
+
+def test_exists_many(web):
+    """ Verify a presence map for many elements comes back from one call """
+    web.open_url(f"{HOST}/button")
+    presence = web.exists_many({"button": ("button1", "id"), "form": ("form", "tag")})
+    assert presence == {"button": True, "form": False}
+    assert web.exists_many([("output", "id")]) == {("output", "id"): True}
+
+
 def test_get_url(web):
     """ Read URL from address bar """
     url = f"{HOST}/params?value=random_task"
@@ -104,6 +161,105 @@ def test_wait_for_element(web):
     assert element
 
 
+def test_explicit_waits():
+    """ Verify elements are still waited for when the driver's implicit wait is left at 0 """
+    web = WebAutomation(headless=True, implicit_wait=False)
+    try:
+        web.open_url(f"{HOST}/delayed_element")
+        assert web.get_text("output", "id") == "Div Tag Exists"  # Appears after 5 seconds
+
+        web.webdriver_wait = 1
+        start = time()
+        with pytest.raises(exceptions.NoSuchElementException):
+            web.click("missing", "id")
+        assert time() - start < 5
+    finally:
+        web.close()
+
+
+def test_lazy_launch():
+    """ Verify the browser is only launched on first use, or by prewarm() """
+    web = WebAutomation(headless=True, lazy=True)
+    try:
+        assert not web.started
+        web.prewarm()
+        web.open_url(f"{HOST}/button")
+        assert web.started
+        assert web.exists("button1", "id")
+    finally:
+        web.close()
+
+
+
+def test_prewarm_finishes_setup():
+    """ Verify the driver isn't used until prewarm() has finished setting it up """
+
+    class _Driver:
+        """ Stands in for a Selenium driver """
+        ready = False
+
+        def quit(self):
+            """ Nothing to shut down """
+
+    class _SlowLaunch(WebAutomation):
+        """ Browser which takes a while to set up after its driver is created """
+        def start_firefox(self):
+            driver = _Driver()
+            sleep(0.3)
+            driver.ready = True
+            return driver
+
+    web = _SlowLaunch(lazy=True)
+    try:
+        web.prewarm()
+        assert not web.started
+        assert web.selenium_driver.ready
+        assert web.started
+    finally:
+        web.close()
+
+def test_attach(web):
+    """ Verify a second object can drive a browser launched by another, and leaves it running """
+    web.open_url(f"{HOST}/button")
+    other = WebAutomation.attach(**web.export_session())
+    assert not other.owns_browser
+    other.click("button1", "id")
+    other.close()
+    verify_standard(web)
+
+
+def test_attach_without_implicit_wait(web):
+    """ Verify an attached object without implicit waits doesn't wait for missing elements with the owner's wait """
+    web.open_url(f"{HOST}/button")
+    other = WebAutomation.attach(implicit_wait=False, **web.export_session())
+    start = time()
+    assert not other.exists("missing", "id")
+    assert time() - start < 5
+    other.close()
+
+
+def test_attach_fallback(web):
+    """ Verify a dead session raises, or launches a new browser when allowed to """
+    details = web.export_session()
+    details["session_id"] = "no-such-session"
+    with pytest.raises(exceptions.WebDriverException):
+        WebAutomation.attach(fallback=False, **details)
+
+    other = WebAutomation.attach(headless=True, **details)
+    try:
+        assert other.owns_browser
+        assert other.is_alive()
+    finally:
+        other.close()
+
+
+def test_light_import():
+    """ Verify importing the wrapper doesn't load every browser driver, or optional modules """
+    code = "import sys; import src.web_automation; print([name in sys.modules for name in ('selenium.webdriver', " \
+           "'psutil', 'PIL')])"
+    assert subprocess.check_output([sys.executable, "-c", code]).strip() == b"[False, False, False]"
+
+
 def test_wait_for_element_removal(web):
     """ Test dynamically waiting for an element to be deleted """
     url = f"{HOST}/remove_element"
@@ -111,6 +267,56 @@ def test_wait_for_element_removal(web):
     assert web.wait_for_element_removal("output", "id")  # Returns true if removed
 
 
+def test_wait_for_element_timeout(web):
+    """ Verify waiting for an element which never appears returns False after the timeout """
+    web.open_url(f"{HOST}/button")
+    start = time()
+    assert not web.wait_for_element("missing", "id", timeout=1)
+    assert time() - start < 5
+
+
+def test_wait_for_text(web):
+    """ Verify waiting for an element's text to change """
+    web.open_url(f"{HOST}/button")
+    web.selenium_driver.execute_script("setTimeout(execute, 500);")
+    assert web.wait_for_text("Passed", "output", "id", timeout=5)
+
+
+def test_wait_for_attribute(web):
+    """ Verify waiting for an attribute to match a pattern """
+    web.open_url(f"{HOST}/button")
+    web.selenium_driver.execute_script(
+        "setTimeout(function() { document.getElementById('output').className = 'done'; }, 500);")
+    assert web.wait_for_attribute("class", "^done$", "output", "id", timeout=5)
+
+
+def test_wait_for_idle(web):
+    """ Verify waiting lasts until the page's chain of fetches has finished, and no longer """
+    web.open_url(f"{HOST}/fetching", settle=0.4)
+    assert web.get_text("fetched", "id") == "3"
+    start = time()
+    assert web.wait_for_idle(idle_time=0.4, timeout=5)  # Already idle
+    assert time() - start < 2
+
+
+def test_wait_for_conditions_any(web):
+    """ Verify "any" finishes once a single condition has been met """
+    web.open_url(f"{HOST}/delayed_element")
+    conditions = [condition("visible", "output", "id"), condition("present", "never", "id")]
+    assert web.wait_for_conditions(conditions, match="any", timeout=10)
+    assert not web.wait_for_conditions(conditions, match="all", timeout=1)
+
+
+def test_wait_for_expected_url(web):
+    """ Verify waiting for the URL to change, across a page load """
+    url = f"{HOST}/link"
+    web.open_url(url)
+    web.click("Go To Root", "link text")
+    web.wait_for_expected_conditions(url=url)
+    with pytest.raises(exceptions.TimeoutException):
+        web.wait_for_expected_conditions(is_in_url="never", timeout=1)
+
+
 def test_wait_for_expected_cond(web):
     """ Test dynamically waiting for an element to be deleted """
     url = f"{HOST}/remove_element"
@@ -130,6 +336,18 @@ def test_click_and_hold(web):
     assert seconds >= time_to_hold < time_to_hold + 1
 
 
+def test_click_hold_async(web):
+    """ Verify a hold started without waiting finishes in the background, and reports back """
+    web.open_url(f"{HOST}/drag")
+    finished = []
+    start = time()
+    future = web.click_hold_async(2, "block1", "id", callback=finished.append)
+    assert time() - start < 2  # Returned before the hold was over
+    assert future.result(timeout=10) is None
+    assert finished == [future]
+    assert float(web.get_text("separator", "id")) >= 2
+
+
 def test_right_click(web):
     """ Verify Javascript on the web page registers a right click """
     web.open_url(f"{HOST}/keypress")
@@ -161,6 +379,26 @@ def test_drag_drop(web):
     assert position2 > position1
 
 
+def test_sequence(web):
+    """ Verify several gestures and a key press are performed together """
+    web.open_url(f"{HOST}/keypress")
+    web.sequence().right_click("right_click", "id").double_click("double_click", "id").hover("hover", "id") \
+        .key("a").perform()
+    assert web.get_texts([("right_click", "id"), ("double_click", "id"), ("hover", "id"), ("char", "id")]) == \
+        ["executed", "executed", "executed", "a"]
+    with pytest.raises(exceptions.NoSuchElementException):
+        web.sequence().click("missing", "id").perform()
+
+
+def test_sequence_drag_drop(web):
+    """ Verify a drag and drop performed as part of a sequence """
+    web.open_url(f"{HOST}/drag")
+    web.click("block1", "id")  # Stores the current position in the element
+    position1 = int(web.get_text("position", "id"))
+    web.sequence().drag_drop("block1", "id", "block2", "id").perform()
+    assert int(web.get_text("position", "id")) > position1
+
+
 @pytest.mark.xfail(reason="Haven't found way to intercept keypresses in order to verify them")
 def test_keyboard_shortcut():
     """ Verifies various keyboard shortcuts """
@@ -226,3 +464,27 @@ def test_scroll_to_element(web, name):
     web.open_url(f"{HOST}/long")
     web.scroll_to_element(name, "id")
     web.mouse_hover(name, "id")  # Raises exception if element is not visible
+
+
+def test_element_cache(web):
+    """ Verify found elements are reused, and the cache is cleared on navigation """
+    web.element_cache = True
+    web.open_url(f"{HOST}/button")
+    web.get_text("output", "id")
+    web.click("button1", "id")
+    verify_standard(web)  # Same element object, text is still read from the browser
+    stats = web.element_cache_stats()
+    assert stats["misses"] == 2
+    assert stats["hits"] >= 1
+
+    web.open_url(f"{HOST}/button")
+    assert web.element_cache_stats()["size"] == 0
+
+
+def test_element_cache_stale(web):
+    """ Verify a cached element which was replaced on the page is found again """
+    web.element_cache = True
+    web.open_url(f"{HOST}/params?value=first")
+    assert web.get_text("text", "id") == "first"
+    web.selenium_driver.execute_script("document.body.innerHTML = '<div id=\"text\">second</div>';")
+    assert web.get_text("text", "id") == "second"
@@ -0,0 +1,95 @@
+""" Tests snapshot.py """
+import pytest
+from selenium.common import exceptions
+from src.snapshot import DomSnapshot
+
+HOST = "http://localhost:5000"
+
+
+def element(tag, attributes=None, *nodes, value=None, visible=True):
+    """ Serialized element, as sent by browser_scripts.SNAPSHOT """
+    return [tag, attributes or {}, value, visible, list(nodes)]
+
+
+PAGE = element(
+    "html", {},
+    element("head", {}, element("title", {}, "Shop", visible=False), visible=False),
+    element(
+        "body", {},
+        element("div", {"id": "menu", "class": "nav top"},
+                element("a", {"href": "/", "class": "link"}, "Home"),
+                " ",
+                element("a", {"href": "/basket", "class": "link active"}, "Your  ", element("b", {}, "basket"))),
+        element("ul", {"id": "items"},
+                *[element("li", {"class": "item", "data-index": str(index)}, f"Item {index}", value="0")
+                  for index in range(5)]),
+        element("p", {"id": "intro"}, "Line one", element("br"), " line\n two "),
+        element("div", {"id": "hidden", "style": "display: none"}, "Secret", visible=False),
+        element("input", {"type": "text", "name": "search", "id": "search", "value": "old"}, value="shoes"),
+    ),
+)
+
+
+@pytest.fixture(name="snapshot")
+def fixture_snapshot():
+    """ Snapshot of PAGE """
+    return DomSnapshot(PAGE, f"{HOST}/shop")
+
+
+def test_text(snapshot):
+    """ Verify text follows the same rules as get_text() """
+    assert snapshot.get_text("search", "id") == "shoes"  # Textbox value, rather than the attribute
+    assert snapshot.get_text("hidden", "id") == ""
+    assert snapshot.get_text("intro", "id") == "Line one\nline two"
+    assert snapshot.get_text("menu", "id") == "Home Your basket"
+    assert snapshot.get_texts({"box": ("search", "name")}) == {"box": "shoes"}
+    with pytest.raises(exceptions.NoSuchElementException):
+        snapshot.get_text("missing", "id")
+
+
+def test_locators(snapshot):
+    """ Verify every element type finds the same elements a browser would """
+    assert snapshot.count("li", "tag") == 5
+    assert snapshot.count("link", "class") == 2
+    assert snapshot.count("active link", "class") == 1
+    assert snapshot.exists("search", "name")
+    assert not snapshot.exists("missing", "name")
+    assert snapshot.get_attribute("href", "Your basket", "link text") == "/basket"
+    assert snapshot.get_attribute("href", "Hom", "partial link text") == "/"
+    assert snapshot.count("*", "tag") == len(snapshot.elements)
+
+
+@pytest.mark.parametrize("selector, expected", [
+    ("#items > li.item", ["0", "1", "2", "3", "4"]),
+    ("ul li:first-child, ul li:last-child", ["0", "4"]),
+    ("li:nth-child(odd)", ["0", "2", "4"]),
+    ("li:nth-child(-n+2)", ["0", "1"]),
+    ("li[data-index='2'] + li", ["3"]),
+    ("li[data-index='2'] ~ li", ["3", "4"]),
+    ("[data-index^='1']", ["1"]),
+    ("body li[data-index]:only-child", []),
+])
+def test_css_selector(snapshot, selector, expected):
+    """ Verify CSS selectors are matched locally """
+    found = snapshot.find_all(selector, "css selector")
+    assert [found_element.get_attribute("data-index") for found_element in found] == expected
+
+
+def test_xpath(snapshot):
+    """ Verify XPath is answered locally, and unsupported XPath is rejected """
+    assert snapshot.get_text("//div[@id='menu']/a[2]", "xpath") == "Your basket"
+    assert snapshot.count("/html/body/ul/li", "xpath") == 5
+    assert snapshot.find("//a[.='Home']", "xpath").get_attribute("href") == "/"
+    with pytest.raises(exceptions.InvalidSelectorException):
+        snapshot.find_all("//a[contains(@href, 'basket')]", "xpath")
+    with pytest.raises(exceptions.InvalidSelectorException):
+        snapshot.find_all("a:hover", "css selector")
+
+
+def test_snapshot_matches_browser(web):
+    """ Verify a snapshot reads the same text as the browser """
+    web.open_url(f"{HOST}/long")
+    locators = [(f"ver{index}", "id") for index in range(0, 500, 25)] + [("span", "tag"), ("//div[3]", "xpath")]
+    snapshot = web.snapshot()
+    assert snapshot.get_texts(locators) == web.get_texts(locators)
+    assert snapshot.count("div", "tag") == web.count("div", "tag")
@@ -0,0 +1,97 @@
+""" Tests tabs.py """
+import threading
+from src.tabs import Tab, TabScheduler
+
+HOST = "http://localhost:5000"
+
+
+class _Browser:
+    """ Stands in for a WebAutomation object, noting which tab each call was made in """
+    def __init__(self):
+        self._window_lock = threading.RLock()
+        self.window = None
+        self.calls = []
+        self.tabs = 0
+
+    def new_tab(self, url=None):
+        """ Tab with the next handle """
+        self.tabs += 1
+        return Tab(self, f"tab{self.tabs}")
+
+    def _switch_window(self, handle):
+        self.window = handle
+
+    def _close_window(self, handle):
+        self.calls.append(("closed", handle))
+
+    def check_for_alert(self):
+        """ No alerts """
+
+    def get_text(self, element_id, element_type):
+        """ Note the call """
+        self.calls.append((self.window, element_id))
+        if element_id == "missing":
+            raise ValueError(element_type)
+        return element_id
+
+
+def test_interleaving():
+    """ Verify journeys take turns, resume after the delay they yield, and are reported as they finish """
+    def slow(tab):
+        tab.get_text("slow1", "id")
+        yield 0.2
+        tab.get_text("slow2", "id")
+
+    def fast(tab):
+        tab.get_text("fast1", "id")
+        yield
+        tab.get_text("fast2", "id")
+
+    def broken(tab):
+        yield
+        tab.get_text("missing", "id")
+
+    web = _Browser()
+    scheduler = TabScheduler(web)
+    scheduler.add(slow)
+    scheduler.add(fast, name="quick")
+    scheduler.add(broken)
+    results = list(scheduler.run())
+
+    assert [(result.name, result.tab, result.passed) for result in results] == [
+        ("quick", 1, True), ("broken", 2, False), ("slow", 0, True)]
+    assert "ValueError" in results[1].error
+    assert results[2].duration >= 0.2
+    assert web.calls == [("tab1", "slow1"), ("tab2", "fast1"), ("tab2", "fast2"), ("closed", "tab2"),
+                         ("tab3", "missing"), ("closed", "tab3"), ("tab1", "slow2"), ("closed", "tab1")]
+
+
+def test_tabs(web):
+    """ Verify each tab keeps its own page, and journeys share the browser """
+    first = web.new_tab(f"{HOST}/params?value=first")
+    second = web.new_tab(f"{HOST}/params?value=second")
+    assert first.get_text("text", "id") == "first"
+    assert second.get_text("text", "id") == "second"
+    assert first.get_url().endswith("first")
+    second.close()
+    assert len(web.selenium_driver.window_handles) == 2
+
+    def journey(tab):
+        tab.click("button1", "id")
+        yield 0.1
+        assert tab.get_text("output", "id") == "Passed"
+
+    scheduler = TabScheduler(web)
+    for _ in range(3):
+        scheduler.add(journey, url=f"{HOST}/button")
+    assert all(result.passed for result in scheduler.run())
+    assert len(web.selenium_driver.window_handles) == 2
+    first.close()
+
+
+def test_close_first_window(web):
+    """ Verify closing the first window switches to one still open """
+    tab = web.new_tab(f"{HOST}/params?value=second")
+    Tab(web, web.selenium_driver.current_window_handle).close()
+    assert web._window == web._first_window == tab.handle  # pylint: disable=protected-access
+    assert web.get_text("text", "id") == "second"
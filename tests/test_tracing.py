@@ -0,0 +1,42 @@
+""" Tests tracing.py """
+import json
+from src.tracing import Tracer, RingBufferSink, JsonLinesSink, percentile
+
+HOST = "http://localhost:5000"
+
+
+def test_percentile():
+    """ Verify nearest rank percentiles """
+    samples = list(range(1, 101))
+    assert percentile(samples, 0.50) == 50
+    assert percentile(samples, 0.99) == 99
+    assert percentile([7], 0.95) == 7
+    assert percentile([], 0.5) is None
+
+
+def test_trace_commands(web, tmp_path):
+    """ Verify driver commands are recorded against the public method which sent them """
+    ring = RingBufferSink()
+    calls = []
+    path = tmp_path / "trace.jsonl"
+    jsonl = JsonLinesSink(str(path))
+    tracer = Tracer(sinks=[ring, jsonl, calls.append])
+    tracer.attach(web)
+
+    web.open_url(f"{HOST}/button")
+    web.click("button1", "id")
+    web.get_text("output", "id")
+    jsonl.close()
+
+    finds = [record for record in ring.records if record.kind == "command" and record.locator]
+    assert finds[0].method == "click"
+    assert "button1" in finds[0].locator
+    assert len(calls) == len(ring.records)
+    assert len(path.read_text().splitlines()) == len(ring.records)
+    assert json.loads(path.read_text().splitlines()[0])["outcome"] == "ok"
+
+    summary = tracer.summary()
+    assert summary["methods"]["click"]["count"] == 1
+    assert summary["methods"]["get_text"]["p99"] > 0
+    assert any(name.startswith("get_text/") for name in summary["commands"])
+    assert "click" in tracer.report()